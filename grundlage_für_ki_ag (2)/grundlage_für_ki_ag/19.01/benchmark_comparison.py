@@ -1,4 +1,5 @@
 import os
+import sys
 from dotenv import load_dotenv
 from langchain_community.vectorstores import FAISS
 from langchain_community.document_loaders import TextLoader
@@ -9,6 +10,11 @@ from langchain.agents import AgentExecutor, create_react_agent
 from langchain_core.tools import tool
 from langchain_core.prompts import PromptTemplate
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from graph_tools import (backfill_lookup_keys, ensure_lookup_indexes, format_connections, format_neighborhood,
+                         get_neighborhood as neighborhood_rows, parse_connection_request, shortest_paths)
+from query_cache import CachedGraph
+
 load_dotenv()
 MODEL_NAME = "gemma3:27b"
 FILE_PATH = "./data/long_data.txt" # Deine Datei mit der Attis Geschichte
@@ -68,11 +74,14 @@ print("\n" + "="*60)
 print("🧠 ANALYSE GRAPH AGENT (Reasoning Trace)")
 print("="*60)
 
-graph = Neo4jGraph(
+graph = CachedGraph(Neo4jGraph(
     url=os.getenv("NEO4J_URI"),
     username=os.getenv("NEO4J_USERNAME"),
     password=os.getenv("NEO4J_PASSWORD")
-)
+))
+# Am Cache vorbei: nur ein echter Backfill zählt die Graph-Version hoch
+ensure_lookup_indexes(graph.graph)
+backfill_lookup_keys(graph.graph)   # Graphen von vor lookup_key
 
 @tool
 def search_entities(query: str):
@@ -82,24 +91,27 @@ def search_entities(query: str):
         res = graph.query("""
         CALL db.index.vector.queryNodes('entity_index', 3, $vec)
         YIELD node, score
-        RETURN node.id, labels(node), score
+        RETURN node.id, labels(node), elementId(node), score
         """, params={"vec": vec})
         return str(res)
     except: return "Fehler"
 
 @tool
 def get_neighborhood(entity_id: str):
-    """Zeigt Verbindungen eines Knotens."""
-    # Case-insensitive Suche
-    res = graph.query("""
-    MATCH (n) WHERE n.id =~ ('(?i)' + $id) OR n.name =~ ('(?i)' + $id)
-    MATCH (n)-[r]-(m)
-    RETURN n.id + ' --[' + type(r) + ']-- ' + m.id AS relation
-    LIMIT 50
-    """, params={"id": entity_id})
-    return str(res)
-
-tools = [search_entities, get_neighborhood]
+    """Zeigt Verbindungen eines Knotens (Name oder elementId)."""
+    # Case-insensitive über lookup_key-Index statt Regex-Scan
+    return format_neighborhood(neighborhood_rows(graph, entity_id, limit=50), entity_id)
+
+@tool
+def find_connection(request: str):
+    """Kürzester Pfad zwischen zwei Knoten. Eingabe: 'Start; Ziel' (optional '; REL1,REL2; max_hops')."""
+    try:
+        kwargs = parse_connection_request(request)
+    except ValueError as e:
+        return str(e)
+    return format_connections(shortest_paths(graph, **kwargs), kwargs["source_ref"], kwargs["target_ref"])
+
+tools = [search_entities, get_neighborhood, find_connection]
 
 # Das Template zwingt den Agenten zum "lauten Nachdenken" (Thought/Action/Observation)
 template = """Du bist ein Detektiv.
@@ -131,4 +143,5 @@ agent_executor = AgentExecutor(
 )
 
 print(f"❓ FRAGE AN AGENT: {QUESTION}\n")
-agent_executor.invoke({"input": QUESTION})
\ No newline at end of file
+agent_executor.invoke({"input": QUESTION})
+graph.cache.print_stats()
\ No newline at end of file
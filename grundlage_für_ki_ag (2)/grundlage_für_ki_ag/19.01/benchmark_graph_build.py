@@ -1,19 +1,37 @@
+import argparse
 import os
+import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from neo4j import GraphDatabase
 from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import TokenTextSplitter
 from langchain_community.graphs import Neo4jGraph
 from langchain_experimental.graph_transformers import LLMGraphTransformer
-from langchain_ollama import ChatOllama, OllamaEmbeddings
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from checkpoint import ExtractionCheckpoint, checkpoint_path, fingerprint, graph_documents_from_data, graph_documents_to_data
+from adaptive_limiter import LimitedChatOllama, LimitedOllamaEmbeddings, shared_limiter
+from embedding_backfill import backfill_embeddings
+from graph_tools import backfill_lookup_keys
+from query_cache import bump_graph_version
+from schema_manager import ensure_schema
 
 load_dotenv()
 
+cli = argparse.ArgumentParser(description="Baut den Attis-Graphen chunkweise mit dem LLMGraphTransformer.")
+cli.add_argument("--resume", action="store_true",
+                 help="Abgebrochenen Lauf fortsetzen: fertige Chunks aus dem Checkpoint übernehmen")
+args = cli.parse_args()
+
 # --- KONFIGURATION ---
 FILE_PATH = "data/long_data.txt"  
 MODEL_NAME = "gemma3:27b"          
 CHUNK_SIZE = 1000                  
 CHUNK_OVERLAP = 150                # Etwas mehr Overlap, damit keine Beziehung an der Schnittstelle verloren geht
+CHECKPOINT_PATH = checkpoint_path("attis_chunks")  # Extraktion pro Chunk, für --resume
+MAX_WORKERS = 8                    # Obergrenze - wie viele Chunks wirklich parallel laufen, regelt der AdaptiveLimiter
 
 print(f"\n🚀 STARTE ATTIS GRAPH-BUILDER (MODERN PIPELINE)")
 print(f"   Modell: {MODEL_NAME}")
@@ -25,8 +43,9 @@ graph = Neo4jGraph(
     username=os.getenv("NEO4J_USERNAME"),
     password=os.getenv("NEO4J_PASSWORD")
 )
-llm = ChatOllama(model=MODEL_NAME, temperature=0) # Temp 0 ist wichtig für JSON Stabilität
-embedder = OllamaEmbeddings(model="nomic-embed-text")
+chat_limiter = shared_limiter("chat", max_limit=MAX_WORKERS)
+llm = LimitedChatOllama(model=MODEL_NAME, temperature=0, limiter=chat_limiter) # Temp 0 ist wichtig für JSON Stabilität
+embedder = LimitedOllamaEmbeddings(model="nomic-embed-text")
 
 # --- 2. CLEANUP ---
 graph.query("MATCH (n) DETACH DELETE n")
@@ -44,6 +63,10 @@ text_splitter = TokenTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVE
 splits = text_splitter.split_documents(documents)
 print(f"📥 Verarbeite {len(splits)} Chunks (Das ist sicher für den Speicher).")
 
+checkpoint = ExtractionCheckpoint(CHECKPOINT_PATH, resume=args.resume)
+if args.resume:
+    print(f"♻️  Resume: {len(checkpoint)} Chunks im Checkpoint.")
+
 # --- 4. DER EXTRAKTOR (Das Herzstück) ---
 # Wir definieren das Schema passend zu ATTIS
 llm_transformer = LLMGraphTransformer(
@@ -57,49 +80,81 @@ llm_transformer = LLMGraphTransformer(
     # OPTIONAL: Hier zwingen wir das Modell, gründlich zu sein
     strict_mode=False 
 )
+ensure_schema(graph, llm_transformer.allowed_nodes)  # Constraints + Vector Index vor dem ersten MERGE
 
 # --- 5. BUILD LOOP ---
 print("\n🏗️  Starte Extraktion...")
 
-for i, chunk in enumerate(splits):
-    print(f"\n👉 CHUNK {i+1}/{len(splits)}")
-    
-    # Vorschau
-    preview = chunk.page_content.replace('\n', ' ')[:80]
-    print(f"   Inhalt: '{preview}...'")
-
+def extract_chunk(item):
+    """Extraktion eines Chunks (läuft parallel) -> (graph_docs, aus_checkpoint, fehler)."""
+    i, chunk = item
     try:
+        # Fertige Chunks aus einem abgebrochenen Lauf nicht erneut ans LLM schicken
+        chunk_fp = fingerprint(MODEL_NAME, llm_transformer.allowed_nodes,
+                               llm_transformer.allowed_relationships, chunk.page_content)
+        cached = checkpoint.get(f"chunk-{i}", chunk_fp)
+        if cached is not None:
+            return graph_documents_from_data(cached, [chunk]), True, None
+        
         # Hier passiert Extraction (Nodes + Rels gleichzeitig)
         graph_docs = llm_transformer.convert_to_graph_documents([chunk])
+        checkpoint.append(f"chunk-{i}", chunk_fp, graph_documents_to_data(graph_docs))
+        return graph_docs, False, None
+    except Exception as e:
+        return None, False, e
+
+# Extraktion parallel, Ausgabe + Schreiben in Chunk-Reihenfolge
+with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+    for i, (chunk, (graph_docs, from_checkpoint, error)) in enumerate(
+            zip(splits, executor.map(extract_chunk, enumerate(splits)))):
+        print(f"\n👉 CHUNK {i+1}/{len(splits)}")
         
-        nodes = graph_docs[0].nodes
-        rels = graph_docs[0].relationships
-        
-        # --- DEIN GEWÜNSCHTER OUTPUT ---
-        if len(nodes) > 0:
-            print(f"   ✅ {len(nodes)} Knoten | {len(rels)} Kanten")
-            for n in nodes:
-                print(f"      • ({n.type}) {n.id}")
-            for r in rels:
-                print(f"      • {r.source.id} -[{r.type}]-> {r.target.id}")
-        else:
-            print("   ⚪ (Leer - Wahrscheinlich Müll/Inventar)")
-
-        graph.add_graph_documents(graph_docs)
+        # Vorschau
+        preview = chunk.page_content.replace('\n', ' ')[:80]
+        print(f"   Inhalt: '{preview}...'")
         
-    except Exception as e:
-        print(f"❌ Fehler: {e}")
+        if error is not None:
+            print(f"❌ Fehler: {error}")
+            continue
+        if from_checkpoint:
+            print("   ♻️  Aus Checkpoint übernommen")
+
+        try:
+            nodes = graph_docs[0].nodes
+            rels = graph_docs[0].relationships
+            
+            # --- DEIN GEWÜNSCHTER OUTPUT ---
+            if len(nodes) > 0:
+                print(f"   ✅ {len(nodes)} Knoten | {len(rels)} Kanten")
+                for n in nodes:
+                    print(f"      • ({n.type}) {n.id}")
+                for r in rels:
+                    print(f"      • {r.source.id} -[{r.type}]-> {r.target.id}")
+            else:
+                print("   ⚪ (Leer - Wahrscheinlich Müll/Inventar)")
+
+            graph.add_graph_documents(graph_docs)
+            
+        except Exception as e:
+            print(f"❌ Fehler: {e}")
+
+print(f"\n🎚️  {chat_limiter.summary()}")
+print(f"\n♻️  {checkpoint.summary()}")
 
 # --- 6. EMBEDDINGS & INDEX ---
 print("\n⚡ Indexierung...")
-graph.query("MATCH (n) WHERE n.embedding IS NULL SET n.embedding = null") # Init
-nodes = graph.query("MATCH (n) RETURN n.id AS id")
-for record in nodes:
-    nid = record['id']
-    vec = embedder.embed_query(nid)
-    graph.query("MATCH (n) WHERE n.id = $id SET n.embedding = $vec", params={"id": nid, "vec": vec})
+# Seitenweise + gebatcht statt ein embed_query und ein MATCH-Scan pro Knoten
+driver = GraphDatabase.driver(os.getenv("NEO4J_URI"),
+                              auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")))
+try:
+    backfill = backfill_embeddings(driver, embedder, workers=MAX_WORKERS)
+finally:
+    driver.close()
+print(f"   ✅ {backfill.summary()}")
 
 graph.query("MATCH (n) SET n:Entity")
+# add_graph_documents kennt lookup_key nicht -> nachtragen für graph_tools
+backfill_lookup_keys(graph)
 try:
     graph.query("""
         CREATE VECTOR INDEX entity_index IF NOT EXISTS
@@ -107,5 +162,6 @@ try:
         OPTIONS {indexConfig: {`vector.dimensions`: 768, `vector.similarity_function`: 'cosine'}}
     """)
 except: pass
+bump_graph_version(graph)   # Query-Caches der Agenten invalidieren
 
 print("\n🎉 FERTIG! Attis-Graph steht.")
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+import sys
 from dotenv import load_dotenv
 from langchain_neo4j import Neo4jGraph
 from langchain_ollama import ChatOllama, OllamaEmbeddings
@@ -6,48 +7,96 @@ from langchain.agents import AgentExecutor, create_react_agent
 from langchain_core.tools import tool
 from langchain_core.prompts import PromptTemplate
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from graph_tools import (backfill_lookup_keys, clean_input, ensure_lookup_indexes, expand_paths, format_neighborhood,
+                         format_connections, format_neighborhoods, format_paths,
+                         get_neighborhood as neighborhood_rows, get_neighborhoods as neighborhood_groups,
+                         parse_connection_request, parse_entity_list, parse_path_request, shortest_paths)
+from query_cache import CachedGraph, CypherResultCache
+from local_vector_index import LocalVectorIndex
+from agent_profiler import AgentProfiler
+
 load_dotenv()
 
+# Chrome-Trace (chrome://tracing oder ui.perfetto.dev): LLM / Tool / Embedding / Cypher pro Schritt
+TRACE_PATH = "traces/graph_agent_ollama.json"
+profiler = AgentProfiler()
+
 # --- 1. SETUP ---
-graph = Neo4jGraph(
+# Der Agent fragt dieselben Knoten oft mehrfach ab -> Ergebnisse cachen,
+# invalidiert über die Graph-Version, die die Builder hochzählen
+raw_graph = Neo4jGraph(
     url=os.getenv("NEO4J_URI"),
     username=os.getenv("NEO4J_USERNAME"),
     password=os.getenv("NEO4J_PASSWORD")
 )
+graph = profiler.wrap_graph(CachedGraph(raw_graph, CypherResultCache(max_entries=2048, ttl_s=600)))
+# DDL und Backfill am Cache vorbei; backfill_lookup_keys zählt die Version nur
+# hoch, wenn es tatsächlich Knoten geändert hat
+ensure_lookup_indexes(raw_graph)
+backfill_lookup_keys(raw_graph)   # Graphen von vor lookup_key
+
+# Optional: Embeddings im Prozess statt queryNodes-Roundtrip pro search_entities
+# (LOCAL_VECTOR_INDEX=1). Lädt beim Start alle Embeddings, HNSW baut sich im
+# Hintergrund; nachgeladen, sobald die Graph-Version (gleicher Stamp wie der Cache) sich ändert
+vector_index = None
+if os.getenv("LOCAL_VECTOR_INDEX", "0") == "1":
+    vector_index = LocalVectorIndex()
+    vector_index.load(raw_graph)
 
 # Du nutzt Gemma 3 (27b) - das ist super für komplexe Logik!
 llm = ChatOllama(model="gemma3:27b", temperature=0)
-embedder = OllamaEmbeddings(model="nomic-embed-text")
+embedder = profiler.wrap_embeddings(OllamaEmbeddings(model="nomic-embed-text"))
 
 # --- 2. TOOLS (Bleiben gleich, die sind super) ---
 @tool
 def search_entities(query: str):
     """NUR für den ersten Schritt! Findet den Namen des Start-Knotens."""
-    clean_query = query.strip().strip('"').strip("'")
+    clean_query = clean_input(query)
+    embedding = embedder.embed_query(clean_query)
+    if vector_index is not None:
+        vector_index.refresh(raw_graph, graph.stamp.current())
+        return [{"entity": hit["id"], "type": hit["labels"], "elementId": hit["element_id"]}
+                for hit in vector_index.search(embedding, k=3)]
     vector_query = """
     CALL db.index.vector.queryNodes('entity_index', 3, $embedding)
     YIELD node, score
-    RETURN coalesce(node.id, node.name) AS entity, labels(node) AS type
+    RETURN coalesce(node.id, node.name) AS entity, labels(node) AS type, elementId(node) AS elementId
     """
-    embedding = embedder.embed_query(clean_query)
     return graph.query(vector_query, params={"embedding": embedding})
 
 @tool
 def get_neighborhood(entity_id: str):
-    """DIE EINZIGE QUELLE FÜR FAKTEN. Zeigt echte Verbindungen im Graphen."""
-    # Cleaning für Robustheit
-    clean_id = entity_id.strip().strip('"').strip("'").split('\n')[0]
-    query = """
-    MATCH (n)
-    WHERE n.id =~ ('(?i)' + $entity_id) OR n.name =~ ('(?i)' + $entity_id)
-    MATCH (n)-[r]-(neighbor)
-    RETURN n.id + ' --[' + type(r) + ']--> ' + neighbor.id AS relationship
-    LIMIT 20
-    """
-    results = graph.query(query, params={"entity_id": clean_id})
-    return results if results else f"Keine Nachbarn für '{clean_id}' gefunden."
+    """DIE EINZIGE QUELLE FÜR FAKTEN. Zeigt echte Verbindungen im Graphen.
+    Eingabe: Name oder elementId eines Knotens (elementId ist schneller und eindeutig)."""
+    # lookup_key-Index bzw. elementId statt Regex-Scan über alle Knoten
+    return format_neighborhood(neighborhood_rows(graph, entity_id, limit=20), entity_id)
+
+@tool
+def follow_paths(request: str):
+    """Verfolgt mehrere Hops auf einmal. Eingabe: 'Start; REL1,REL2,...; max_hops; out|in|both'
+    (nur Start ist Pflicht). Liefert komplette Pfade wie A --[USES]--> B --[LOCATED_IN]--> C."""
+    # Ein Tool-Call statt eines LLM-Roundtrips pro Hop
+    kwargs = parse_path_request(request)
+    return format_paths(expand_paths(graph, **kwargs), kwargs["ref"])
+
+@tool
+def get_neighborhoods(entities: str):
+    """Nachbarschaften MEHRERER Knoten in einem Schritt. Eingabe: Namen oder elementIds,
+    getrennt durch ';' (z.B. alle Kandidaten aus search_entities)."""
+    return format_neighborhoods(neighborhood_groups(graph, parse_entity_list(entities)))
+
+@tool
+def find_connection(request: str):
+    """Kürzeste Verbindung zwischen ZWEI bekannten Knoten in einem Schritt.
+    Eingabe: 'Start; Ziel' optional '; REL1,REL2; max_hops'. Liefert Tripel (A)-[REL]->(B), ..."""
+    try:
+        kwargs = parse_connection_request(request)
+    except ValueError as e:
+        return str(e)
+    return format_connections(shortest_paths(graph, **kwargs), kwargs["source_ref"], kwargs["target_ref"])
 
-tools = [search_entities, get_neighborhood]
+tools = [search_entities, follow_paths, find_connection, get_neighborhoods, get_neighborhood]
 
 # --- 3. DER GENERISCHE PROMPT (Wichtigste Änderung!) ---
 # Wir haben "Raketen" entfernt und durch "logische Kette" ersetzt.
@@ -57,11 +106,14 @@ Deine Aufgabe ist es, Abhängigkeiten über mehrere Stationen hinweg zu finden.
 
 STRIKTE REGELN:
 1. Nutze 'search_entities' EINMALIG für den Start-Knoten (z.B. Microsoft).
-2. Nutze DANACH 'get_neighborhood', um dich von Knoten zu Knoten zu hangeln.
-3. Folge dem Pfad logisch:
+2. Nutze DANACH 'follow_paths', um die ganze Kette in EINEM Schritt zu holen, z.B.
+   Microsoft; USES,MANUFACTURED_BY,LOCATED_IN; 3; out
    - Wer nutzt was? (USES)
    - Wer stellt das her? (MANUFACTURED_BY)
    - Wo ist der Hersteller? (LOCATED_IN)
+3. Nur wenn ein Pfad abbricht: 'get_neighborhood' mit der elementId vom Pfadende.
+   Mehrere Kandidaten? Alle zusammen an 'get_neighborhoods' (A; B; C), nicht einzeln.
+   Sind Start UND Ziel bekannt: 'find_connection' (Start; Ziel) statt zu raten.
 4. Erfinde NIEMALS Verbindungen!
 
 TOOLS:
@@ -70,9 +122,9 @@ TOOLS:
 
 FORMAT:
 -------
-Thought: Welchen Knoten muss ich als nächstes untersuchen?
+Thought: Welche Kette muss ich verfolgen?
 Action: [{tool_names}]
-Action Input: [Name des Knotens]
+Action Input: [Eingabe im Format des Tools]
 Observation: [Ergebnis]
 
 ... (Wiederhole bis zum Ziel)
@@ -94,7 +146,7 @@ agent_executor = AgentExecutor(
     tools=tools, 
     verbose=True, 
     handle_parsing_errors=True, 
-    max_iterations=15 # Chip-Ketten sind lang, gib ihm Zeit!
+    max_iterations=6 # follow_paths holt die ganze Kette in einem Schritt
 )
 
 # --- 5. DIE NEUE FRAGE ---
@@ -103,4 +155,8 @@ agent_executor = AgentExecutor(
 query = "Welche anderen Firmen hat der Besitzer von Twitter noch gegründet?"
 
 print(f"\n🕵️ Untersuchung der Lieferkette startet...\n")
-agent_executor.invoke({"input": query})
\ No newline at end of file
+with profiler.question(query):
+    agent_executor.invoke({"input": query}, config={"callbacks": [profiler]})
+graph.cache.print_stats()
+profiler.print_summary()
+print(f"📈 Trace: {profiler.export_chrome_trace(TRACE_PATH)}")
\ No newline at end of file
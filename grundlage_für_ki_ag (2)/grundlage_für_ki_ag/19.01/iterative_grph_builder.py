@@ -1,4 +1,5 @@
 import os
+import sys
 import time
 from typing import List, Optional
 from dotenv import load_dotenv
@@ -6,13 +7,24 @@ from pydantic import BaseModel, Field
 
 from langchain_community.graphs import Neo4jGraph
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_ollama import ChatOllama, OllamaEmbeddings
+from langchain_ollama import OllamaEmbeddings
 from langchain_community.graphs.graph_document import GraphDocument, Node as LangChainNode, Relationship as LangChainRel
 from langchain_core.documents import Document
 
+# Gemeinsame Helfer liegen eine Ebene höher (grundlage_für_ki_ag/)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_cache import DiskLRUCache
+from adaptive_limiter import LimitedChatOllama
+from graph_tools import backfill_lookup_keys, ensure_lookup_indexes
+from query_cache import bump_graph_version
+from structured_output import ParseStats, make_parser, structured_llm
+
 load_dotenv()
 
+LLM_CACHE_DIR = "cache/llm"  # Persistenter Cache für LLM-Antworten (None = aus)
+OUTPUT_MODE = "schema"       # JSON-Schema an Ollama + toleranter Parser (siehe structured_output.py)
+parse_stats = ParseStats()
+
 # --- 1. CONFIG ---
 print("\n🔌 1. Verbinde zur Datenbank...")
 graph = Neo4jGraph(
@@ -29,7 +41,9 @@ except:
     pass
 
 # Modell Setup - Temperature 0 ist PFLICHT für Logik!
-llm = ChatOllama(model="gemma3:27b", temperature=0) # oder llama3.1
+LLM_PARAMS = {"model": "gemma3:27b", "temperature": 0}  # oder llama3.1; Teil des Cache-Keys
+llm_cache = DiskLRUCache(LLM_CACHE_DIR, params=LLM_PARAMS) if LLM_CACHE_DIR else None
+llm = LimitedChatOllama(**LLM_PARAMS, cache=llm_cache)
 embedder = OllamaEmbeddings(model="nomic-embed-text")
 
 # --- 2. DATENSTRUKTUREN (Pydantic) ---
@@ -56,7 +70,7 @@ def extract_nodes_step_by_step(text: str, allowed_nodes: List[str]) -> List[Iden
     """Iteriert durch jeden Knotentyp einzeln."""
     all_nodes = []
     
-    parser = PydanticOutputParser(pydantic_object=IdentifiedNodeList)
+    parser = make_parser(IdentifiedNodeList, OUTPUT_MODE, parse_stats)
     
     # Der Prompt konzentriert sich NUR auf EINEN Typ
     template = """Du bist ein Experte für Daten-Extraktion.
@@ -77,7 +91,7 @@ def extract_nodes_step_by_step(text: str, allowed_nodes: List[str]) -> List[Iden
         partial_variables={"format_instructions": parser.get_format_instructions()}
     )
     
-    chain = prompt | llm | parser
+    chain = prompt | structured_llm(llm, IdentifiedNodeList, OUTPUT_MODE) | parser
 
     for node_type in allowed_nodes:
         print(f"   👉 Suche nach Typ: [{node_type}]...")
@@ -97,7 +111,7 @@ def extract_nodes_step_by_step(text: str, allowed_nodes: List[str]) -> List[Iden
 def extract_relationships_guided(text: str, nodes: List[IdentifiedNode], allowed_rels: List[str]) -> List[IdentifiedRelationship]:
     """Sucht Beziehungen NUR zwischen den bereits gefundenen Knoten."""
     
-    parser = PydanticOutputParser(pydantic_object=RelationshipList)
+    parser = make_parser(RelationshipList, OUTPUT_MODE, parse_stats)
     
     node_list_str = ", ".join([f"{n.id} ({n.type})" for n in nodes])
     
@@ -125,7 +139,7 @@ def extract_relationships_guided(text: str, nodes: List[IdentifiedNode], allowed
         partial_variables={"format_instructions": parser.get_format_instructions()}
     )
     
-    chain = prompt | llm | parser
+    chain = prompt | structured_llm(llm, RelationshipList, OUTPUT_MODE) | parser
     
     print(f"   👉 Suche nach Beziehungen zwischen {len(nodes)} Knoten...")
     try:
@@ -204,6 +218,9 @@ graph.add_graph_documents([graph_doc])
 
 # Index erstellen
 graph.query("MATCH (n) WHERE n.embedding IS NOT NULL SET n:Entity")
+# add_graph_documents kennt lookup_key nicht -> nachtragen für graph_tools
+backfill_lookup_keys(graph)
+ensure_lookup_indexes(graph)
 vector_dim = len(graph_doc.nodes[0].properties["embedding"])
 graph.query(f"""
     CREATE VECTOR INDEX entity_index IF NOT EXISTS
@@ -213,7 +230,11 @@ graph.query(f"""
       `vector.similarity_function`: 'cosine'
     }}}}
 """)
+bump_graph_version(graph)   # Query-Caches der Agenten invalidieren
 
 print("\n🎉 FERTIG! Schau in Neo4j nach.")
 print(f"   Gefundene Knoten: {[n.id for n in lc_nodes]}")
-print(f"   Gefundene Kanten: {[f'{r.source.id}->{r.type}->{r.target.id}' for r in lc_rels]}")
\ No newline at end of file
+print(f"   Gefundene Kanten: {[f'{r.source.id}->{r.type}->{r.target.id}' for r in lc_rels]}")
+print(f"   Parser: {parse_stats.summary()}")
+if llm_cache is not None:
+    llm_cache.print_stats()
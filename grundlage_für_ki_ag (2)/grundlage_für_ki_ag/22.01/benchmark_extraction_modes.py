@@ -0,0 +1,139 @@
+"""
+Benchmark: Knoten-Extraktion "per_type" vs. "combined"
+=======================================================
+
+Misst für beide Modi aus krimi_graph_builder.extract_nodes:
+  - Anzahl LLM-Calls
+  - Prompt-Tokens (Prefill) und Completion-Tokens
+  - Wall-Time
+  - Recall pro Knotentyp (Referenz = Ergebnis des per_type Modus)
+
+Aufruf:
+    python benchmark_extraction_modes.py [--sections 5] [--verbose]
+"""
+
+import argparse
+import contextlib
+import io
+import threading
+import time
+from typing import Dict, List, Set, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_ollama import ChatOllama
+
+from krimi_graph_builder import (
+    ALLOWED_NODES,
+    CASE_FILE_PATH,
+    MODEL_NAME,
+    extract_nodes,
+    normalize_id,
+    split_into_sections,
+)
+
+
+class UsageCounter(BaseCallbackHandler):
+    """Zählt LLM-Calls und Tokens über die Ollama usage_metadata."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        with self._lock:
+            self.calls += 1
+            for generations in response.generations:
+                for gen in generations:
+                    usage = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+                    self.prompt_tokens += usage.get("input_tokens", 0)
+                    self.completion_tokens += usage.get("output_tokens", 0)
+
+
+def run_mode(llm, counter: UsageCounter, sections: List[Dict[str, str]], mode: str,
+             verbose: bool) -> Tuple[Dict[str, float], List[Set[Tuple[str, str]]]]:
+    """Extrahiert die Knoten aller Abschnitte in einem Modus."""
+    counter.reset()
+    found_per_section = []
+
+    start = time.perf_counter()
+    for section in sections:
+        # Die Extraktoren loggen sehr ausführlich - im Benchmark nur auf Wunsch
+        sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with sink:
+            nodes = extract_nodes(llm, section["content"], section["title"], mode=mode)
+        found_per_section.append({(n.type, normalize_id(n.id)) for n in nodes})
+    wall = time.perf_counter() - start
+
+    stats = {
+        "calls": counter.calls,
+        "prompt_tokens": counter.prompt_tokens,
+        "completion_tokens": counter.completion_tokens,
+        "wall_s": wall,
+        "nodes": sum(len(f) for f in found_per_section),
+    }
+    return stats, found_per_section
+
+
+def recall_per_type(reference: List[Set[Tuple[str, str]]],
+                    candidate: List[Set[Tuple[str, str]]]) -> Dict[str, Tuple[int, int]]:
+    """(gefunden, erwartet) pro Typ, abschnittsweise verglichen."""
+    result = {t: [0, 0] for t in ALLOWED_NODES}
+    for ref, cand in zip(reference, candidate):
+        for node_type, node_id in ref:
+            result[node_type][1] += 1
+            if (node_type, node_id) in cand:
+                result[node_type][0] += 1
+    return {t: (hit, total) for t, (hit, total) in result.items()}
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Vergleicht die Knoten-Extraktionsmodi.")
+    cli.add_argument("--file", default=CASE_FILE_PATH)
+    cli.add_argument("--sections", type=int, default=0, help="Nur die ersten N Abschnitte (0 = alle)")
+    cli.add_argument("--verbose", action="store_true", help="Extraktor-Logs anzeigen")
+    args = cli.parse_args()
+
+    with open(args.file, "r", encoding="utf-8") as f:
+        sections = [s for s in split_into_sections(f.read()) if len(s["content"]) >= 100]
+    if args.sections:
+        sections = sections[:args.sections]
+
+    counter = UsageCounter()
+    llm = ChatOllama(model=MODEL_NAME, temperature=0, callbacks=[counter])
+
+    print(f"\n📏 BENCHMARK EXTRAKTIONSMODI ({MODEL_NAME}, {len(sections)} Abschnitte)")
+    print("=" * 70)
+
+    results = {}
+    for mode in ("per_type", "combined"):
+        print(f"   ▶️  Modus '{mode}' läuft...", flush=True)
+        results[mode] = run_mode(llm, counter, sections, mode, args.verbose)
+
+    print(f"\n{'Modus':<12}{'Calls':>8}{'Prompt-Tok':>12}{'Compl-Tok':>12}{'Zeit [s]':>10}{'Knoten':>8}")
+    print("-" * 62)
+    for mode, (stats, _) in results.items():
+        print(f"{mode:<12}{stats['calls']:>8}{stats['prompt_tokens']:>12}"
+              f"{stats['completion_tokens']:>12}{stats['wall_s']:>10.1f}{stats['nodes']:>8}")
+
+    reference = results["per_type"][1]
+    recall = recall_per_type(reference, results["combined"][1])
+
+    print("\n🎯 RECALL 'combined' gegenüber 'per_type' (Referenz):")
+    for node_type, (hit, total) in recall.items():
+        value = f"{hit / total:.0%}" if total else "-"
+        print(f"   {node_type:<10} {hit:>4}/{total:<4} {value:>6}")
+
+    base, comb = results["per_type"][0], results["combined"][0]
+    if base["prompt_tokens"]:
+        print(f"\n💰 Prompt-Tokens gespart: {1 - comb['prompt_tokens'] / base['prompt_tokens']:.0%}")
+    if comb["wall_s"]:
+        print(f"⏱️  Speedup: {base['wall_s'] / comb['wall_s']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
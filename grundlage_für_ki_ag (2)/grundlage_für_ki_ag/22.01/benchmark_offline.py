@@ -0,0 +1,319 @@
+"""
+Offline-Benchmark der Build-Stufen (ohne Ollama, ohne Neo4j)
+===========================================================
+
+Treibt die Stufen aus krimi_graph_builder mit den deterministischen Fakes aus
+offline_stack.py:
+
+  chunking    split_into_sections + section_windows
+  extraction  extract_all_sections (Pipeline Knoten -> Beziehungen, Fake-LLM
+              mit Latenzmodell)
+  parsing     alle LLM-Antworten der Extraktion erneut durch den Parser
+  merging     prepare_section_write (merge_entities, Beziehungen validieren)
+  embedding   BackgroundEmbedder mit Hash-Embeddings
+  writing     StreamingGraphWriter gegen einen zählenden Fake-Graphen
+
+Pro Stufe: Items, Items/s, LLM-Calls, DB-Writes, Peak-Speicher (tracemalloc).
+
+Gleiche Konfiguration -> gleiche Calls/Writes; die Zeiten hängen nur vom
+Latenzmodell und der CPU ab. Mit gespeicherten Schwellwerten
+(benchmark_thresholds.json) endet der Lauf mit Exit-Code 1, sobald eine Stufe
+langsamer wird, mehr Calls/Writes braucht oder mehr Speicher belegt.
+
+Aufruf:
+    python benchmark_offline.py                       # messen + gegen Schwellwerte prüfen
+    python benchmark_offline.py --update-thresholds   # aktuelle Werte als neue Basis
+    python benchmark_offline.py --copies 10 --llm-base-ms 200 --slots 2
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Dict, List
+
+import krimi_graph_builder as krimi
+from embedding_worker import BackgroundEmbedder
+from graph_writer import StreamingGraphWriter
+from offline_stack import CallCounter, FakeChatModel, FakeEmbeddings, LatencyModel, RecordingGraph
+from stage_pipeline import PipelineStats
+from structured_output import OUTPUT_MODES, ParseStats, make_parser
+
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_thresholds.json")
+
+# Spielraum beim Schreiben neuer Schwellwerte. LLM-Calls sind deterministisch;
+# die Embedding-Batches hängen etwas vom Timing des Hintergrund-Threads ab.
+THROUGHPUT_TOLERANCE = 0.5   # min_items_per_s = 50% des gemessenen Werts
+WRITES_TOLERANCE = 1.25
+MEMORY_TOLERANCE = 1.5
+
+
+@dataclass
+class StageResult:
+    name: str
+    items: int = 0
+    wall_s: float = 0.0
+    llm_calls: int = 0
+    db_writes: int = 0
+    peak_mb: float = 0.0
+
+    @property
+    def items_per_s(self) -> float:
+        return self.items / self.wall_s if self.wall_s else 0.0
+
+
+@contextlib.contextmanager
+def measure(result: StageResult):
+    """Wall-Time + Peak-Speicher der Stufe (tracemalloc, relativ zum Start)."""
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result.wall_s = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        result.peak_mb = max(peak - base, 0) / 1e6
+
+
+def make_corpus(text: str, copies: int) -> str:
+    """Fallakte `copies`-mal hintereinander, Abschnittstitel eindeutig gemacht."""
+    parts = []
+    for k in range(copies):
+        lines = [f"{line.rstrip()} [{k + 1}]\n" if line.startswith("#") else line
+                 for line in text.splitlines(keepends=True)]
+        parts.append("".join(lines))
+    return "\n".join(parts)
+
+
+def run_suite(args) -> List[StageResult]:
+    with open(args.file, "r", encoding="utf-8") as f:
+        corpus = make_corpus(f.read(), args.copies)
+
+    llm_latency = LatencyModel(args.llm_base_ms, args.llm_input_ms, args.llm_output_ms,
+                               slots=args.slots, scale=args.time_scale)
+    embed_latency = LatencyModel(args.embed_base_ms, args.embed_token_ms, scale=args.time_scale)
+    db_latency = LatencyModel(args.db_base_ms, args.db_row_ms, scale=args.time_scale)
+
+    llm_counter = CallCounter()
+    llm = FakeChatModel(latency=llm_latency, counter=llm_counter, malformed_rate=args.malformed_rate,
+                        record=True)
+    results = []
+    quiet = open(os.devnull, "w")
+
+    # --- chunking ---
+    chunking = StageResult("chunking")
+    with measure(chunking):
+        sections = krimi.split_into_sections(corpus)
+        windows = [krimi.section_windows(s) for s in sections]
+    chunking.items = sum(len(w) for w in windows)
+    results.append(chunking)
+
+    # --- extraction (inkl. Parsing in den Chains) ---
+    extraction = StageResult("extraction")
+    krimi.parse_stats.reset()
+    pipeline_stats = PipelineStats()
+    keys = krimi.section_keys(sections)
+    extracted = []
+    with measure(extraction), contextlib.redirect_stdout(quiet):
+        # Konsum wie build_graph: zip über die Abschnitte, der Generator bleibt
+        # referenziert und wird nicht ausgeschöpft
+        section_results = krimi.extract_all_sections(
+            llm, sections, args.node_workers, args.rel_workers, args.mode, args.output,
+            stats=pipeline_stats)
+        for _, section_result in zip(keys, section_results):
+            extracted.append(section_result)
+    # Prüfen, solange section_results noch lebt (build_graph druckt den Report auch so)
+    pipeline_failures = check_pipeline_stats(pipeline_stats)
+    extraction.items = chunking.items
+    extraction.llm_calls = llm_counter.calls
+    results.append(extraction)
+
+    # --- parsing (Antworten erneut, isoliert vom LLM) ---
+    parsing = StageResult("parsing")
+    replay_stats = ParseStats()
+    parsers = {"nodes": make_parser(krimi.NodeList, args.output, replay_stats),
+               "relationships": make_parser(krimi.RelationshipList, args.output, replay_stats)}
+    with measure(parsing):
+        for content in llm.responses:
+            parser = parsers["relationships" if '"relationships"' in content else "nodes"]
+            try:
+                parser.parse(content)
+            except Exception:
+                pass   # zählt replay_stats als verworfen
+    parsing.items = replay_stats.responses
+    results.append(parsing)
+
+    # --- merging ---
+    merging = StageResult("merging")
+    entities: Dict[str, krimi.ExtractedNode] = {}
+    prepared = []
+    with measure(merging), contextlib.redirect_stdout(quiet):
+        for key, (nodes, rels) in zip(keys, extracted):
+            prepared.append(krimi.prepare_section_write(key, nodes, rels, entities))
+    merging.items = len(prepared)
+    results.append(merging)
+
+    # --- embedding ---
+    embedding = StageResult("embedding")
+    embed_graph = RecordingGraph(db_latency)
+    embedder = FakeEmbeddings(latency=embed_latency)
+    with measure(embedding):
+        worker = BackgroundEmbedder(embedder, embed_graph, normalize=krimi.normalize_id, log=lambda msg: None)
+        for _, _, new_entities, _ in prepared:
+            worker.submit((n.id, n.type) for n in new_entities)
+        embed_stats = worker.close()
+    embedding.items = embed_stats["embedded"]
+    embedding.db_writes = embed_graph.writes
+    results.append(embedding)
+
+    # --- writing ---
+    writing = StageResult("writing")
+    write_graph = RecordingGraph(db_latency)
+    writer = StreamingGraphWriter(write_graph)
+    with measure(writing):
+        for node_rows, rel_rows, _, _ in prepared:
+            writer.write(node_rows, rel_rows)
+    writing.items = writer.nodes_written + writer.rels_written
+    writing.db_writes = write_graph.writes
+    results.append(writing)
+
+    quiet.close()
+
+    print(f"\n   Parser (Extraktion): {krimi.parse_stats.summary()}")
+    for line in pipeline_stats.report().splitlines():
+        print(f"   {line}")
+    print(f"   LLM: {llm_counter.calls} Calls, {llm_counter.input_tokens} Input-/"
+          f"{llm_counter.output_tokens} Output-Tokens (geschätzt)")
+    return results, pipeline_failures
+
+
+def check_pipeline_stats(stats: PipelineStats) -> List[str]:
+    """Der Auslastungs-Report muss schon beim Konsum à la build_graph stimmen."""
+    failures = []
+    if stats.wall_s <= 0:
+        failures.append("Pipeline: Wall-Time 0 - Report wäre leer")
+    for s in stats.stages:
+        if s.items and not s.utilization(stats.wall_s):
+            failures.append(f"Pipeline: Stufe {s.name} mit {s.items} Items, aber 0% Auslastung")
+    return failures
+
+
+# =============================================================================
+# SCHWELLWERTE
+# =============================================================================
+
+def suite_config(args) -> dict:
+    """Alles, was Calls/Writes/Zeiten bestimmt - Schwellwerte gelten nur für dieselbe Konfiguration."""
+    return {k: getattr(args, k) for k in (
+        "copies", "mode", "output", "node_workers", "rel_workers", "malformed_rate", "slots",
+        "llm_base_ms", "llm_input_ms", "llm_output_ms", "embed_base_ms", "embed_token_ms",
+        "db_base_ms", "db_row_ms", "time_scale")}
+
+
+def thresholds_from(results: List[StageResult], config: dict) -> dict:
+    return {
+        "config": config,
+        "stages": {r.name: {
+            "min_items_per_s": round(r.items_per_s * THROUGHPUT_TOLERANCE, 2),
+            "max_llm_calls": r.llm_calls,
+            "max_db_writes": math.ceil(r.db_writes * WRITES_TOLERANCE),
+            "max_peak_mb": round(r.peak_mb * MEMORY_TOLERANCE + 1.0, 1),
+        } for r in results},
+    }
+
+
+def check_thresholds(results: List[StageResult], thresholds: dict) -> List[str]:
+    failures = []
+    for r in results:
+        t = thresholds["stages"].get(r.name)
+        if t is None:
+            continue
+        if r.items_per_s < t["min_items_per_s"]:
+            failures.append(f"{r.name}: {r.items_per_s:.1f} Items/s < {t['min_items_per_s']}")
+        if r.llm_calls > t["max_llm_calls"]:
+            failures.append(f"{r.name}: {r.llm_calls} LLM-Calls > {t['max_llm_calls']}")
+        if r.db_writes > t["max_db_writes"]:
+            failures.append(f"{r.name}: {r.db_writes} DB-Writes > {t['max_db_writes']}")
+        if r.peak_mb > t["max_peak_mb"]:
+            failures.append(f"{r.name}: {r.peak_mb:.1f} MB Peak > {t['max_peak_mb']} MB")
+    return failures
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Offline-Benchmark der Build-Stufen mit Fake-LLM/-Embedder.")
+    cli.add_argument("--file", default=krimi.CASE_FILE_PATH)
+    cli.add_argument("--copies", type=int, default=3, help="Fallakte n-mal aneinanderhängen")
+    cli.add_argument("--mode", choices=krimi.EXTRACTION_MODES, default=krimi.EXTRACTION_MODE)
+    cli.add_argument("--output", choices=OUTPUT_MODES, default=krimi.OUTPUT_MODE)
+    cli.add_argument("--node-workers", type=int, default=krimi.NODE_WORKERS)
+    cli.add_argument("--rel-workers", type=int, default=krimi.REL_WORKERS)
+    cli.add_argument("--malformed-rate", type=float, default=0.1, help="Anteil kaputter LLM-Antworten")
+    # Latenzmodell (Millisekunden)
+    cli.add_argument("--slots", type=int, default=4, help="Parallele Slots des simulierten Ollama")
+    cli.add_argument("--llm-base-ms", type=float, default=20.0)
+    cli.add_argument("--llm-input-ms", type=float, default=0.01, help="pro Input-Token (Prefill)")
+    cli.add_argument("--llm-output-ms", type=float, default=0.3, help="pro Output-Token")
+    cli.add_argument("--embed-base-ms", type=float, default=5.0)
+    cli.add_argument("--embed-token-ms", type=float, default=0.05)
+    cli.add_argument("--db-base-ms", type=float, default=2.0)
+    cli.add_argument("--db-row-ms", type=float, default=0.02)
+    cli.add_argument("--time-scale", type=float, default=1.0, help="0 = nicht schlafen, nur CPU messen")
+    cli.add_argument("--thresholds", default=THRESHOLDS_PATH)
+    cli.add_argument("--update-thresholds", action="store_true")
+    args = cli.parse_args()
+
+    print(f"\n📏 OFFLINE-BENCHMARK BUILD-STUFEN ({args.copies}x Fallakte, Modus {args.mode}/{args.output})")
+    print("=" * 84)
+    tracemalloc.start()
+    try:
+        results, pipeline_failures = run_suite(args)
+    finally:
+        tracemalloc.stop()
+
+    print(f"\n{'Stufe':<12}{'Items':>8}{'Zeit [s]':>10}{'Items/s':>11}{'LLM-Calls':>11}"
+          f"{'DB-Writes':>11}{'Peak [MB]':>11}")
+    print("-" * 84)
+    for r in results:
+        print(f"{r.name:<12}{r.items:>8}{r.wall_s:>10.3f}{r.items_per_s:>11.1f}{r.llm_calls:>11}"
+              f"{r.db_writes:>11}{r.peak_mb:>11.2f}")
+
+    if pipeline_failures:
+        print("\n❌ PIPELINE-STATISTIK FEHLERHAFT:")
+        for failure in pipeline_failures:
+            print(f"   {failure}")
+        sys.exit(1)
+
+    config = suite_config(args)
+    if args.update_thresholds:
+        with open(args.thresholds, "w", encoding="utf-8") as f:
+            json.dump(thresholds_from(results, config), f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\n💾 Schwellwerte gespeichert: {args.thresholds}")
+        return
+
+    if not os.path.exists(args.thresholds):
+        print(f"\n⚪ Keine Schwellwerte ({args.thresholds}) - mit --update-thresholds anlegen.")
+        return
+    with open(args.thresholds, "r", encoding="utf-8") as f:
+        thresholds = json.load(f)
+    if thresholds.get("config") != config:
+        print("\n⚪ Schwellwerte gelten für eine andere Konfiguration - nicht geprüft.")
+        return
+
+    failures = check_thresholds(results, thresholds)
+    if failures:
+        print(f"\n❌ {len(failures)} REGRESSION(EN):")
+        for failure in failures:
+            print(f"   {failure}")
+        sys.exit(1)
+    print("\n✅ Alle Stufen innerhalb der Schwellwerte.")
+
+
+if __name__ == "__main__":
+    main()
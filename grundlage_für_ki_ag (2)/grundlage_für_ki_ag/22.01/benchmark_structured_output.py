@@ -0,0 +1,107 @@
+"""
+Benchmark: Verschwendete LLM-Calls pro Output-Modus
+===================================================
+
+Lässt Knoten- und Beziehungsextraktion aus krimi_graph_builder für jeden
+Output-Modus (structured_output.OUTPUT_MODES) über dieselben Abschnitte laufen:
+  "prompt" = vorher: Format-Anweisungen im Prompt, strikter Parser
+  "repair" = toleranter Parser (json_repair)
+  "schema" = Ollama-JSON-Schema + toleranter Parser
+
+Gemessen werden:
+  - LLM-Calls gesamt
+  - verworfene Calls (Antwort nicht parsebar -> Typ/Beziehungen fallen weg)
+  - verworfene Calls pro 100 Abschnitte
+  - reparierte Antworten, Wall-Time, gefundene Knoten/Beziehungen
+
+Ohne LLM-Cache, damit jeder Modus echte Antworten bekommt.
+
+Aufruf:
+    python benchmark_structured_output.py [--sections 20] [--modes prompt schema] [--verbose]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+from typing import Dict, List
+
+from langchain_ollama import ChatOllama
+
+import krimi_graph_builder as krimi
+from benchmark_extraction_modes import UsageCounter
+from structured_output import OUTPUT_MODES
+
+
+def run_output_mode(llm, counter: UsageCounter, sections: List[Dict[str, str]], output_mode: str,
+                    verbose: bool) -> Dict[str, float]:
+    """Extrahiert Knoten + Beziehungen aller Abschnitte in einem Output-Modus."""
+    counter.reset()
+    krimi.parse_stats.reset()
+    nodes_found = rels_found = 0
+
+    start = time.perf_counter()
+    for section in sections:
+        # Die Extraktoren loggen sehr ausführlich - im Benchmark nur auf Wunsch
+        sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with sink:
+            nodes = krimi.extract_nodes(llm, section["content"], section["title"],
+                                        output_mode=output_mode)
+            rels = krimi.extract_relationships(llm, section["content"], nodes, section["title"],
+                                               output_mode=output_mode)
+        nodes_found += len(nodes)
+        rels_found += len(rels)
+    wall = time.perf_counter() - start
+
+    return {
+        "calls": counter.calls,
+        "wasted": krimi.parse_stats.failed,
+        "wasted_per_100": krimi.parse_stats.wasted_per_100(len(sections)),
+        "repaired": krimi.parse_stats.repaired,
+        "wall_s": wall,
+        "nodes": nodes_found,
+        "rels": rels_found,
+    }
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Vergleicht verschwendete LLM-Calls je Output-Modus.")
+    cli.add_argument("--file", default=krimi.CASE_FILE_PATH)
+    cli.add_argument("--sections", type=int, default=0, help="Nur die ersten N Abschnitte (0 = alle)")
+    cli.add_argument("--modes", nargs="+", choices=OUTPUT_MODES, default=["prompt", "repair", "schema"])
+    cli.add_argument("--verbose", action="store_true", help="Extraktor-Logs anzeigen")
+    args = cli.parse_args()
+
+    with open(args.file, "r", encoding="utf-8") as f:
+        sections = [s for s in krimi.split_into_sections(f.read()) if len(s["content"]) >= 100]
+    if args.sections:
+        sections = sections[:args.sections]
+
+    counter = UsageCounter()
+    llm = ChatOllama(model=krimi.MODEL_NAME, temperature=0, callbacks=[counter])
+
+    print(f"\n📏 BENCHMARK OUTPUT-MODI ({krimi.MODEL_NAME}, {len(sections)} Abschnitte)")
+    print("=" * 78)
+
+    results = {}
+    for output_mode in args.modes:
+        print(f"   ▶️  Modus '{output_mode}' läuft...", flush=True)
+        results[output_mode] = run_output_mode(llm, counter, sections, output_mode, args.verbose)
+
+    print(f"\n{'Modus':<10}{'Calls':>8}{'Verworfen':>11}{'/100 Abschn.':>14}{'Repariert':>11}"
+          f"{'Zeit [s]':>10}{'Knoten':>8}{'Bez.':>6}")
+    print("-" * 78)
+    for output_mode, r in results.items():
+        print(f"{output_mode:<10}{r['calls']:>8}{r['wasted']:>11}{r['wasted_per_100']:>14.1f}"
+              f"{r['repaired']:>11}{r['wall_s']:>10.1f}{r['nodes']:>8}{r['rels']:>6}")
+
+    if "prompt" in results:
+        before = results["prompt"]["wasted_per_100"]
+        for output_mode, r in results.items():
+            if output_mode != "prompt":
+                print(f"\n💸 '{output_mode}': {before:.1f} -> {r['wasted_per_100']:.1f} "
+                      f"verschwendete Calls pro 100 Abschnitte")
+
+
+if __name__ == "__main__":
+    main()
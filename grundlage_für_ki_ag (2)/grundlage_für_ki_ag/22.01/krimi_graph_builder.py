@@ -6,19 +6,32 @@ MIT VOLLEM TERMINAL OUTPUT für Debugging!
 Jede Entity und jede Beziehung wird sofort ausgegeben.
 """
 
+import argparse
+import hashlib
 import os
-import re
 import sys
-from typing import List, Dict
+import threading
+import time
+from typing import List, Dict, Tuple
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 
 from langchain_community.graphs import Neo4jGraph
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_ollama import ChatOllama, OllamaEmbeddings
-from langchain_community.graphs.graph_document import GraphDocument, Node as LCNode, Relationship as LCRel
-from langchain_core.documents import Document
+
+# Gemeinsame Helfer liegen eine Ebene höher (grundlage_für_ki_ag/)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_cache import DiskLRUCache
+from graph_writer import StreamingGraphWriter, node_row, rel_row
+from embedding_worker import BackgroundEmbedder
+from text_windows import CoverageStats, TextWindow, covered_chars, make_windows
+from stage_pipeline import PipelineStats, Stage, run_pipeline
+from structured_output import OUTPUT_MODES, ParseStats, make_parser, structured_llm
+from adaptive_limiter import LimitedChatOllama, LimitedOllamaEmbeddings, shared_limiter
+from entity_resolution import EntityResolver, resolve_against_graph
+from checkpoint import ExtractionCheckpoint, checkpoint_path
+from schema_manager import ensure_schema
+from query_cache import bump_graph_version
 
 load_dotenv()
 
@@ -27,9 +40,44 @@ load_dotenv()
 # =============================================================================
 
 MODEL_NAME = "gemma3:12b"
+LLM_PARAMS = {"model": MODEL_NAME, "temperature": 0}   # auch Teil des LLM-Cache-Keys
 EMBEDDING_MODEL = "nomic-embed-text"
 CASE_FILE_PATH = "data/graphrag_workshop_case.md"
 
+# Lange Abschnitte werden in überlappende Fenster zerlegt statt abgeschnitten.
+WINDOW_TOKENS = 1000
+WINDOW_OVERLAP_TOKENS = 100
+
+# Extraktion als Pipeline über alle Fenster aller Abschnitte:
+#   Knoten-Stufe (NODE_WORKERS) -> Queue -> Beziehungs-Stufe (REL_WORKERS)
+# Die Knoten von Fenster i+1 laufen, während die Beziehungen von Fenster i
+# extrahiert werden. Die Auslastung pro Stufe steht am Ende in der
+# Zusammenfassung - die Stufe mit ~100% ist der Engpass und bekommt
+# sinnvollerweise mehr Worker.
+#
+# NODE_WORKERS + REL_WORKERS ist nur die Obergrenze: wie viele Calls wirklich
+# gleichzeitig an Ollama gehen, regelt der AdaptiveLimiter (adaptive_limiter.py)
+# anhand von Durchsatz, Latenz und Serverfehlern. Ollama sollte mit
+# OLLAMA_NUM_PARALLEL >= NODE_WORKERS + REL_WORKERS laufen.
+NODE_WORKERS = 4
+REL_WORKERS = 3
+PIPELINE_QUEUE_SIZE = 4   # Fenster mit fertigen Knoten, die auf die Beziehungs-Stufe warten
+
+# Entity Resolution beim Mergen:
+#   "exact" = nur identische Namen nach normalize_id (wie bisher)
+#   "fuzzy" = zusätzlich Varianten wie "Hr. Klein" / "P. Klein" -> "Peter Klein"
+#             (MinHash-Blocking + Embedding-Cosine, siehe entity_resolution.py)
+RESOLUTION_MODE = "exact"
+RESOLUTION_MODES = ("exact", "fuzzy")
+
+# Persistenter Cache für LLM-Antworten (None = aus)
+LLM_CACHE_DIR = "cache/llm"
+LLM_CACHE_MAX_MB = 512
+
+# Extraktionsergebnis jedes Abschnitts wird sofort hier angehängt;
+# mit --resume werden fertige Abschnitte daraus übernommen statt neu extrahiert
+CHECKPOINT_PATH = checkpoint_path("krimi_extraction")
+
 # Schema für den Krimi
 ALLOWED_NODES = ["Person", "Ort", "Objekt", "Zeitpunkt", "Rolle"]
 ALLOWED_RELATIONSHIPS = [
@@ -43,23 +91,81 @@ ALLOWED_RELATIONSHIPS = [
     "ARBEITET_ALS",     # Person ARBEITET_ALS Rolle
 ]
 
+# Knoten-Extraktion:
+#   "per_type" = ein LLM-Call pro Typ in ALLOWED_NODES (gründlicher, teurer)
+#   "combined" = alle Typen in einem einzigen Call (1 Prefill statt 5)
+# Vergleich beider Modi: benchmark_extraction_modes.py
+EXTRACTION_MODE = "per_type"
+EXTRACTION_MODES = ("per_type", "combined")
+
+# Wie die JSON-Antworten erzwungen/geparst werden (siehe structured_output.py):
+#   "schema" = Ollama bekommt das JSON-Schema als format (constrained decoding)
+#              + toleranter Parser
+#   "repair" = nur toleranter Parser (json_repair bei kaputten Antworten)
+#   "prompt" = nur Format-Anweisungen im Prompt, strikter Parser (alt)
+OUTPUT_MODE = "schema"
+
+# Typ-spezifische Regeln für die Knoten-Prompts
+TYPE_RULES = {
+    "Person": """REGELN für Person:
+- Vollständige Namen wenn möglich (z.B. "Peter Klein" nicht nur "Peter")
+- Titel inkludieren (z.B. "Dr. Justus Vormann")
+- Beispiele: Zeugen, Verdächtige, Opfer""",
+    
+    "Ort": """REGELN für Ort:
+- Raumnummern (z.B. "Raum 404", "Raum 303")
+- Bezeichnungen (z.B. "Teeküche", "Kopierraum", "Hauptkorridor")
+- Gebäudeteile (z.B. "Etage 4", "Empfangsbereich")""",
+    
+    "Objekt": """REGELN für Objekt:
+- Gegenstände (z.B. "goldene Trophäe", "roter USB-Stick")
+- Getränke (z.B. "Chai-Latte", "Double Espresso")
+- Dokumente (z.B. "veganes Druckerpapier")""",
+    
+    "Zeitpunkt": """REGELN für Zeitpunkt:
+- NUR Uhrzeiten im Format "HH:MM" (z.B. "13:45", "14:00")
+- Jede erwähnte Uhrzeit ist ein Zeitpunkt""",
+    
+    "Rolle": """REGELN für Rolle:
+- Berufsbezeichnungen (z.B. "CTO", "Praktikant", "Sicherheitschef")
+- Funktionen (z.B. "Reinigungskraft", "Head of Sales")
+- NICHT die Person selbst, nur die Rolle/Funktion"""
+}
+
 # =============================================================================
 # LOGGING HELPER
 # =============================================================================
 
+# Abdeckung/Durchsatz der Fenster-Extraktion (Zeichen pro LLM-Sekunde)
+coverage_stats = CoverageStats()
+
+# Geparste / reparierte / verworfene LLM-Antworten
+parse_stats = ParseStats()
+
+# Bei paralleler Extraktion bekommt jede Zeile den Abschnitt als Präfix,
+# sonst ist die Ausgabe der Threads nicht mehr zuzuordnen.
+_log_context = threading.local()
+
+def _section_prefix() -> str:
+    return getattr(_log_context, "prefix", "")
+
+def _count_error():
+    """Merkt sich einen fehlgeschlagenen LLM-Call im aktuellen Fenster-Thread."""
+    _log_context.errors = getattr(_log_context, "errors", 0) + 1
+
 def log(msg: str, indent: int = 0):
     """Sofortiger Print mit Flush."""
     prefix = "   " * indent
-    print(f"{prefix}{msg}", flush=True)
+    print(f"{_section_prefix()}{prefix}{msg}", flush=True)
 
 def log_entity(entity_type: str, entity_id: str, section: str):
     """Loggt eine gefundene Entity."""
-    print(f"      ✅ ENTITY: [{entity_type}] \"{entity_id}\"", flush=True)
+    print(f"{_section_prefix()}      ✅ ENTITY: [{entity_type}] \"{entity_id}\"", flush=True)
 
 def log_relationship(source: str, rel_type: str, target: str, time: str = ""):
     """Loggt eine gefundene Beziehung."""
     time_str = f" @{time}" if time else ""
-    print(f"      🔗 REL: \"{source}\" --[{rel_type}]--> \"{target}\"{time_str}", flush=True)
+    print(f"{_section_prefix()}      🔗 REL: \"{source}\" --[{rel_type}]--> \"{target}\"{time_str}", flush=True)
 
 # =============================================================================
 # PYDANTIC MODELS
@@ -85,61 +191,65 @@ class RelationshipList(BaseModel):
 # TEXT CHUNKING
 # =============================================================================
 
+def _close_section(sections: List[Dict[str, str]], title: str, lines: List[str], min_len: int):
+    content = "".join(lines)
+    if content.strip() and len(content) > min_len:
+        sections.append({"title": title.strip(), "content": content.strip()})
+
+
 def split_into_sections(text: str) -> List[Dict[str, str]]:
-    """Teilt den Text in logische Abschnitte."""
-    sections = []
-    
-    # Split bei ### Headers (Zeugen, Verhöre)
-    pattern = r'(###[^\n]*\n)'
-    parts = re.split(pattern, text)
-    
-    current_title = "Einführung"
-    current_content = ""
-    
-    for part in parts:
-        if part.startswith("###"):
-            # Vorherigen Abschnitt speichern
-            if current_content.strip() and len(current_content) > 200:
-                sections.append({
-                    "title": current_title.strip(),
-                    "content": current_content.strip()
-                })
-            current_title = part.replace("###", "").strip()
-            current_content = ""
+    """
+    Teilt den Text in logische Abschnitte - in EINEM Durchlauf über die Zeilen.
+    
+    Primär an ### Headern (Zeugen, Verhöre); gibt es keine, an ## Headern.
+    Header zählen nur am Zeilenanfang. Die ##-Abschnitte heißen wie ihr
+    Header (ohne Text: Abschnitt_<n>) und werden wie die ###-Abschnitte nicht
+    mehr auf 5000 Zeichen gekürzt - lange Abschnitte zerlegt die Extraktion in
+    überlappende Fenster (siehe text_windows.py).
+    """
+    h3_sections: List[Dict[str, str]] = []
+    h2_sections: List[Dict[str, str]] = []
+    
+    h3_title, h3_lines = "Einführung", []
+    h2_title, h2_lines = "Abschnitt_0", []
+    
+    for line in text.splitlines(keepends=True):
+        # Split bei ### Headers (Zeugen, Verhöre)
+        if line.startswith("###"):
+            _close_section(h3_sections, h3_title, h3_lines, 200)
+            h3_title, h3_lines = line.replace("###", ""), []
         else:
-            current_content += part
+            h3_lines.append(line)
+        
+        # Parallel dazu: Fallback-Split bei ## Headers
+        if line.startswith("##"):
+            _close_section(h2_sections, h2_title, h2_lines, 300)
+            h2_title, h2_lines = line.strip().lstrip("#").strip() or f"Abschnitt_{len(h2_sections)}", []
+        else:
+            h2_lines.append(line)
     
     # Letzten Abschnitt
-    if current_content.strip() and len(current_content) > 200:
-        sections.append({
-            "title": current_title.strip(),
-            "content": current_content.strip()
-        })
+    _close_section(h3_sections, h3_title, h3_lines, 200)
+    _close_section(h2_sections, h2_title, h2_lines, 300)
     
     # Fallback wenn keine ### gefunden
-    if len(sections) == 0:
-        # Split bei ## Headers
-        pattern2 = r'(##[^\n]*\n)'
-        parts = re.split(pattern2, text)
-        
-        for i, part in enumerate(parts):
-            if len(part.strip()) > 300:
-                sections.append({
-                    "title": f"Abschnitt_{i}",
-                    "content": part.strip()[:5000]
-                })
-    
-    return sections
+    return h3_sections if h3_sections else h2_sections
 
 # =============================================================================
 # EXTRACTION FUNCTIONS
 # =============================================================================
 
-def extract_nodes(llm, text: str, section_title: str) -> List[ExtractedNode]:
-    """Extrahiert Knoten Typ für Typ."""
+def extract_nodes(llm, text: str, section_title: str, mode: str = EXTRACTION_MODE,
+                  output_mode: str = OUTPUT_MODE) -> List[ExtractedNode]:
+    """Extrahiert Knoten Typ für Typ (oder alle auf einmal bei mode="combined")."""
+    
+    if mode == "combined":
+        return extract_nodes_combined(llm, text, section_title, output_mode)
+    if mode != "per_type":
+        raise ValueError(f"Unbekannter Extraktionsmodus: {mode} (erlaubt: {EXTRACTION_MODES})")
     
     all_nodes = []
-    parser = PydanticOutputParser(pydantic_object=NodeList)
+    parser = make_parser(NodeList, output_mode, parse_stats)
     
     template = """Du extrahierst Entitäten aus einer Zeugenaussage.
 
@@ -162,31 +272,6 @@ WICHTIG:
 {format_instructions}
 """
 
-    type_rules = {
-        "Person": """REGELN für Person:
-- Vollständige Namen wenn möglich (z.B. "Peter Klein" nicht nur "Peter")
-- Titel inkludieren (z.B. "Dr. Justus Vormann")
-- Beispiele: Zeugen, Verdächtige, Opfer""",
-        
-        "Ort": """REGELN für Ort:
-- Raumnummern (z.B. "Raum 404", "Raum 303")
-- Bezeichnungen (z.B. "Teeküche", "Kopierraum", "Hauptkorridor")
-- Gebäudeteile (z.B. "Etage 4", "Empfangsbereich")""",
-        
-        "Objekt": """REGELN für Objekt:
-- Gegenstände (z.B. "goldene Trophäe", "roter USB-Stick")
-- Getränke (z.B. "Chai-Latte", "Double Espresso")
-- Dokumente (z.B. "veganes Druckerpapier")""",
-        
-        "Zeitpunkt": """REGELN für Zeitpunkt:
-- NUR Uhrzeiten im Format "HH:MM" (z.B. "13:45", "14:00")
-- Jede erwähnte Uhrzeit ist ein Zeitpunkt""",
-        
-        "Rolle": """REGELN für Rolle:
-- Berufsbezeichnungen (z.B. "CTO", "Praktikant", "Sicherheitschef")
-- Funktionen (z.B. "Reinigungskraft", "Head of Sales")
-- NICHT die Person selbst, nur die Rolle/Funktion"""
-    }
 
     prompt = PromptTemplate(
         template=template,
@@ -194,17 +279,17 @@ WICHTIG:
         partial_variables={"format_instructions": parser.get_format_instructions()}
     )
     
-    chain = prompt | llm | parser
+    chain = prompt | structured_llm(llm, NodeList, output_mode) | parser
 
     for node_type in ALLOWED_NODES:
         log(f"🔍 Suche [{node_type}]...", indent=2)
         
         try:
             result = chain.invoke({
-                "text": text[:4000],  # Max 4000 Zeichen
+                "text": text,
                 "node_type": node_type,
                 "section_title": section_title,
-                "type_rules": type_rules.get(node_type, "")
+                "type_rules": TYPE_RULES.get(node_type, "")
             })
             
             # SOFORT jede Entity loggen!
@@ -217,19 +302,89 @@ WICHTIG:
                 log(f"   (keine gefunden)", indent=2)
                 
         except Exception as e:
+            _count_error()
             log(f"❌ FEHLER bei {node_type}: {str(e)[:100]}", indent=2)
     
     return all_nodes
 
 
-def extract_relationships(llm, text: str, nodes: List[ExtractedNode], section_title: str) -> List[ExtractedRelationship]:
+def extract_nodes_combined(llm, text: str, section_title: str,
+                           output_mode: str = OUTPUT_MODE) -> List[ExtractedNode]:
+    """Extrahiert alle Knotentypen in EINEM LLM-Call."""
+    
+    all_nodes = []
+    parser = make_parser(NodeList, output_mode, parse_stats)
+    
+    template = """Du extrahierst Entitäten aus einer Zeugenaussage.
+
+ABSCHNITT: {section_title}
+
+TEXT:
+\"\"\"
+{text}
+\"\"\"
+
+AUFGABE: Extrahiere ALLE Entitäten der folgenden Typen: {node_types}
+Gib bei jeder Entität im Feld "type" genau einen dieser Typen an.
+
+{type_rules}
+
+WICHTIG:
+- NUR die oben genannten Typen verwenden
+- Exakte Namen aus dem Text verwenden
+- Keine Duplikate
+
+{format_instructions}
+"""
+
+    prompt = PromptTemplate(
+        template=template,
+        input_variables=["text", "node_types", "section_title", "type_rules"],
+        partial_variables={"format_instructions": parser.get_format_instructions()}
+    )
+    
+    chain = prompt | structured_llm(llm, NodeList, output_mode) | parser
+
+    log(f"🔍 Suche [{', '.join(ALLOWED_NODES)}] in einem Call...", indent=2)
+    
+    try:
+        result = chain.invoke({
+            "text": text,
+            "node_types": ", ".join(ALLOWED_NODES),
+            "section_title": section_title,
+            "type_rules": "\n\n".join(TYPE_RULES[t] for t in ALLOWED_NODES if t in TYPE_RULES)
+        })
+    except Exception as e:
+        _count_error()
+        log(f"❌ FEHLER bei kombinierter Extraktion: {str(e)[:100]}", indent=2)
+        return []
+    
+    # Typ normalisieren - Groß/Kleinschreibung ist bei kleinen Modellen unzuverlässig
+    allowed = {t.lower(): t for t in ALLOWED_NODES}
+    for node in result.nodes:
+        node_type = allowed.get(node.type.strip().lower())
+        if node_type is None:
+            log(f"⚠️ Unbekannter Typ verworfen: [{node.type}] \"{node.id}\"", indent=2)
+            continue
+        node.type = node_type
+        log_entity(node_type, node.id, section_title)
+        all_nodes.append(node)
+    
+    if len(all_nodes) == 0:
+        log("   (keine gefunden)", indent=2)
+    
+    return all_nodes
+
+
+def extract_relationships(llm, text: str, nodes: List[ExtractedNode], section_title: str,
+                          output_mode: str = OUTPUT_MODE) -> List[ExtractedRelationship]:
     """Extrahiert Beziehungen zwischen gefundenen Knoten."""
     
     if len(nodes) < 2:
         log("⏭️ Zu wenige Knoten für Beziehungen", indent=2)
         return []
     
-    parser = PydanticOutputParser(pydantic_object=RelationshipList)
+    parser = make_parser(RelationshipList, output_mode, parse_stats)
     
     # Knoten-Liste formatieren
     nodes_by_type = {}
@@ -280,13 +435,13 @@ REGELN:
         partial_variables={"format_instructions": parser.get_format_instructions()}
     )
     
-    chain = prompt | llm | parser
+    chain = prompt | structured_llm(llm, RelationshipList, output_mode) | parser
     
     log(f"🔗 Suche Beziehungen zwischen {len(nodes)} Knoten...", indent=2)
     
     try:
         result = chain.invoke({
-            "text": text[:4000],
+            "text": text,
             "node_list": node_list_str,
             "section_title": section_title
         })
@@ -301,9 +456,154 @@ REGELN:
         return result.relationships
         
     except Exception as e:
+        _count_error()
         log(f"❌ FEHLER bei Beziehungen: {str(e)[:100]}", indent=2)
         return []
 
+def section_windows(section: Dict[str, str]) -> List[TextWindow]:
+    """
+    Zerlegt einen Abschnitt in überlappende Token-Fenster, die den ganzen Text
+    abdecken. Zu kurze Abschnitte liefern keine Fenster.
+    """
+    if len(section['content']) < 100:
+        return []
+    return make_windows(section['content'], WINDOW_TOKENS, WINDOW_OVERLAP_TOKENS)
+
+
+def merge_window_results(results: List[Tuple[List[ExtractedNode], List[ExtractedRelationship]]]
+                         ) -> Tuple[List[ExtractedNode], List[ExtractedRelationship]]:
+    """Fenster-Ergebnisse eines Abschnitts mergen (Overlap erzeugt Dubletten)."""
+    nodes, rels = [], []
+    seen_nodes, seen_rels = set(), set()
+    for window_nodes, window_rels in results:
+        for n in window_nodes:
+            key = (n.type, normalize_id(n.id))
+            if key not in seen_nodes:
+                seen_nodes.add(key)
+                nodes.append(n)
+        for r in window_rels:
+            key = (normalize_id(r.source), r.relation_type, normalize_id(r.target))
+            if key not in seen_rels:
+                seen_rels.add(key)
+                rels.append(r)
+    return nodes, rels
+
+
+def extract_all_sections(llm, sections: List[Dict[str, str]],
+                         node_workers: int = NODE_WORKERS, rel_workers: int = REL_WORKERS,
+                         mode: str = EXTRACTION_MODE, output_mode: str = OUTPUT_MODE,
+                         keys: List[str] = None, fingerprints: List[str] = None,
+                         checkpoint: ExtractionCheckpoint = None,
+                         stats: PipelineStats = None):
+    """
+    Extrahiert alle Abschnitte als zweistufige Pipeline über ihre Fenster:
+
+        Fenster ──> Knoten-Stufe ──Queue(PIPELINE_QUEUE_SIZE)──> Beziehungs-Stufe
+
+    Während die Beziehungen von Fenster i extrahiert werden, laufen schon die
+    Knoten-Calls für Fenster i+1 (auch über Abschnittsgrenzen hinweg).
+
+    Liefert (nodes, rels) pro Abschnitt als Generator - immer in der
+    Reihenfolge von `sections`, egal welches Fenster zuerst fertig wird.
+    Dadurch bleibt das Ergebnis von merge_entities reproduzierbar.
+    
+    Mit `checkpoint` (+ keys/fingerprints pro Abschnitt) werden Abschnitte aus
+    dem Checkpoint übernommen und neue Ergebnisse sofort dort angehängt.
+    Abschnitte mit fehlgeschlagenen LLM-Calls landen NICHT im Checkpoint und
+    werden beim nächsten --resume erneut extrahiert.
+    """
+    total = len(sections)
+    
+    # Abschnitte aus dem Checkpoint brauchen keine LLM-Calls
+    cached = {}
+    windows_per_section: Dict[int, List[TextWindow]] = {}
+    for i, section in enumerate(sections):
+        if checkpoint is not None:
+            data = checkpoint.get(keys[i], fingerprints[i])
+            if data is not None:
+                log(f"♻️  [{i+1}/{total}] {section['title']}: aus Checkpoint übernommen")
+                cached[i] = ([ExtractedNode.model_validate(n) for n in data["nodes"]],
+                             [ExtractedRelationship.model_validate(r) for r in data["relationships"]])
+                continue
+        windows = section_windows(section)
+        windows_per_section[i] = windows
+        coverage_stats.add(covered_chars(windows), 0, 0.0)
+    
+    def window_prefix(i: int, window: TextWindow) -> str:
+        if len(windows_per_section[i]) > 1:
+            return f"[{i+1}/{total}](F{window.index+1}) "
+        return f"[{i+1}/{total}] "
+    
+    def node_stage(task: Tuple[int, TextWindow]):
+        i, window = task
+        _log_context.prefix = window_prefix(i, window)
+        _log_context.errors = 0
+        start = time.perf_counter()
+        try:
+            if window.index == 0:
+                print(f"\n{'─'*70}", flush=True)
+                log(f"📄 ABSCHNITT [{i+1}/{total}]: {sections[i]['title']}")
+                print(f"{'─'*70}", flush=True)
+                if len(windows_per_section[i]) > 1:
+                    log(f"🪟 {len(windows_per_section[i])} Fenster à max. {WINDOW_TOKENS} Tokens "
+                        f"({WINDOW_OVERLAP_TOKENS} Overlap)")
+            
+            log("\n   === KNOTEN ===")
+            nodes = extract_nodes(llm, window.text, sections[i]['title'], mode, output_mode)
+            return i, window, nodes, _log_context.errors, time.perf_counter() - start
+        finally:
+            _log_context.prefix = ""
+    
+    def rel_stage(item):
+        i, window, nodes, errors, node_seconds = item
+        _log_context.prefix = window_prefix(i, window)
+        _log_context.errors = 0
+        start = time.perf_counter()
+        try:
+            log("\n   === BEZIEHUNGEN ===")
+            rels = extract_relationships(llm, window.text, nodes, sections[i]['title'], output_mode)
+            coverage_stats.add(0, 1, node_seconds + time.perf_counter() - start)
+            return nodes, rels, errors + _log_context.errors
+        finally:
+            _log_context.prefix = ""
+    
+    tasks = [(i, w) for i, windows in windows_per_section.items() for w in windows]
+    log(f"⚙️  Pipeline: {len(tasks)} Fenster, {node_workers} Knoten-Worker -> "
+        f"Queue({PIPELINE_QUEUE_SIZE}) -> {rel_workers} Beziehungs-Worker")
+    results = run_pipeline(tasks, [Stage("Knoten", node_stage, node_workers),
+                                   Stage("Beziehungen", rel_stage, rel_workers)],
+                           PIPELINE_QUEUE_SIZE, stats)
+    
+    try:
+        for i, section in enumerate(sections):
+            if i in cached:
+                yield cached[i]
+                continue
+            
+            if not windows_per_section[i]:
+                log(f"⏭️ [{i+1}/{total}] {section['title']}: übersprungen (zu kurz)")
+            
+            # Die Pipeline liefert in Eingabe-Reihenfolge -> die nächsten
+            # len(windows) Ergebnisse gehören zu diesem Abschnitt
+            window_results = [next(results) for _ in windows_per_section[i]]
+            errors = sum(e for _, _, e in window_results)
+            nodes, rels = merge_window_results([(n, r) for n, r, _ in window_results])
+            
+            if checkpoint is not None:
+                if errors:
+                    log(f"⚠️  [{i+1}/{total}] {errors} fehlgeschlagene LLM-Calls "
+                        f"- Abschnitt wird nicht gecheckpointet")
+                else:
+                    checkpoint.append(keys[i], fingerprints[i], {
+                        "nodes": [n.model_dump() for n in nodes],
+                        "relationships": [r.model_dump() for r in rels],
+                    })
+            yield nodes, rels
+    finally:
+        # run_pipeline wird nie ausgeschöpft (genau len(windows) next() pro
+        # Abschnitt) -> schließen, damit PipelineStats.wall_s final ist
+        results.close()
+
 # =============================================================================
 # ENTITY MERGING
 # =============================================================================
@@ -330,23 +630,245 @@ def normalize_id(entity_id: str) -> str:
     return normalized
 
 
-def merge_entities(all_nodes: List[ExtractedNode]) -> List[ExtractedNode]:
-    """Führt Duplikate zusammen."""
-    seen = {}
+def merge_entities(all_nodes: List[ExtractedNode],
+                   seen: Dict[str, ExtractedNode] = None) -> List[ExtractedNode]:
+    """
+    Führt Duplikate zusammen (die erste Schreibweise gewinnt).
+    
+    Mit `seen` (normalisierte ID -> Entity) wird über mehrere Aufrufe hinweg
+    gemerged - zurück kommen nur die Entities, die noch nicht bekannt waren.
+    """
+    if seen is None:
+        seen = {}
+    new_nodes = []
     
     for node in all_nodes:
         norm_id = normalize_id(node.id)
         if norm_id not in seen:
             seen[norm_id] = node
+            new_nodes.append(node)
     
-    return list(seen.values())
+    return new_nodes
+
+# =============================================================================
+# GRAPH WRITE (Streaming pro Abschnitt, Fingerprints + Provenienz)
+# =============================================================================
+#
+# Jeder fertig extrahierte Abschnitt wird sofort per UNWIND/MERGE geschrieben
+# (graph_writer.StreamingGraphWriter) - im Speicher bleibt nur die Map der
+# bekannten Entities, nicht die Liste aller Knoten und Beziehungen.
+#
+# Jeder Knoten und jede Beziehung merkt sich in `sections`, aus welchen
+# Abschnitten sie stammt. Pro Abschnitt liegt ein (:SectionState) Knoten mit
+# dem Fingerprint des Inhalts in der DB. Beim inkrementellen Lauf werden nur
+# neue/geänderte Abschnitte neu extrahiert und nur deren Fakten zurückgezogen.
+
+SECTION_STATE_LABEL = "SectionState"
+
+
+def section_keys(sections: List[Dict[str, str]]) -> List[str]:
+    """Stabiler Schlüssel pro Abschnitt (Titel, bei Dubletten mit Zähler)."""
+    keys = []
+    seen: Dict[str, int] = {}
+    for s in sections:
+        title = s["title"]
+        seen[title] = seen.get(title, 0) + 1
+        keys.append(title if seen[title] == 1 else f"{title} #{seen[title]}")
+    return keys
+
+
+def section_fingerprint(section: Dict[str, str], mode: str, output_mode: str = OUTPUT_MODE) -> str:
+    """
+    Hash über Inhalt + Modell + Extraktions-/Output-Modus + Fenstergrößen -
+    ändert sich einer davon, wird neu extrahiert (auch bei --resume).
+    """
+    digest = hashlib.sha256()
+    for part in (MODEL_NAME, mode, output_mode, str(WINDOW_TOKENS), str(WINDOW_OVERLAP_TOKENS),
+                 section["title"], section["content"]):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def load_section_states(graph) -> Dict[str, str]:
+    rows = graph.query(f"MATCH (s:{SECTION_STATE_LABEL}) RETURN s.key AS key, s.fingerprint AS fingerprint")
+    return {r["key"]: r["fingerprint"] for r in rows}
+
+
+def save_section_states(graph, states: Dict[str, str], removed: List[str]):
+    if removed:
+        graph.query(f"MATCH (s:{SECTION_STATE_LABEL}) WHERE s.key IN $keys DELETE s",
+                    params={"keys": removed})
+    if states:
+        graph.query(f"""
+            UNWIND $rows AS row
+            MERGE (s:{SECTION_STATE_LABEL} {{key: row.key}})
+            SET s.fingerprint = row.fingerprint
+        """, params={"rows": [{"key": k, "fingerprint": fp} for k, fp in states.items()]})
+
+
+def retract_sections(graph, keys: List[str]) -> Dict[str, int]:
+    """
+    Entfernt die Fakten der Abschnitte; was dann keine Quelle mehr hat, wird
+    gelöscht. Knoten mit Beziehungen, die andere Abschnitte noch belegen,
+    bleiben stehen (Graphen von vor der Endpunkt-Provenienz).
+    """
+    rels = graph.query("""
+        MATCH ()-[r]->()
+        WHERE r.sections IS NOT NULL AND any(s IN r.sections WHERE s IN $keys)
+        SET r.sections = [s IN r.sections WHERE NOT s IN $keys]
+        WITH r WHERE size(r.sections) = 0
+        DELETE r
+        RETURN count(*) AS deleted
+    """, params={"keys": keys})
+    nodes = graph.query("""
+        MATCH (n:Entity)
+        WHERE n.sections IS NOT NULL AND any(s IN n.sections WHERE s IN $keys)
+        SET n.sections = [s IN n.sections WHERE NOT s IN $keys]
+        WITH n WHERE size(n.sections) = 0
+          AND NOT EXISTS { (n)-[r]-() WHERE size(coalesce(r.sections, [])) > 0 }
+        DETACH DELETE n
+        RETURN count(*) AS deleted
+    """, params={"keys": keys})
+    return {"relationships": rels[0]["deleted"], "nodes": nodes[0]["deleted"]}
+
+
+def load_existing_entities(graph) -> Dict[str, ExtractedNode]:
+    """Bereits gespeicherte Entities, nach normalisierter ID."""
+    rows = graph.query("""
+        MATCH (n:Entity) WHERE n.sections IS NOT NULL
+        RETURN n.id AS id, [l IN labels(n) WHERE l <> 'Entity'][0] AS type
+    """)
+    return {normalize_id(r["id"]): ExtractedNode(id=r["id"], type=r["type"]) for r in rows}
+
+
+def resolve_section_entities(nodes: List[ExtractedNode], entities: Dict[str, ExtractedNode],
+                             resolver: EntityResolver, graph=None
+                             ) -> Tuple[Dict[str, str], Dict[str, List[float]]]:
+    """
+    Fuzzy Resolution eines Abschnitts: unbekannte Namen werden (optional erst
+    gegen Neo4j über entity_index, dann lokal) auf kanonische Namen abgebildet.
+    Die Knoten werden in place umbenannt.
+
+    Liefert Aliase (normalisierter Originalname -> normalisierter kanonischer
+    Name), damit auch die Beziehungsenden umgebogen werden können, und die
+    Embeddings der unbekannten Namen (normalisierte ID -> Vektor) für den
+    BackgroundEmbedder - jeder Name wird nur einmal eingebettet.
+    """
+    unknown = list(dict.fromkeys((n.id, n.type) for n in nodes if normalize_id(n.id) not in entities))
+    canonical: Dict[Tuple[str, str], str] = {}
+    vectors = dict(zip(unknown, resolver.embed_fn([name for name, _ in unknown]))) if unknown else {}
+    
+    if graph is not None and unknown:
+        matches = resolve_against_graph(graph, resolver, unknown, vectors=vectors)
+        for (name, node_type), existing_id in matches.items():
+            canonical[(name, node_type)] = existing_id
+            entities.setdefault(normalize_id(existing_id), ExtractedNode(id=existing_id, type=node_type))
+    
+    remaining = [m for m in unknown if m not in canonical]
+    if remaining:
+        canonical.update(resolver.resolve(remaining, vectors=vectors))
+    
+    aliases = {}
+    for n in nodes:
+        target = canonical.get((n.id, n.type), n.id)
+        if normalize_id(target) != normalize_id(n.id):
+            log(f"      🔀 ALIAS: [{n.type}] \"{n.id}\" -> \"{target}\"")
+            aliases[normalize_id(n.id)] = normalize_id(target)
+            n.id = target
+    return aliases, {normalize_id(name): vector for (name, _), vector in vectors.items()}
+
+
+def prepare_section_write(key: str, nodes: List[ExtractedNode], rels: List[ExtractedRelationship],
+                          entities: Dict[str, ExtractedNode], aliases: Dict[str, str] = None):
+    """
+    Merged einen Abschnitt gegen alle bisher bekannten Entities und baut die
+    Schreib-Batches (gruppiert nach Label bzw. Beziehungstyp).
+
+    Liefert (node_rows, rel_rows, neue Entities, Anzahl ungültiger Beziehungen).
+    
+    Auch Beziehungsenden aus anderen Abschnitten bekommen `key` in ihre
+    sections - sonst löscht retract_sections() den Knoten samt dieser
+    Beziehung, sobald sein letzter eigener Abschnitt neu extrahiert wird.
+    """
+    aliases = aliases or {}
+    new_entities = merge_entities(nodes, entities)
+    
+    node_rows: Dict[str, List[dict]] = {}
+    written = set()
+    
+    def tag(canonical: ExtractedNode):
+        if canonical.id in written:
+            return
+        written.add(canonical.id)
+        node_rows.setdefault(canonical.type, []).append(
+            node_row(canonical.id, {"name": canonical.id}, [key]))
+    
+    for n in nodes:
+        tag(entities[normalize_id(n.id)])
+    
+    rel_rows: Dict[Tuple[str, str, str], List[dict]] = {}
+    seen_rels = set()
+    invalid = 0
+    for rel in rels:
+        src_norm, tgt_norm = normalize_id(rel.source), normalize_id(rel.target)
+        src = entities.get(aliases.get(src_norm, src_norm))
+        tgt = entities.get(aliases.get(tgt_norm, tgt_norm))
+        
+        if src is None or tgt is None:
+            log(f"      ❌ INVALID: {rel.source} --[{rel.relation_type}]--> {rel.target}")
+            invalid += 1
+            continue
+        
+        rel_key = (src.id, rel.relation_type, tgt.id)
+        if rel_key in seen_rels:
+            continue
+        seen_rels.add(rel_key)
+        
+        tag(src)
+        tag(tgt)
+        props = {"time": rel.time} if rel.time else {}
+        rel_rows.setdefault((rel.relation_type, src.type, tgt.type), []).append(
+            rel_row(src.id, tgt.id, props, [key]))
+    
+    return node_rows, rel_rows, new_entities, invalid
+
+
+def ensure_vector_index(graph, vector_dim: int):
+    """CREATE ... IF NOT EXISTS - ein bestehender Index bleibt online."""
+    graph.query(f"""
+        CREATE VECTOR INDEX entity_index IF NOT EXISTS
+        FOR (n:Entity) ON (n.embedding)
+        OPTIONS {{indexConfig: {{
+          `vector.dimensions`: {vector_dim},
+          `vector.similarity_function`: 'cosine'
+        }}}}
+    """)
 
 # =============================================================================
 # MAIN PIPELINE
 # =============================================================================
 
-def build_graph(file_path: str):
-    """Hauptfunktion."""
+def build_graph(file_path: str, node_workers: int = NODE_WORKERS, rel_workers: int = REL_WORKERS,
+                mode: str = EXTRACTION_MODE, use_cache: bool = True,
+                incremental: bool = False, resolution: str = RESOLUTION_MODE,
+                resume: bool = False, output_mode: str = OUTPUT_MODE):
+    """
+    Hauptfunktion.
+
+    Jeder Abschnitt wird direkt nach seiner Extraktion gemerged, eingebettet
+    und nach Neo4j geschrieben (StreamingGraphWriter). Der Graph ist also schon
+    während des Builds abfragbar, und ein Abbruch verliert nur die offenen
+    Abschnitte.
+
+    incremental=False: Graph komplett löschen und alles neu extrahieren.
+    incremental=True:  Nur neue/geänderte Abschnitte extrahieren, deren alte
+                       Fakten zurückziehen; Graph und Vector Index bleiben online.
+    
+    resume=True: Extraktionsergebnisse aus dem Checkpoint des letzten
+                 (abgebrochenen) Laufs übernehmen; nur fehlende Abschnitte
+                 gehen ans LLM. Geschrieben wird trotzdem alles.
+    """
     
     print("\n" + "="*70, flush=True)
     print("🕵️  KRIMI GRAPH BUILDER - VERBOSE MODE", flush=True)
@@ -361,16 +883,32 @@ def build_graph(file_path: str):
         password=os.getenv("NEO4J_PASSWORD")
     )
     
-    log("   Lösche alte Daten...")
-    graph.query("MATCH (n) DETACH DELETE n")
-    try:
-        graph.query("DROP INDEX entity_index")
-    except:
-        pass
+    if incremental:
+        log("   Inkrementeller Modus - bestehender Graph bleibt erhalten")
+    else:
+        log("   Lösche alte Daten...")
+        graph.query("MATCH (n) DETACH DELETE n")
+        try:
+            graph.query("DROP INDEX entity_index")
+        except:
+            pass
+    
+    # Constraints/Indizes für alle Typen; den Vector Index legt on_dimension an,
+    # sobald die echte Embedding-Dimension bekannt ist
+    ensure_schema(graph, ALLOWED_NODES, vector_dim=None, log=log)
     
-    llm = ChatOllama(model=MODEL_NAME, temperature=0)
-    embedder = OllamaEmbeddings(model=EMBEDDING_MODEL)
+    llm_cache = None
+    if use_cache and LLM_CACHE_DIR:
+        llm_cache = DiskLRUCache(LLM_CACHE_DIR, max_mb=LLM_CACHE_MAX_MB, params=LLM_PARAMS)
+        log(f"   LLM-Cache: {LLM_CACHE_DIR} ({llm_cache.stats()['entries']} Einträge)")
+    
+    # Beide laufen über die adaptiven Limiter "chat"/"embed"
+    chat_limiter = shared_limiter("chat", max_limit=node_workers + rel_workers, log=log)
+    embed_limiter = shared_limiter("embed", log=log)
+    llm = LimitedChatOllama(**LLM_PARAMS, cache=llm_cache, limiter=chat_limiter)
+    embedder = LimitedOllamaEmbeddings(model=EMBEDDING_MODEL, limiter=embed_limiter)
     log(f"   Modell: {MODEL_NAME}")
+    log(f"   Extraktionsmodus: {mode} (Output: {output_mode})")
     
     # --- 2. Lade Text ---
     log(f"\n📂 LADE DATEI: {file_path}")
@@ -386,146 +924,156 @@ def build_graph(file_path: str):
     # --- 3. Chunking ---
     log("\n✂️  CHUNKING...")
     sections = split_into_sections(full_text)
+    keys = section_keys(sections)
+    fingerprints = {k: section_fingerprint(s, mode, output_mode) for k, s in zip(keys, sections)}
     log(f"   {len(sections)} Abschnitte gefunden:")
     for i, s in enumerate(sections):
         log(f"   [{i+1}] {s['title'][:50]} ({len(s['content'])} Zeichen)")
     
-    # --- 4. Extraktion ---
-    print("\n" + "="*70, flush=True)
-    print("🔬 STARTE EXTRAKTION", flush=True)
-    print("="*70, flush=True)
-    
-    all_nodes: List[ExtractedNode] = []
-    all_rels: List[ExtractedRelationship] = []
+    # --- 3b. Änderungen bestimmen ---
+    stored_states = load_section_states(graph) if incremental else {}
+    changed_keys = [k for k in keys if stored_states.get(k) != fingerprints[k]]
+    removed_keys = [k for k in stored_states if k not in fingerprints]
     
-    for i, section in enumerate(sections):
-        print(f"\n{'─'*70}", flush=True)
-        print(f"📄 ABSCHNITT [{i+1}/{len(sections)}]: {section['title']}", flush=True)
-        print(f"{'─'*70}", flush=True)
+    if incremental:
+        log(f"\n🧮 ÄNDERUNGEN: {len(changed_keys)} neu/geändert, "
+            f"{len(removed_keys)} entfernt, {len(keys) - len(changed_keys)} unverändert")
+        for k in changed_keys:
+            log(f"   ✏️  {k}")
+        for k in removed_keys:
+            log(f"   🗑️  {k}")
         
-        if len(section['content']) < 100:
-            log("⏭️ Übersprungen (zu kurz)")
-            continue
-        
-        # Knoten extrahieren
-        log("\n   === KNOTEN ===")
-        nodes = extract_nodes(llm, section['content'], section['title'])
-        all_nodes.extend(nodes)
-        
-        # Beziehungen extrahieren
-        log("\n   === BEZIEHUNGEN ===")
-        rels = extract_relationships(llm, section['content'], nodes, section['title'])
-        all_rels.extend(rels)
-        
-        # Zwischenstand
-        log(f"\n   📊 Zwischenstand: {len(all_nodes)} Knoten, {len(all_rels)} Beziehungen total")
+        if changed_keys or removed_keys:
+            retracted = retract_sections(graph, changed_keys + removed_keys)
+            log(f"   Zurückgezogen: {retracted['nodes']} Knoten, "
+                f"{retracted['relationships']} Beziehungen")
+            save_section_states(graph, {}, removed_keys)
+            bump_graph_version(graph)
     
-    # --- 5. Merging ---
-    print("\n" + "="*70, flush=True)
-    print("🔀 ENTITY MERGING", flush=True)
-    print("="*70, flush=True)
+    changed = set(changed_keys)
+    todo = [(k, s) for k, s in zip(keys, sections) if k in changed]
     
-    merged_nodes = merge_entities(all_nodes)
-    log(f"   Vorher: {len(all_nodes)} Knoten")
-    log(f"   Nachher: {len(merged_nodes)} unique Knoten")
-    
-    # Alle finalen Entities auflisten
-    log("\n   FINALE ENTITIES:")
-    for n in merged_nodes:
-        log(f"      [{n.type}] {n.id}")
-    
-    # Node-Map für Validierung
-    valid_ids = {normalize_id(n.id) for n in merged_nodes}
-    id_map = {normalize_id(n.id): n.id for n in merged_nodes}
-    
-    # Relationships validieren
-    valid_rels = []
-    log("\n   VALIDIERE BEZIEHUNGEN:")
-    for rel in all_rels:
-        src_norm = normalize_id(rel.source)
-        tgt_norm = normalize_id(rel.target)
-        
-        if src_norm in valid_ids and tgt_norm in valid_ids:
-            rel.source = id_map[src_norm]
-            rel.target = id_map[tgt_norm]
-            valid_rels.append(rel)
-            log(f"      ✅ {rel.source} --[{rel.relation_type}]--> {rel.target}")
-        else:
-            log(f"      ❌ INVALID: {rel.source} --[{rel.relation_type}]--> {rel.target}")
+    # Bekannte Entities (normalisierte ID -> Entity). Im inkrementellen Modus
+    # gewinnt die Schreibweise/der Typ, der schon in der DB steht.
+    entities: Dict[str, ExtractedNode] = load_existing_entities(graph) if incremental else {}
+    known_before = len(entities)
     
-    log(f"\n   {len(valid_rels)} von {len(all_rels)} Beziehungen valide")
+    checkpoint = ExtractionCheckpoint(CHECKPOINT_PATH, resume=resume)
+    if resume:
+        log(f"\n♻️  RESUME: {len(checkpoint)} Abschnitte im Checkpoint {CHECKPOINT_PATH}")
     
-    # --- 6. Graph Document ---
+    # --- 4. Extraktion + Streaming-Write ---
     print("\n" + "="*70, flush=True)
-    print("🏗️  ERSTELLE GRAPH DOCUMENT", flush=True)
+    print("🔬 STARTE EXTRAKTION (Streaming nach Neo4j)", flush=True)
     print("="*70, flush=True)
     
-    lc_nodes = [LCNode(id=n.id, type=n.type) for n in merged_nodes]
-    node_map = {n.id: n for n in lc_nodes}
-    
-    lc_rels = []
-    for rel in valid_rels:
-        if rel.source in node_map and rel.target in node_map:
-            lc_rel = LCRel(
-                source=node_map[rel.source],
-                target=node_map[rel.target],
-                type=rel.relation_type
-            )
-            if rel.time:
-                lc_rel.properties = {"time": rel.time}
-            lc_rels.append(lc_rel)
-    
-    graph_doc = GraphDocument(
-        nodes=lc_nodes,
-        relationships=lc_rels,
-        source=Document(page_content="Krimi Case File")
-    )
+    global coverage_stats
+    coverage_stats = CoverageStats()
+    parse_stats.reset()
+    pipeline_stats = PipelineStats()
     
-    # --- 7. Embeddings ---
-    print("\n" + "="*70, flush=True)
-    print("⚡ BERECHNE EMBEDDINGS", flush=True)
-    print("="*70, flush=True)
+    resolver = None
+    if resolution == "fuzzy":
+        resolver = EntityResolver(embedder.embed_documents)
+        log("   🧩 Fuzzy Entity Resolution aktiv")
     
-    for node in graph_doc.nodes:
-        log(f"   Embedding für: {node.id}...")
-        node.properties["name"] = node.id
-        node.properties["embedding"] = embedder.embed_query(node.id)
+    writer = StreamingGraphWriter(graph)
+    extracted_nodes = 0
+    extracted_rels = 0
+    invalid_rels = 0
+    rel_type_counts: Dict[str, int] = {}
     
-    # --- 8. Speichern ---
-    print("\n" + "="*70, flush=True)
-    print("💾 SPEICHERE IN NEO4J", flush=True)
-    print("="*70, flush=True)
+    # Embeddings laufen parallel zur Extraktion in einem eigenen Thread
+    def on_dimension(vector_dim: int):
+        ensure_vector_index(graph, vector_dim)
+        log(f"   Vector Index bereit (dim={vector_dim})")
+    
+    embed_worker = BackgroundEmbedder(embedder, graph, normalize=normalize_id,
+                                      on_dimension=on_dimension, log=log)
+    if incremental:
+        # Nur Knoten mit Embedding gelten als erledigt; fehlende (z.B. aus einem
+        # Lauf mit fehlgeschlagenen Batches) werden jetzt nachgeholt
+        embedded_ids = {r["id"] for r in graph.query(
+            "MATCH (n:Entity) WHERE n.embedding IS NOT NULL RETURN n.id AS id")}
+        embed_worker.mark_seen(embedded_ids)
+        embed_worker.submit((n.id, n.type) for n in entities.values() if n.id not in embedded_ids)
     
-    graph.add_graph_documents([graph_doc])
-    log("   Graph Documents gespeichert")
+    results = extract_all_sections(llm, [s for _, s in todo], node_workers, rel_workers, mode, output_mode,
+                                   keys=[k for k, _ in todo],
+                                   fingerprints=[fingerprints[k] for k, _ in todo],
+                                   checkpoint=checkpoint, stats=pipeline_stats)
+    for (key, _), (nodes, rels) in zip(todo, results):
+        extracted_nodes += len(nodes)
+        extracted_rels += len(rels)
+        
+        aliases, vectors = {}, {}
+        if resolver is not None:
+            aliases, vectors = resolve_section_entities(nodes, entities, resolver,
+                                                        graph if incremental else None)
+        
+        node_rows, rel_rows, new_entities, invalid = prepare_section_write(key, nodes, rels, entities, aliases)
+        invalid_rels += invalid
+        
+        writer.write(node_rows, rel_rows)
+        # Pro Abschnitt bumpen - sonst cachen Leser den Zwischenstand unter der alten Version
+        bump_graph_version(graph)
+        
+        # Neue Entities stehen jetzt in der DB -> an den Embedding-Thread übergeben
+        embed_worker.submit(((n.id, n.type) for n in new_entities), vectors)
+        
+        # Fingerprint erst nach erfolgreichem Schreiben sichern - bricht der Lauf
+        # vorher ab, wird der Abschnitt beim nächsten Mal erneut verarbeitet.
+        save_section_states(graph, {key: fingerprints[key]}, [])
+        
+        for (rel_type, _, _), rows in rel_rows.items():
+            rel_type_counts[rel_type] = rel_type_counts.get(rel_type, 0) + len(rows)
+        
+        # Zwischenstand
+        log(f"\n   💾 Gespeichert: {sum(len(r) for r in node_rows.values())} Knoten "
+            f"({len(new_entities)} neu), {sum(len(r) for r in rel_rows.values())} Beziehungen")
+        log(f"   📊 Zwischenstand: {len(entities)} unique Knoten, "
+            f"{writer.rels_written} Beziehungen geschrieben")
     
-    # Index
-    graph.query("MATCH (n) WHERE n.embedding IS NOT NULL SET n:Entity")
+    # --- 5. Restliche Embeddings abwarten ---
+    log(f"\n⚡ Warte auf Embeddings ({embed_worker.stats()['pending']} ausstehend)...")
+    wait_start = time.perf_counter()
+    embed_stats = embed_worker.close()
+    wait_s = time.perf_counter() - wait_start
+    # Embeddings stehen jetzt vollständig in der DB (LocalVectorIndex lädt nach)
+    bump_graph_version(graph)
     
-    if graph_doc.nodes:
-        vector_dim = len(graph_doc.nodes[0].properties["embedding"])
-        graph.query(f"""
-            CREATE VECTOR INDEX entity_index IF NOT EXISTS
-            FOR (n:Entity) ON (n.embedding)
-            OPTIONS {{indexConfig: {{
-              `vector.dimensions`: {vector_dim},
-              `vector.similarity_function`: 'cosine'
-            }}}}
-        """)
-        log(f"   Vector Index erstellt (dim={vector_dim})")
-    
-    # --- 9. FINALE ZUSAMMENFASSUNG ---
+    # --- 6. FINALE ZUSAMMENFASSUNG ---
     print("\n" + "="*70, flush=True)
     print("🎉 FERTIG! ZUSAMMENFASSUNG", flush=True)
     print("="*70, flush=True)
     
+    new_total = len(entities) - known_before
     print(f"\n📊 STATISTIK:")
-    print(f"   Knoten total: {len(lc_nodes)}")
-    print(f"   Beziehungen total: {len(lc_rels)}")
+    if incremental:
+        print(f"   Neu extrahierte Abschnitte: {len(changed_keys)} von {len(keys)}")
+    print(f"   Extrahierte Knoten: {extracted_nodes} -> {new_total} neue unique Knoten")
+    print(f"   Extrahierte Beziehungen: {extracted_rels} ({invalid_rels} ungültig verworfen)")
+    print(f"   DB-Writes: {writer.queries} UNWIND-Batches")
+    print(f"   Durchsatz: {coverage_stats.summary()}")
+    print(f"   Parser: {parse_stats.summary()}")
+    print(f"   Ollama: {chat_limiter.summary()}")
+    print(f"           {embed_limiter.summary()}")
+    for line in pipeline_stats.report().splitlines():
+        print(f"   {line}")
+    print(f"   {checkpoint.summary()}")
+    if resolver is not None:
+        r = resolver.stats()
+        print(f"   Fuzzy Resolution: {r['merges']} Varianten zusammengeführt, "
+              f"{r['pairs_compared']} Paare verglichen")
+    print(f"   Embeddings: {embed_stats['embedded']} in {embed_stats['batches']} Batches "
+          f"({embed_stats['busy_s']:.1f}s im Hintergrund, {wait_s:.1f}s Wartezeit am Ende)")
+    if embed_stats["errors"]:
+        print(f"   ⚠️  Embedding-Fehler: {embed_stats['errors']} fehlgeschlagene Versuche, "
+              f"{embed_stats['failed']} Entities ohne Embedding (nächster --incremental Lauf holt sie nach)")
     
-    print(f"\n📋 ALLE KNOTEN:")
+    print("\n📋 NEUE KNOTEN:")
     type_counts = {}
-    for n in lc_nodes:
+    for n in list(entities.values())[known_before:]:
         type_counts[n.type] = type_counts.get(n.type, 0) + 1
         print(f"   [{n.type}] {n.id}")
     
@@ -533,16 +1081,19 @@ def build_graph(file_path: str):
     for t, c in sorted(type_counts.items()):
         print(f"   {t}: {c}")
     
-    print(f"\n🔗 ALLE BEZIEHUNGEN:")
-    for rel in lc_rels:
-        time_str = f" @{rel.properties.get('time', '')}" if rel.properties else ""
-        print(f"   {rel.source.id} --[{rel.type}]--> {rel.target.id}{time_str}")
+    print("\n🔗 BEZIEHUNGEN NACH TYP:")
+    for t, c in sorted(rel_type_counts.items()):
+        print(f"   {t}: {c}")
+    
+    if llm_cache is not None:
+        print()
+        llm_cache.print_stats()
     
     print("\n" + "="*70, flush=True)
     print("✅ GRAPH ERFOLGREICH ERSTELLT", flush=True)
     print("="*70 + "\n", flush=True)
     
-    return graph_doc
+    return writer.stats()
 
 
 # =============================================================================
@@ -550,4 +1101,25 @@ def build_graph(file_path: str):
 # =============================================================================
 
 if __name__ == "__main__":
-    build_graph(CASE_FILE_PATH)
\ No newline at end of file
+    cli = argparse.ArgumentParser(description="Baut den Krimi-Graphen aus der Fallakte.")
+    cli.add_argument("file", nargs="?", default=CASE_FILE_PATH, help="Pfad zur Fallakte")
+    cli.add_argument("--mode", choices=EXTRACTION_MODES, default=EXTRACTION_MODE,
+                     help="Knoten-Extraktion: ein Call pro Typ oder alle Typen in einem Call")
+    cli.add_argument("--output", choices=OUTPUT_MODES, default=OUTPUT_MODE,
+                     help="JSON-Ausgabe: Ollama-Schema, nur Reparatur oder nur Prompt (alt)")
+    cli.add_argument("--node-workers", type=int, default=NODE_WORKERS,
+                     help="Parallele LLM-Worker der Knoten-Stufe")
+    cli.add_argument("--rel-workers", type=int, default=REL_WORKERS,
+                     help="Parallele LLM-Worker der Beziehungs-Stufe")
+    cli.add_argument("--no-cache", action="store_true", help="LLM-Cache nicht verwenden")
+    cli.add_argument("--incremental", action="store_true",
+                     help="Nur neue/geänderte Abschnitte neu extrahieren statt kompletter Neuaufbau")
+    cli.add_argument("--resolution", choices=RESOLUTION_MODES, default=RESOLUTION_MODE,
+                     help="Entity Resolution: nur exakte Namen oder zusätzlich fuzzy Varianten")
+    cli.add_argument("--resume", action="store_true",
+                     help="Abgebrochenen Lauf fortsetzen: fertige Abschnitte aus dem Checkpoint übernehmen")
+    args = cli.parse_args()
+
+    build_graph(args.file, node_workers=args.node_workers, rel_workers=args.rel_workers, mode=args.mode,
+                use_cache=not args.no_cache, incremental=args.incremental,
+                resolution=args.resolution, resume=args.resume, output_mode=args.output)
\ No newline at end of file
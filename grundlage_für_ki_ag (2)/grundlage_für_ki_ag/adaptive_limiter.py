@@ -0,0 +1,317 @@
+"""
+Adaptive Parallelität für den lokalen Ollama-Server
+===================================================
+
+Statt eine feste Anzahl paralleler Requests zu raten (ragtest/settings.yaml:
+`concurrent_requests: 1`, die LangChain-Builder: gar keine Grenze), misst
+der Limiter laufend Durchsatz und Latenz und stellt das In-Flight-Limit
+nach AIMD nach (Additive Increase / Multiplicative Decrease):
+
+  - Durchsatz (Tokens/s bzw. Texte/s) steigt mit dem letzten +1  -> nochmal +1
+  - Durchsatz steigt nicht mehr                                  -> Schritt zurück, Plateau merken
+  - Latenz pro Token springt (> latency_factor x Bestwert)       -> Limit halbieren
+  - Server antwortet mit 5xx / Timeout / Verbindungsabbruch      -> Limit halbieren
+
+Gemessen wird in Fenstern von `window` abgeschlossenen Requests. Vom Plateau
+aus wird alle `probe_every` Fenster erneut nach oben getastet - die Last auf
+dem Rechner ändert sich ja.
+
+Benutzung:
+
+    llm = LimitedChatOllama(model="gemma3:12b", temperature=0)       # Limiter "chat"
+    embedder = LimitedOllamaEmbeddings(model="nomic-embed-text")     # Limiter "embed"
+    ...
+    print(shared_limiter("chat").summary())
+
+Alle Instanzen im selben Prozess teilen sich pro Name einen Limiter - es gibt
+ja auch nur einen Ollama-Server. Die Anzahl der Worker-Threads im Builder ist
+nur noch die Obergrenze; wie viele davon gleichzeitig ans LLM dürfen,
+entscheidet der Limiter.
+
+Sync- und Async-Calls (invoke/ainvoke, embed_*/aembed_*) belegen dieselben
+Plätze; async wartet per asyncio.sleep, blockiert also den Event-Loop nicht.
+Streaming (stream/astream) läuft am Limiter vorbei.
+"""
+
+import asyncio
+import statistics
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_ollama import ChatOllama, OllamaEmbeddings
+from pydantic import PrivateAttr
+
+# Fehler, die auf einen überlasteten Server hindeuten (Klassennamen aus httpx/ollama)
+OVERLOAD_ERRORS = {"ReadTimeout", "WriteTimeout", "PoolTimeout", "TimeoutException",
+                   "ConnectError", "RemoteProtocolError"}
+ASYNC_POLL_S = 0.05   # Warteintervall von async_slot(), klein gegen jeden LLM-Call
+
+
+def is_overload_error(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int) and status >= 500:
+        return True
+    return type(error).__name__ in OVERLOAD_ERRORS
+
+
+class _Slot:
+    """Ein belegter Platz; `units` = erledigte Arbeit (Tokens, Texte)."""
+
+    def __init__(self):
+        self.units = 0
+        self.start = time.perf_counter()
+
+
+class AdaptiveLimiter:
+    """
+    Begrenzt die Anzahl gleichzeitiger Requests und passt die Grenze per
+    AIMD an gemessenen Durchsatz, Latenz und Fehler an.
+    """
+
+    def __init__(self, name: str = "ollama", initial: int = 2, min_limit: int = 1, max_limit: int = 8,
+                 window: int = 8, min_gain: float = 0.05, latency_factor: float = 3.0,
+                 backoff: float = 0.5, probe_every: int = 10,
+                 log: Optional[Callable[[str], None]] = print):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = max(min_limit, min(initial, max_limit))
+        self.window = window
+        self.min_gain = min_gain
+        self.latency_factor = latency_factor
+        self.backoff = backoff
+        self.probe_every = probe_every
+        self.log = log
+
+        self.in_flight = 0
+        self.completed = 0
+        self.errors = 0
+        self.increases = 0
+        self.decreases = 0
+        self.total_units = 0
+        self.busy_since: Optional[float] = None
+        self.throughput = 0.0          # letztes Fenster, Units/s
+        self.best_latency: Optional[float] = None   # Sekunden pro Unit
+        self.peak_limit = self.limit
+
+        self._cond = threading.Condition()
+        self._reset_window()
+        self._last_throughput = 0.0
+        self._last_action = "start"
+        self._plateau_windows = 0
+
+    # --- Requests ---
+
+    def _try_acquire(self) -> bool:
+        """Belegt einen Platz, falls frei (Aufrufer hält self._cond)."""
+        if self.in_flight >= self.limit:
+            return False
+        self.in_flight += 1
+        if self.busy_since is None:
+            self.busy_since = time.perf_counter()
+        return True
+
+    @contextmanager
+    def slot(self):
+        """Blockiert, bis ein Platz frei ist; misst den Request beim Verlassen."""
+        with self._cond:
+            while not self._try_acquire():
+                self._cond.wait()
+        slot = _Slot()
+        try:
+            yield slot
+        except BaseException as e:
+            self._finish(slot, error=e)
+            raise
+        self._finish(slot)
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """Wie slot(), wartet aber per asyncio.sleep statt den Thread zu blockieren."""
+        while True:
+            with self._cond:
+                if self._try_acquire():
+                    break
+            await asyncio.sleep(ASYNC_POLL_S)
+        slot = _Slot()
+        try:
+            yield slot
+        except BaseException as e:
+            self._finish(slot, error=e)
+            raise
+        self._finish(slot)
+
+    def _finish(self, slot: _Slot, error: BaseException = None):
+        latency = time.perf_counter() - slot.start
+        with self._cond:
+            self.in_flight -= 1
+            if error is not None:
+                if is_overload_error(error):
+                    self.errors += 1
+                    self._decrease(f"Serverfehler ({type(error).__name__})")
+            else:
+                self.completed += 1
+                self.total_units += slot.units
+                self._window_units += slot.units
+                self._window_latencies.append(latency / max(slot.units, 1))
+                if len(self._window_latencies) >= max(self.window, self.limit):
+                    self._adjust()
+            self._cond.notify_all()
+
+    # --- AIMD ---
+
+    def _reset_window(self):
+        self._window_start = time.perf_counter()
+        self._window_units = 0
+        self._window_latencies: List[float] = []
+
+    def _set_limit(self, limit: int, reason: str):
+        limit = max(self.min_limit, min(limit, self.max_limit))
+        if limit == self.limit:
+            return
+        if limit > self.limit:
+            self.increases += 1
+        else:
+            self.decreases += 1
+        if self.log is not None:
+            self.log(f"   🎚️  [{self.name}] Parallelität {self.limit} -> {limit} ({reason})")
+        self.limit = limit
+        self.peak_limit = max(self.peak_limit, limit)
+
+    def _decrease(self, reason: str):
+        self._set_limit(int(self.limit * self.backoff), reason)
+        self._last_action = "decrease"
+        self._last_throughput = 0.0
+        self._reset_window()
+
+    def _adjust(self):
+        elapsed = time.perf_counter() - self._window_start
+        throughput = self._window_units / elapsed if elapsed > 0 else 0.0
+        latency = statistics.median(self._window_latencies)
+        self.throughput = throughput
+        self._reset_window()
+
+        if self.best_latency is None or latency < self.best_latency:
+            self.best_latency = latency
+
+        if latency > self.latency_factor * self.best_latency:
+            self._decrease(f"Latenz {latency * 1000:.0f}ms/Unit > "
+                           f"{self.latency_factor:.0f}x Bestwert")
+            return
+
+        improved = throughput > self._last_throughput * (1 + self.min_gain)
+        if self._last_action == "increase" and not improved:
+            # Der letzte Schritt hat nichts gebracht -> zurück und dort bleiben
+            self._set_limit(self.limit - 1, f"kein Durchsatzgewinn ({throughput:.1f}/s)")
+            self._last_action = "plateau"
+            self._plateau_windows = 0
+        elif self._last_action == "plateau" and self._plateau_windows < self.probe_every:
+            self._plateau_windows += 1
+        else:
+            self._set_limit(self.limit + 1, f"Durchsatz {throughput:.1f}/s")
+            self._last_action = "increase" if self.limit < self.max_limit else "plateau"
+            self._plateau_windows = 0
+        self._last_throughput = throughput
+
+    # --- Auswertung ---
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            elapsed = time.perf_counter() - self.busy_since if self.busy_since else 0.0
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "peak_limit": self.peak_limit,
+                "completed": self.completed,
+                "errors": self.errors,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "throughput": self.throughput,
+                "avg_throughput": self.total_units / elapsed if elapsed else 0.0,
+            }
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (f"[{self.name}] Limit {s['limit']} (max {s['peak_limit']}), {s['completed']} Requests, "
+                f"{s['errors']} Serverfehler, zuletzt {s['throughput']:.1f}/s, "
+                f"Schnitt {s['avg_throughput']:.1f}/s")
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def shared_limiter(name: str, **kwargs) -> AdaptiveLimiter:
+    """Ein Limiter pro Name und Prozess; kwargs gelten nur beim ersten Aufruf."""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = AdaptiveLimiter(name=name, **kwargs)
+        return _limiters[name]
+
+
+class LimitedChatOllama(ChatOllama):
+    """ChatOllama, dessen Calls durch einen AdaptiveLimiter laufen (Units = Output-Tokens)."""
+
+    _limiter: Any = PrivateAttr(default=None)
+
+    def __init__(self, *, limiter: AdaptiveLimiter = None, **kwargs):
+        super().__init__(**kwargs)
+        self._limiter = limiter or shared_limiter("chat")
+
+    @property
+    def limiter(self) -> AdaptiveLimiter:
+        return self._limiter
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        # ChatOllama liefert hier nichts - ohne das stünden Modell und
+        # Temperatur nicht im llm_string und damit nicht im Cache-Key
+        return {"model": self.model, "temperature": self.temperature, "num_ctx": self.num_ctx,
+                "seed": self.seed, "format": self.format}
+
+    @staticmethod
+    def _output_units(result) -> int:
+        message = result.generations[0].message
+        usage = getattr(message, "usage_metadata", None) or {}
+        return usage.get("output_tokens") or max(len(message.content) // 4, 1)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        with self._limiter.slot() as slot:
+            result = super()._generate(messages, stop, run_manager, **kwargs)
+            slot.units = self._output_units(result)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        async with self._limiter.async_slot() as slot:
+            result = await super()._agenerate(messages, stop, run_manager, **kwargs)
+            slot.units = self._output_units(result)
+        return result
+
+
+class LimitedOllamaEmbeddings(OllamaEmbeddings):
+    """OllamaEmbeddings mit AdaptiveLimiter (Units = eingebettete Texte)."""
+
+    _limiter: Any = PrivateAttr(default=None)
+
+    def __init__(self, *, limiter: AdaptiveLimiter = None, **kwargs):
+        super().__init__(**kwargs)
+        self._limiter = limiter or shared_limiter("embed")
+
+    @property
+    def limiter(self) -> AdaptiveLimiter:
+        return self._limiter
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._limiter.slot() as slot:
+            vectors = super().embed_documents(texts)
+            slot.units = len(texts)
+        return vectors
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        # aembed_query läuft in langchain_ollama über aembed_documents
+        async with self._limiter.async_slot() as slot:
+            vectors = await super().aembed_documents(texts)
+            slot.units = len(texts)
+        return vectors
@@ -0,0 +1,278 @@
+"""
+Profiler für ReAct-Agenten: ein Span pro Schritt, Export als Chrome-Trace
+=========================================================================
+
+AgentExecutor(verbose=True) zeigt nur Thought/Action. Wohin die Zeit geht
+(LLM-Decoding, Embedding der Tool-Eingabe, Neo4j), sieht man so nicht.
+
+    profiler = AgentProfiler()
+    embedder = profiler.wrap_embeddings(embedder)     # Spans "embedding"
+    graph = profiler.wrap_graph(graph)                # Spans "cypher" mit Zeilenzahl
+    with profiler.question(frage):
+        agent_executor.invoke({"input": frage}, config={"callbacks": [profiler]})
+    profiler.print_summary()
+    profiler.export_chrome_trace("traces/agent.json")   # chrome://tracing oder ui.perfetto.dev
+
+Ein Schritt beginnt mit jedem LLM-Call (ReAct: LLM -> Tool -> LLM -> ...).
+Pro Schritt: LLM-Latenz, Prompt-/Completion-Tokens und Decode-Zeit (aus den
+Ollama-Metadaten), Tool-Name und -Latenz, darin Embedding- und Cypher-Spans.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+PID = 1
+ARG_CHARS = 200   # Tool-Ein-/Ausgaben im Trace kürzen
+
+
+@dataclass
+class QuestionStats:
+    question: str
+    steps: int = 0
+    wall_s: float = 0.0
+    llm_s: float = 0.0
+    decode_s: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tool_s: float = 0.0
+    tool_calls: int = 0
+    embed_s: float = 0.0
+    embed_calls: int = 0
+    cypher_s: float = 0.0
+    cypher_queries: int = 0
+    cypher_rows: int = 0
+    tools: Dict[str, int] = field(default_factory=dict)
+
+    def other_s(self) -> float:
+        """Zeit im Executor selbst (Parsing, Prompt-Bau, ...)."""
+        return max(0.0, self.wall_s - self.llm_s - self.tool_s)
+
+
+def _token_usage(response: LLMResult) -> Dict[str, float]:
+    """Tokens und Decode-Zeit aus usage_metadata bzw. Ollamas generation_info."""
+    usage = {"prompt_tokens": 0, "completion_tokens": 0, "decode_s": 0.0}
+    for generations in response.generations:
+        for gen in generations:
+            info = gen.generation_info or {}
+            meta = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+            usage["prompt_tokens"] += meta.get("input_tokens") or info.get("prompt_eval_count") or 0
+            usage["completion_tokens"] += meta.get("output_tokens") or info.get("eval_count") or 0
+            usage["decode_s"] += (info.get("eval_duration") or 0) / 1e9
+    return usage
+
+
+class AgentProfiler(BaseCallbackHandler):
+    """Callback-Handler + Wrapper für Embedder und Graph. Thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self.events: List[dict] = []
+        self.questions: List[QuestionStats] = []
+        self._current: Optional[QuestionStats] = None
+        self._open_runs: Dict[UUID, tuple] = {}
+        self._step_start: Optional[float] = None
+
+    # --- Zeit & Events ---
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._t0) * 1e6
+
+    def _emit(self, name: str, cat: str, start_us: float, end_us: float, **args):
+        self.events.append({"name": name, "cat": cat, "ph": "X", "pid": PID,
+                            "tid": threading.get_ident(), "ts": start_us,
+                            "dur": max(0.0, end_us - start_us), "args": args})
+
+    def _close_step(self, end_us: float):
+        if self._step_start is not None and self._current is not None:
+            self._emit(f"Schritt {self._current.steps}", "step", self._step_start, end_us,
+                       question=self._current.question[:ARG_CHARS])
+        self._step_start = None
+
+    @contextmanager
+    def question(self, text: str):
+        """Klammert alle Schritte einer Frage (Summary-Zeile + Span im Trace)."""
+        stats = QuestionStats(question=text)
+        start = self._now_us()
+        with self._lock:
+            self._current = stats
+            self.questions.append(stats)
+        try:
+            yield stats
+        finally:
+            end = self._now_us()
+            with self._lock:
+                self._close_step(end)
+                stats.wall_s = (end - start) / 1e6
+                self._emit(text[:80], "question", start, end, steps=stats.steps)
+                self._current = None
+
+    @contextmanager
+    def span(self, name: str, cat: str, **args):
+        """Eigener Span, z.B. für Vorverarbeitung außerhalb der Callbacks."""
+        start = self._now_us()
+        try:
+            yield args
+        finally:
+            with self._lock:
+                self._emit(name, cat, start, self._now_us(), **args)
+
+    # --- LLM-Callbacks ---
+
+    def _llm_start(self, run_id: UUID):
+        now = self._now_us()
+        with self._lock:
+            self._close_step(now)
+            self._step_start = now
+            if self._current is not None:
+                self._current.steps += 1
+            self._open_runs[run_id] = ("llm", now, None)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs):
+        self._llm_start(run_id)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages, *, run_id: UUID, **kwargs):
+        self._llm_start(run_id)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        end = self._now_us()
+        usage = _token_usage(response)
+        with self._lock:
+            _, start, _ = self._open_runs.pop(run_id, ("llm", end, None))
+            self._emit("LLM", "llm", start, end, **usage)
+            if self._current is not None:
+                self._current.llm_s += (end - start) / 1e6
+                self._current.decode_s += usage["decode_s"]
+                self._current.prompt_tokens += usage["prompt_tokens"]
+                self._current.completion_tokens += usage["completion_tokens"]
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        end = self._now_us()
+        with self._lock:
+            _, start, _ = self._open_runs.pop(run_id, ("llm", end, None))
+            self._emit("LLM (Fehler)", "llm", start, end, error=str(error)[:ARG_CHARS])
+
+    # --- Tool-Callbacks ---
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        with self._lock:
+            self._open_runs[run_id] = (name, self._now_us(), input_str)
+
+    def _tool_end(self, run_id: UUID, **args):
+        end = self._now_us()
+        with self._lock:
+            name, start, input_str = self._open_runs.pop(run_id, ("tool", end, ""))
+            self._emit(name, "tool", start, end, input=str(input_str)[:ARG_CHARS], **args)
+            if self._current is not None:
+                self._current.tool_s += (end - start) / 1e6
+                self._current.tool_calls += 1
+                self._current.tools[name] = self._current.tools.get(name, 0) + 1
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs):
+        self._tool_end(run_id, output=str(output)[:ARG_CHARS])
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._tool_end(run_id, error=str(error)[:ARG_CHARS])
+
+    # --- Embedding & Cypher ---
+
+    def record_embedding(self, start_us: float, end_us: float, texts: int):
+        with self._lock:
+            self._emit("embed", "embedding", start_us, end_us, texts=texts)
+            if self._current is not None:
+                self._current.embed_s += (end_us - start_us) / 1e6
+                self._current.embed_calls += 1
+
+    def record_cypher(self, query: str, start_us: float, end_us: float, rows: int):
+        with self._lock:
+            self._emit("cypher", "cypher", start_us, end_us, rows=rows,
+                       query=" ".join(query.split())[:ARG_CHARS])
+            if self._current is not None:
+                self._current.cypher_s += (end_us - start_us) / 1e6
+                self._current.cypher_queries += 1
+                self._current.cypher_rows += rows
+
+    def wrap_embeddings(self, embedder) -> "ProfiledEmbeddings":
+        return ProfiledEmbeddings(embedder, self)
+
+    def wrap_graph(self, graph) -> "ProfiledGraph":
+        return ProfiledGraph(graph, self)
+
+    # --- Ausgabe ---
+
+    def export_chrome_trace(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock:
+            events = sorted(self.events, key=lambda e: e["ts"])
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return path
+
+    def print_summary(self):
+        print("\n⏱️  AGENT-PROFIL")
+        print("=" * 118)
+        print(f"{'Frage':<32}{'Schritte':>9}{'Gesamt':>9}{'LLM':>8}{'Decode':>8}{'Tok in':>8}{'Tok out':>8}"
+              f"{'Tools':>8}{'Embed':>8}{'Cypher':>8}{'Queries':>8}{'Zeilen':>8}{'Rest':>6}")
+        print("-" * 118)
+        for q in self.questions:
+            label = q.question if len(q.question) <= 30 else q.question[:29] + "…"
+            print(f"{label:<32}{q.steps:>9}{q.wall_s:>8.1f}s{q.llm_s:>7.1f}s{q.decode_s:>7.1f}s"
+                  f"{q.prompt_tokens:>8}{q.completion_tokens:>8}{q.tool_s:>7.1f}s{q.embed_s:>7.1f}s"
+                  f"{q.cypher_s:>7.2f}s{q.cypher_queries:>8}{q.cypher_rows:>8}{q.other_s():>5.1f}s")
+            if q.tools:
+                print(f"{'':<32}Tools: " + ", ".join(f"{name} x{n}" for name, n in q.tools.items()))
+
+
+class ProfiledEmbeddings:
+    """Misst embed_query/embed_documents, reicht alles andere durch."""
+
+    def __init__(self, embedder, profiler: AgentProfiler):
+        self.embedder = embedder
+        self.profiler = profiler
+
+    def embed_query(self, text: str) -> List[float]:
+        start = self.profiler._now_us()
+        try:
+            return self.embedder.embed_query(text)
+        finally:
+            self.profiler.record_embedding(start, self.profiler._now_us(), 1)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = self.profiler._now_us()
+        try:
+            return self.embedder.embed_documents(texts)
+        finally:
+            self.profiler.record_embedding(start, self.profiler._now_us(), len(texts))
+
+    def __getattr__(self, name: str):
+        return getattr(self.embedder, name)
+
+
+class ProfiledGraph:
+    """Misst graph.query() samt zurückgegebener Zeilen (auch über CachedGraph)."""
+
+    def __init__(self, graph, profiler: AgentProfiler):
+        self.graph = graph
+        self.profiler = profiler
+
+    def query(self, query: str, params: dict = None) -> list:
+        start = self.profiler._now_us()
+        rows = []
+        try:
+            rows = self.graph.query(query, params=params or {})
+            return rows
+        finally:
+            self.profiler.record_cypher(query, start, self.profiler._now_us(), len(rows or []))
+
+    def __getattr__(self, name: str):
+        return getattr(self.graph, name)
@@ -0,0 +1,348 @@
+"""
+Asynchroner ReAct-Agent: parallele Tool-Calls, viele Fragen pro Prozess
+=======================================================================
+
+AgentExecutor führt ein Tool nach dem anderen aus und blockiert den Thread
+bei jedem Neo4j- und Embedding-Call - ein Prozess beantwortet so genau eine
+Frage gleichzeitig.
+
+AsyncAgentRunner dagegen
+  - nutzt den async Neo4j-Driver (AsyncGraph) und ainvoke/aembed_query von
+    ChatOllama/OllamaEmbeddings,
+  - erlaubt dem LLM mehrere Action/Action-Input-Paare in einem Schritt und
+    führt diese Tool-Calls per asyncio.gather gleichzeitig aus,
+  - beantwortet viele Fragen pro Worker: höchstens max_questions Fragen und
+    max_llm_calls LLM-Calls laufen gleichzeitig (Ollama sollte mit
+    OLLAMA_NUM_PARALLEL >= max_llm_calls laufen).
+
+Die Tools entsprechen denen in graph_tools.py und verwenden dieselben
+Query-Texte, nur mit await statt blockierendem graph.query().
+
+Aufruf:
+    python async_agent.py "Frage 1" "Frage 2" ... [--questions-file fragen.txt] [--concurrency 8]
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from neo4j import RoutingControl
+
+from graph_tools import (BATCH_LOOKUP_QUERY, DEFAULT_CANDIDATE_LIMIT, DEFAULT_FANOUT, DEFAULT_MAX_HOPS,
+                         DEFAULT_PATH_LIMIT, DEFAULT_ROW_BUDGET, DEFAULT_SHORTEST_HOPS, DEFAULT_SHORTEST_LIMIT,
+                         DIRECTIONS, EXACT_LOOKUP_QUERY, FULLTEXT_LOOKUP_QUERY, MAX_HOPS, NEIGHBORHOODS_QUERY, clean_input,
+                         format_connections, format_neighborhoods, format_paths, fulltext_query,
+                         group_neighborhoods, is_element_id, neighborhood_starts, parse_connection_request,
+                         parse_entity_list, parse_path_request, paths_query, pick_start_ids,
+                         shortest_paths_query, unique_refs)
+from graph_writer import lookup_key
+from schema_manager import FULLTEXT_INDEX_NAME, VECTOR_INDEX_NAME
+
+DEFAULT_MAX_QUESTIONS = 8
+DEFAULT_MAX_LLM_CALLS = 4
+DEFAULT_MAX_ITERATIONS = 8
+OBSERVATION_CHARS = 4000
+
+ACTION_RE = re.compile(r"Action\s*:\s*\[?([\w-]+)\]?\s*\nAction\s*Input\s*:\s*(.*?)"
+                       r"(?=\n\s*Action\s*:|\n\s*Observation\s*:|\n\s*Thought\s*:|\Z)", re.DOTALL)
+FINAL_RE = re.compile(r"Final Answer\s*:\s*(.*)", re.DOTALL)
+
+PROMPT = """Du bist ein Graph-Analyst. Beantworte die Frage ausschließlich mit Fakten aus dem Graphen.
+Erfinde NIEMALS Verbindungen!
+
+TOOLS:
+{tools}
+
+FORMAT:
+Thought: Was muss ich nachsehen?
+Action: einer von [{tool_names}]
+Action Input: Eingabe im Format des Tools
+Observation: Ergebnis
+
+Voneinander unabhängige Abfragen dürfen im SELBEN Schritt stehen (mehrere
+Action/Action Input-Paare hintereinander) - sie laufen parallel.
+... (Wiederholen, bis die Antwort feststeht)
+
+Thought: Ich kenne die Antwort.
+Final Answer: Antwort mit Beweis-Kette
+
+Frage: {input}
+{agent_scratchpad}"""
+
+
+# =============================================================================
+# ASYNC GRAPH
+# =============================================================================
+
+class AsyncGraph:
+    """Dünner Wrapper um neo4j.AsyncDriver mit query() wie Neo4jGraph, nur awaitable."""
+
+    def __init__(self, driver, database: str = None):
+        self.driver = driver
+        self.database = database
+
+    async def query(self, query: str, params: dict = None) -> List[dict]:
+        records, _, _ = await self.driver.execute_query(query, parameters_=params or {}, database_=self.database,
+                                                        routing_=RoutingControl.READ)
+        return [record.data() for record in records]
+
+
+# =============================================================================
+# ASYNC GRAPH-TOOLS (gleiche Logik wie graph_tools.py)
+# =============================================================================
+
+async def resolve_entity(graph: AsyncGraph, name: str, limit: int = DEFAULT_CANDIDATE_LIMIT) -> List[dict]:
+    key = lookup_key(clean_input(name))
+    if not key:
+        return []
+    exact = await graph.query(EXACT_LOOKUP_QUERY, {"key": key, "limit": limit})
+    if exact:
+        return [dict(row, match="exact") for row in exact]
+    query = fulltext_query(name)
+    if not query:
+        return []
+    try:
+        fuzzy = await graph.query(FULLTEXT_LOOKUP_QUERY,
+                                  {"index": FULLTEXT_INDEX_NAME, "query": query, "limit": limit})
+    except Exception:
+        return []
+    return [dict(row, match="fuzzy") for row in fuzzy]
+
+
+async def start_element_ids(graph: AsyncGraph, ref: str) -> List[str]:
+    ref = clean_input(ref)
+    if is_element_id(ref):
+        return [ref]
+    return pick_start_ids(await resolve_entity(graph, ref))
+
+
+async def get_neighborhoods(graph: AsyncGraph, refs: List[str], row_budget: int = DEFAULT_ROW_BUDGET) -> List[dict]:
+    refs = unique_refs(refs)
+    resolved = {ref: [ref] for ref in refs if is_element_id(ref)}
+    keys = {ref: lookup_key(ref) for ref in refs if ref not in resolved}
+    if keys:
+        rows = await graph.query(BATCH_LOOKUP_QUERY, {"keys": sorted(set(keys.values()))})
+        by_key = {row["key"]: row["element_ids"] for row in rows}
+        misses = [ref for ref, key in keys.items() if not by_key.get(key)]
+        # Fuzzy-Fallback für alle Fehlschläge gleichzeitig
+        fuzzy = await asyncio.gather(*(start_element_ids(graph, ref) for ref in misses))
+        resolved.update({ref: by_key[key] for ref, key in keys.items() if by_key.get(key)})
+        resolved.update(zip(misses, fuzzy))
+    starts = neighborhood_starts(refs, resolved)
+    rows = []
+    if starts:
+        rows = await graph.query(NEIGHBORHOODS_QUERY,
+                                 {"starts": starts, "per_start": max(1, row_budget // len(starts))})
+    return group_neighborhoods(refs, rows)
+
+
+async def expand_paths(graph: AsyncGraph, ref: str, max_hops: int = DEFAULT_MAX_HOPS, rel_types: List[str] = None,
+                       direction: str = "both", fanout: int = DEFAULT_FANOUT,
+                       limit: int = DEFAULT_PATH_LIMIT) -> List[dict]:
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction muss einer von {sorted(DIRECTIONS)} sein, nicht {direction!r}")
+    element_ids = await start_element_ids(graph, ref)
+    if not element_ids:
+        return []
+    return await graph.query(paths_query(max(1, min(max_hops, MAX_HOPS)), rel_types, direction),
+                             {"element_ids": element_ids, "fanout": fanout, "limit": limit})
+
+
+async def shortest_paths(graph: AsyncGraph, source_ref: str, target_ref: str,
+                         max_hops: int = DEFAULT_SHORTEST_HOPS, rel_types: List[str] = None, all_paths: bool = True,
+                         limit: int = DEFAULT_SHORTEST_LIMIT) -> List[dict]:
+    # Beide Endpunkte gleichzeitig auflösen
+    sources, targets = await asyncio.gather(start_element_ids(graph, source_ref),
+                                            start_element_ids(graph, target_ref))
+    if not sources or not targets:
+        return []
+    return await graph.query(shortest_paths_query(max_hops, rel_types, all_paths),
+                             {"sources": sources, "targets": targets, "limit": limit})
+
+
+# =============================================================================
+# RUNNER
+# =============================================================================
+
+@dataclass
+class AsyncTool:
+    name: str
+    description: str
+    run: Callable[[str], Awaitable[str]]
+
+
+@dataclass
+class AgentResult:
+    question: str
+    answer: Optional[str] = None
+    steps: int = 0
+    tool_calls: int = 0
+    parallel_steps: int = 0     # Schritte mit mehr als einem Tool-Call
+    wall_s: float = 0.0
+    error: Optional[str] = None
+
+
+def parse_actions(text: str) -> List[Tuple[str, str]]:
+    """Alle Action/Action-Input-Paare eines LLM-Schritts."""
+    return [(name.strip(), clean_input(arg)) for name, arg in ACTION_RE.findall(text)]
+
+
+class AsyncAgentRunner:
+    """ReAct-Schleife auf asyncio. Eine Instanz bedient beliebig viele Fragen."""
+
+    def __init__(self, llm, embedder, graph: AsyncGraph, max_questions: int = DEFAULT_MAX_QUESTIONS,
+                 max_llm_calls: int = DEFAULT_MAX_LLM_CALLS, max_iterations: int = DEFAULT_MAX_ITERATIONS,
+                 log: Callable[[str], None] = print):
+        self.llm = llm
+        self.embedder = embedder
+        self.graph = graph
+        self.max_iterations = max_iterations
+        self.log = log
+        self._questions = asyncio.Semaphore(max_questions)
+        self._llm_calls = asyncio.Semaphore(max_llm_calls)
+        self.tools: Dict[str, AsyncTool] = {t.name: t for t in self._make_tools()}
+
+    def _make_tools(self) -> List[AsyncTool]:
+        graph = self.graph
+
+        async def search_entities(text: str) -> str:
+            embedding = await self.embedder.aembed_query(clean_input(text))
+            rows = await graph.query(f"""
+                CALL db.index.vector.queryNodes('{VECTOR_INDEX_NAME}', 3, $embedding)
+                YIELD node, score
+                RETURN coalesce(node.id, node.name) AS entity, labels(node) AS type, elementId(node) AS elementId
+            """, {"embedding": embedding})
+            return str(rows)
+
+        async def neighborhoods(text: str) -> str:
+            return format_neighborhoods(await get_neighborhoods(graph, parse_entity_list(text)))
+
+        async def follow_paths(text: str) -> str:
+            kwargs = parse_path_request(text)
+            return format_paths(await expand_paths(graph, **kwargs), kwargs["ref"])
+
+        async def find_connection(text: str) -> str:
+            kwargs = parse_connection_request(text)
+            return format_connections(await shortest_paths(graph, **kwargs),
+                                      kwargs["source_ref"], kwargs["target_ref"])
+
+        return [
+            AsyncTool("search_entities", "Findet Start-Knoten per Vektorsuche (Name, Typ, elementId).",
+                      search_entities),
+            AsyncTool("get_neighborhoods", "Nachbarn eines oder mehrerer Knoten. Eingabe: Namen oder "
+                                           "elementIds, getrennt durch ';'.", neighborhoods),
+            AsyncTool("follow_paths", "Mehrere Hops auf einmal. Eingabe: 'Start; REL1,REL2; max_hops; "
+                                      "out|in|both' (nur Start ist Pflicht).", follow_paths),
+            AsyncTool("find_connection", "Kürzeste Verbindung zweier Knoten. Eingabe: 'Start; Ziel' "
+                                         "optional '; REL1,REL2; max_hops'.", find_connection),
+        ]
+
+    async def _run_tool(self, name: str, arg: str) -> str:
+        tool = self.tools.get(name)
+        if tool is None:
+            return f"Unbekanntes Tool '{name}'. Verfügbar: {', '.join(self.tools)}"
+        try:
+            return (await tool.run(arg))[:OBSERVATION_CHARS]
+        except Exception as e:
+            return f"Fehler in {name}: {str(e)[:200]}"
+
+    async def _llm_step(self, prompt: str) -> str:
+        async with self._llm_calls:
+            message = await self.llm.ainvoke(prompt, stop=["\nObservation:"])
+        return getattr(message, "content", message)
+
+    async def answer(self, question: str) -> AgentResult:
+        result = AgentResult(question=question)
+        start = time.perf_counter()
+        tool_list = "\n".join(f"{t.name}: {t.description}" for t in self.tools.values())
+        scratchpad = ""
+        async with self._questions:
+            try:
+                for _ in range(self.max_iterations):
+                    result.steps += 1
+                    text = await self._llm_step(PROMPT.format(tools=tool_list, tool_names=", ".join(self.tools),
+                                                              input=question, agent_scratchpad=scratchpad))
+                    actions = parse_actions(text)
+                    final = FINAL_RE.search(text)
+                    if final and not actions:
+                        result.answer = final.group(1).strip()
+                        break
+                    if not actions:
+                        scratchpad += f"{text}\nObservation: Ungültiges Format - nutze Action/Action Input " \
+                                      f"oder Final Answer.\nThought: "
+                        continue
+                    # Unabhängige Tool-Calls dieses Schritts laufen gleichzeitig
+                    observations = await asyncio.gather(*(self._run_tool(name, arg) for name, arg in actions))
+                    result.tool_calls += len(actions)
+                    result.parallel_steps += len(actions) > 1
+                    scratchpad += text + "".join(f"\nObservation ({name}: {arg}):\n{obs}"
+                                                 for (name, arg), obs in zip(actions, observations)) + "\nThought: "
+                else:
+                    result.error = f"max_iterations ({self.max_iterations}) erreicht"
+            except Exception as e:
+                result.error = str(e)[:200]
+        result.wall_s = time.perf_counter() - start
+        self.log(f"   {'✅' if result.answer else '❌'} {question[:60]} "
+                 f"({result.steps} Schritte, {result.tool_calls} Tools, {result.wall_s:.1f}s)")
+        return result
+
+    async def answer_many(self, questions: List[str]) -> List[AgentResult]:
+        """Alle Fragen nebenläufig, begrenzt durch max_questions / max_llm_calls."""
+        return await asyncio.gather(*(self.answer(q) for q in questions))
+
+
+def main():
+    from dotenv import load_dotenv
+    from langchain_ollama import ChatOllama, OllamaEmbeddings
+    from neo4j import AsyncGraphDatabase
+
+    cli = argparse.ArgumentParser(description="Beantwortet viele Fragen nebenläufig mit dem async Graph-Agenten.")
+    cli.add_argument("questions", nargs="*")
+    cli.add_argument("--questions-file", default=None, help="Eine Frage pro Zeile")
+    cli.add_argument("--model", default="gemma3:27b")
+    cli.add_argument("--concurrency", type=int, default=DEFAULT_MAX_QUESTIONS, help="Fragen gleichzeitig")
+    cli.add_argument("--llm-calls", type=int, default=DEFAULT_MAX_LLM_CALLS, help="LLM-Calls gleichzeitig")
+    cli.add_argument("--max-iterations", type=int, default=DEFAULT_MAX_ITERATIONS)
+    args = cli.parse_args()
+
+    questions = list(args.questions)
+    if args.questions_file:
+        with open(args.questions_file, "r", encoding="utf-8") as f:
+            questions += [line.strip() for line in f if line.strip()]
+    if not questions:
+        cli.error("keine Fragen angegeben")
+
+    load_dotenv()
+
+    async def run() -> List[AgentResult]:
+        driver = AsyncGraphDatabase.driver(os.getenv("NEO4J_URI"),
+                                           auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")))
+        try:
+            runner = AsyncAgentRunner(ChatOllama(model=args.model, temperature=0),
+                                      OllamaEmbeddings(model="nomic-embed-text"), AsyncGraph(driver),
+                                      max_questions=args.concurrency, max_llm_calls=args.llm_calls,
+                                      max_iterations=args.max_iterations)
+            return await runner.answer_many(questions)
+        finally:
+            await driver.close()
+
+    print(f"\n🕵️ {len(questions)} Fragen, bis zu {args.concurrency} gleichzeitig...\n")
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    wall = time.perf_counter() - start
+
+    for r in results:
+        print(f"\n❓ {r.question}")
+        print(f"   {r.answer or '❌ ' + (r.error or 'keine Antwort')}")
+        print(f"   {r.steps} Schritte, {r.tool_calls} Tool-Calls ({r.parallel_steps} parallele Schritte), "
+              f"{r.wall_s:.1f}s")
+    serial = sum(r.wall_s for r in results)
+    print(f"\n⏱️  Gesamt {wall:.1f}s für {len(results)} Fragen (Summe der Einzelzeiten {serial:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
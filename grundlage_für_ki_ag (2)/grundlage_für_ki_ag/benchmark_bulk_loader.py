@@ -0,0 +1,147 @@
+"""
+Benchmark: BulkLoader vs. add_graph_documents
+=============================================
+
+Erzeugt synthetische GraphDocuments (oder lädt Extraktions-Checkpoints) und
+schreibt dieselben Daten nacheinander mit
+  - Neo4jGraph.add_graph_documents (ein Aufruf pro Dokument, wie die Builder)
+  - bulk_loader.BulkLoader           (gruppierte UNWIND-Batches)
+in eine jeweils geleerte Datenbank. Gemessen werden Wall-Time, Knoten/s und
+ob am Ende dieselbe Anzahl Knoten/Beziehungen in der DB steht.
+
+ACHTUNG: löscht den Inhalt der konfigurierten Datenbank.
+
+Aufruf:
+    python benchmark_bulk_loader.py [--docs 200 2000] [--batch-size 1000]
+    python benchmark_bulk_loader.py --checkpoint checkpoints/attis_chunks.jsonl
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from typing import Dict, List
+
+from dotenv import load_dotenv
+from langchain_community.graphs import Neo4jGraph
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+from neo4j import GraphDatabase
+
+from bulk_loader import DEFAULT_BATCH_SIZE, BulkLoader
+from checkpoint import graph_documents_from_data
+from query_cache import VERSION_LABEL
+from schema_manager import plan_schema
+
+LABELS = ["Person", "Ort", "Objekt", "Zeitpunkt", "Rolle"]
+REL_TYPES = ["BEFINDET_SICH_IN", "SIEHT", "INTERAGIERT_MIT", "GEHOERT", "HAT_ROLLE"]
+
+
+def make_documents(count: int, nodes_per_doc: int = 12, rels_per_doc: int = 15,
+                   vocabulary: int = 5000, seed: int = 7) -> List[GraphDocument]:
+    """Dokumente mit überlappenden Entities (wie Chunks desselben Texts)."""
+    rng = random.Random(seed)
+    docs = []
+    for i in range(count):
+        nodes = []
+        for _ in range(nodes_per_doc):
+            k = rng.randrange(vocabulary)
+            nodes.append(Node(id=f"Entity {k}", type=LABELS[k % len(LABELS)],
+                              properties={"rank": k % 100}))
+        rels = []
+        for _ in range(rels_per_doc):
+            source, target = rng.sample(nodes, 2)
+            rels.append(Relationship(source=source, target=target, type=rng.choice(REL_TYPES)))
+        docs.append(GraphDocument(nodes=nodes, relationships=rels,
+                                  source=Document(page_content=f"chunk {i}")))
+    return docs
+
+
+def load_checkpoint_documents(path: str) -> List[GraphDocument]:
+    docs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                data = json.loads(line)["data"]
+            except (json.JSONDecodeError, KeyError):
+                continue
+            if "graph_documents" in data:
+                sources = [Document(page_content="") for _ in data["graph_documents"]]
+                docs.extend(graph_documents_from_data(data, sources))
+    return docs
+
+
+def reset(graph: Neo4jGraph, labels: List[str]):
+    graph.query("MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS")
+    for statement in plan_schema(labels, vector_dim=None):
+        graph.query(statement.cypher)
+
+
+def db_counts(graph: Neo4jGraph) -> Dict[str, int]:
+    # Ohne Meta-Knoten: BulkLoader.load zählt die Graph-Version hoch, add_graph_documents nicht
+    nodes = graph.query(f"MATCH (n) WHERE NOT n:{VERSION_LABEL} RETURN count(n) AS c")[0]["c"]
+    rels = graph.query("MATCH ()-[r]->() RETURN count(r) AS c")[0]["c"]
+    return {"nodes": nodes, "rels": rels}
+
+
+def run_add_graph_documents(graph: Neo4jGraph, docs: List[GraphDocument]) -> float:
+    start = time.perf_counter()
+    for doc in docs:
+        graph.add_graph_documents([doc])
+    return time.perf_counter() - start
+
+
+def run_bulk(driver, docs: List[GraphDocument], batch_size: int) -> float:
+    start = time.perf_counter()
+    loader = BulkLoader(batch_size=batch_size, entity_label=None)
+    loader.add_graph_documents(docs)
+    loader.load(driver, log=lambda msg: None)
+    return time.perf_counter() - start
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Vergleicht BulkLoader mit add_graph_documents.")
+    cli.add_argument("--docs", type=int, nargs="+", default=[200, 2000])
+    cli.add_argument("--checkpoint", default=None, help="Echte Extraktion aus einem Checkpoint statt synthetisch")
+    cli.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = cli.parse_args()
+
+    load_dotenv()
+    url, user, password = os.getenv("NEO4J_URI"), os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")
+    graph = Neo4jGraph(url=url, username=user, password=password)
+    driver = GraphDatabase.driver(url, auth=(user, password))
+
+    if args.checkpoint:
+        corpora = {os.path.basename(args.checkpoint): load_checkpoint_documents(args.checkpoint)}
+    else:
+        corpora = {f"{n} Dok.": make_documents(n) for n in args.docs}
+
+    print(f"\n📏 BENCHMARK BULK-LOAD (Batch {args.batch_size})")
+    print("=" * 92)
+    print(f"{'Korpus':<26}{'Methode':<22}{'Knoten':>9}{'Bez.':>9}{'Zeit [s]':>10}{'Knoten/s':>10}{'Speedup':>9}")
+    print("-" * 92)
+    try:
+        for name, docs in corpora.items():
+            labels = sorted({n.type for d in docs for n in d.nodes})
+            results = {}
+            for method in ("add_graph_documents", "BulkLoader"):
+                reset(graph, labels)
+                if method == "BulkLoader":
+                    wall = run_bulk(driver, docs, args.batch_size)
+                else:
+                    wall = run_add_graph_documents(graph, docs)
+                counts = db_counts(graph)
+                results[method] = (wall, counts)
+                speedup = results["add_graph_documents"][0] / wall if wall else 0.0
+                print(f"{name:<26}{method:<22}{counts['nodes']:>9}{counts['rels']:>9}{wall:>10.2f}"
+                      f"{counts['nodes'] / wall if wall else 0.0:>10.0f}{speedup:>8.1f}x", flush=True)
+
+            if results["add_graph_documents"][1] != results["BulkLoader"][1]:
+                print(f"   ⚠️  Unterschiedliche Ergebnisse: {results}")
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Benchmark: Fuzzy Entity Resolution vs. Korpusgröße
+===================================================
+
+Erzeugt synthetische Erwähnungen ("Peter Klein", "Hr. Klein", "P. Klein",
+"raum  404", ...) mit bekannter Zuordnung und misst für mehrere Größen:
+  - verglichene Paare (Blocking) vs. alle Paare
+  - Wall-Time
+  - paarweise Precision/Recall gegen die Wahrheit
+
+Standardmäßig mit einem deterministischen Hash-Embedder (kein Ollama nötig).
+Mit --ollama werden echte nomic-embed-text Embeddings verwendet.
+
+Vorab laufen die Regel-Fälle aus RULE_CASES (Anrede/Initiale bei mehreren
+"Klein"s) mit einem Nachnamen-Embedder, der jede Variante durchlässt - dort
+entscheiden allein die Namensregeln. Schlägt ein Fall fehl, endet das Skript
+mit Exit-Code 1.
+
+Aufruf:
+    python benchmark_entity_resolution.py [--sizes 1000 10000 100000] [--ollama]
+"""
+
+import argparse
+import random
+import sys
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from entity_resolution import EntityResolver, char_ngrams
+
+FIRST_NAMES = ["Peter", "Petra", "Anna", "Jonas", "Lena", "Felix", "Marie", "Lukas", "Sophie", "Paul",
+               "Emma", "Leon", "Mia", "Finn", "Hanna", "Elias", "Laura", "Noah", "Lea", "Ben"]
+SYLLABLES = ["klein", "berg", "mann", "haus", "feld", "stein", "wald", "brück", "hof", "dorf",
+             "meier", "schul", "wagner", "beck", "roth", "lang", "weiß", "vogt", "kr", "zimm"]
+
+
+def hash_embed(names: List[str], dim: int = 256) -> List[np.ndarray]:
+    """Deterministischer Stand-in: Zeichen-3-Gramme in einen Vektor gehasht."""
+    vectors = []
+    for name in names:
+        v = np.zeros(dim, dtype=np.float32)
+        for gram in char_ngrams(" ".join(name.lower().split())):
+            v[zlib.crc32(gram.encode("utf-8")) % dim] += 1.0
+        vectors.append(v)
+    return vectors
+
+
+def make_corpus(size: int, seed: int = 7) -> List[Tuple[str, str, int]]:
+    """(Name, Typ, wahre Entity-ID) - etwa 4 Erwähnungen pro Entity."""
+    rng = random.Random(seed)
+    mentions = []
+    entity_id = 0
+    while len(mentions) < size:
+        entity_id += 1
+        if rng.random() < 0.8:
+            first = rng.choice(FIRST_NAMES)
+            last = "".join(rng.sample(SYLLABLES, 4)).capitalize()
+            title = "Fr." if first in ("Petra", "Anna", "Lena", "Marie", "Sophie", "Emma",
+                                       "Mia", "Hanna", "Laura", "Lea") else "Hr."
+            variants = [f"{first} {last}", f"{title} {last}", f"{first[0]}. {last}",
+                        f"{first.lower()}  {last}", f"{title} {first} {last}"]
+            for _ in range(rng.randint(1, 6)):
+                mentions.append((rng.choice(variants), "Person", entity_id))
+        else:
+            room = f"Raum {rng.randint(1000, 9999)}{rng.choice('ABCDEFGH')}"
+            for _ in range(rng.randint(1, 4)):
+                mentions.append((rng.choice([room, room.lower(), room.replace(' ', '  ')]), "Ort", entity_id))
+    return mentions[:size]
+
+
+# Erwähnungen in dieser Reihenfolge (je ein Batch) -> erwartete kanonische Namen
+RULE_CASES: List[Tuple[List[str], Dict[str, str]]] = [
+    # Das Geschlecht aus "Hr. Klein" hängt danach an "Peter Klein"
+    (["Peter Klein", "Hr. Klein", "P. Klein", "Petra Klein", "Fr. Klein"],
+     {"Hr. Klein": "Peter Klein", "P. Klein": "Peter Klein", "Fr. Klein": "Petra Klein"}),
+    # Zwei passende Vornamen, keine Anrede bekannt -> nicht raten
+    (["Peter Klein", "Petra Klein", "P. Klein", "Fr. Klein"],
+     {"P. Klein": "P. Klein", "Fr. Klein": "Fr. Klein"}),
+    (["Peter Klein", "Hr. Klein", "Petra Klein", "Fr. Klein", "P. Klein", "Hr. Klein"],
+     {"Fr. Klein": "Petra Klein", "P. Klein": "P. Klein", "Hr. Klein": "Peter Klein"}),
+]
+
+
+def surname_embed(names: List[str], dim: int = 64) -> List[np.ndarray]:
+    """Gleicher Nachname -> gleicher Vektor: Cosine lässt alles durch, nur die Regeln zählen."""
+    vectors = []
+    for name in names:
+        v = np.zeros(dim, dtype=np.float32)
+        v[zlib.crc32(name.lower().split()[-1].encode("utf-8")) % dim] = 1.0
+        vectors.append(v)
+    return vectors
+
+
+def check_rule_cases() -> List[str]:
+    failures = []
+    for mentions, expected in RULE_CASES:
+        resolver = EntityResolver(surname_embed)
+        mapping = {}
+        for name in mentions:
+            mapping.update(resolver.resolve([(name, "Person")]))
+        for name, canonical in expected.items():
+            got = mapping[(name, "Person")]
+            if got != canonical:
+                failures.append(f"{' | '.join(mentions)}: {name} -> {got} (erwartet {canonical})")
+    return failures
+
+
+def pair_count(counter: Counter) -> int:
+    return sum(c * (c - 1) // 2 for c in counter.values())
+
+
+def run(size: int, embed_fn) -> dict:
+    corpus = make_corpus(size)
+    resolver = EntityResolver(embed_fn)
+
+    start = time.perf_counter()
+    mapping = {}
+    # In Batches wie beim Builder (ein Batch pro Abschnitt)
+    for i in range(0, len(corpus), 200):
+        batch = [(name, entity_type) for name, entity_type, _ in corpus[i:i + 200]]
+        mapping.update(resolver.resolve(batch))
+    wall = time.perf_counter() - start
+
+    predicted = [(entity_type, mapping[(name, entity_type)]) for name, entity_type, _ in corpus]
+    truth = [t for _, _, t in corpus]
+    true_pairs = pair_count(Counter(truth))
+    pred_pairs = pair_count(Counter(predicted))
+    both_pairs = pair_count(Counter(zip(predicted, truth)))
+
+    unique_names = len({(entity_type, " ".join(name.lower().split())) for name, entity_type, _ in corpus})
+    stats = resolver.stats()
+    return {
+        "mentions": size,
+        "unique_names": unique_names,
+        "true_entities": len(set(truth)),
+        "resolved_entities": stats["entities"],
+        "pairs_compared": stats["pairs_compared"],
+        "all_pairs": unique_names * (unique_names - 1) // 2,
+        "wall_s": wall,
+        "precision": both_pairs / pred_pairs if pred_pairs else 1.0,
+        "recall": both_pairs / true_pairs if true_pairs else 1.0,
+    }
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Benchmark der Fuzzy Entity Resolution.")
+    cli.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    cli.add_argument("--ollama", action="store_true", help="Echte Ollama-Embeddings statt Hash-Embedder")
+    args = cli.parse_args()
+
+    failures = check_rule_cases()
+    print(f"\n🧪 REGEL-FÄLLE: {len(RULE_CASES)} Sequenzen, {len(failures)} Abweichungen")
+    for failure in failures:
+        print(f"   ❌ {failure}")
+
+    embed_fn = hash_embed
+    if args.ollama:
+        from langchain_ollama import OllamaEmbeddings
+        embed_fn = OllamaEmbeddings(model="nomic-embed-text").embed_documents
+
+    print(f"\n📏 BENCHMARK ENTITY RESOLUTION ({'Ollama' if args.ollama else 'Hash'}-Embedder)")
+    print("=" * 96)
+    print(f"{'Erwähn.':>9}{'Namen':>9}{'Wahr':>8}{'Erkannt':>9}{'Vergl. Paare':>14}"
+          f"{'Alle Paare':>15}{'Anteil':>9}{'Zeit [s]':>10}{'Prec':>7}{'Rec':>7}")
+    print("-" * 96)
+    for size in args.sizes:
+        r = run(size, embed_fn)
+        share = r["pairs_compared"] / r["all_pairs"] if r["all_pairs"] else 0.0
+        print(f"{r['mentions']:>9}{r['unique_names']:>9}{r['true_entities']:>8}{r['resolved_entities']:>9}"
+              f"{r['pairs_compared']:>14}{r['all_pairs']:>15}{share:>9.2e}{r['wall_s']:>10.2f}"
+              f"{r['precision']:>7.2f}{r['recall']:>7.2f}", flush=True)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark: Hop-Latenz der Agent-Tools über die Graphgröße
+=========================================================
+
+Lädt synthetische Graphen (Standard 1k / 10k / 100k Knoten, ~3 Kanten pro
+Knoten) per BulkLoader und misst die Latenz eines Nachbarschafts-Hops mit
+  - regex       alter Tool-Query (n.id =~ '(?i)...'), Label-Scan
+  - lookup_key  graph_tools.get_neighborhood(Name)  -> Range-Index
+  - fulltext    Name mit Tippfehler -> exakter Miss + Fulltext-Fuzzy
+  - elementId   graph_tools.get_neighborhood(elementId) -> direkter Zugriff
+
+ACHTUNG: löscht den Inhalt der konfigurierten Datenbank.
+
+Aufruf:
+    python benchmark_graph_tools.py [--sizes 1000 10000 100000] [--hops 50]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from dotenv import load_dotenv
+from langchain_community.graphs import Neo4jGraph
+from neo4j import GraphDatabase
+
+from bulk_loader import BulkLoader
+from graph_tools import ensure_lookup_indexes, get_neighborhood, resolve_entity
+from schema_manager import plan_schema
+
+LABELS = ["Person", "Ort", "Objekt", "Zeitpunkt", "Rolle"]
+REL_TYPES = ["BEFINDET_SICH_IN", "SIEHT", "INTERAGIERT_MIT", "GEHOERT", "HAT_ROLLE"]
+REGEX_QUERY = """
+    MATCH (n) WHERE n.id =~ ('(?i)' + $id) OR n.name =~ ('(?i)' + $id)
+    MATCH (n)-[r]-(m)
+    RETURN n.id + ' --[' + type(r) + ']-- ' + m.id AS relation
+    LIMIT 20
+"""
+
+
+def node_name(k: int) -> str:
+    return f"Entity Nummer {k}"
+
+
+def make_data(size: int, rels_per_node: int = 3, seed: int = 7) -> dict:
+    """Ein GraphDocument-Dict im Checkpoint-Format (checkpoint.graph_documents_to_data)."""
+    rng = random.Random(seed)
+    nodes = [{"id": node_name(k), "type": LABELS[k % len(LABELS)], "properties": {}} for k in range(size)]
+    rels = []
+    for k in range(size):
+        for _ in range(rels_per_node):
+            j = rng.randrange(size)
+            if j != k:
+                rels.append({"source": {"id": nodes[k]["id"], "type": nodes[k]["type"]},
+                             "target": {"id": nodes[j]["id"], "type": nodes[j]["type"]},
+                             "type": rng.choice(REL_TYPES), "properties": {}})
+    return {"graph_documents": [{"nodes": nodes, "relationships": rels}]}
+
+
+def typo(name: str, rng: random.Random) -> str:
+    """Vertauscht zwei Buchstaben im ersten Wort ("Entity" -> "Enitty")."""
+    i = rng.randrange(1, 4)
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+
+def reset(graph: Neo4jGraph):
+    graph.query("MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS")
+    for statement in plan_schema(LABELS, vector_dim=None):
+        graph.query(statement.cypher)
+    ensure_lookup_indexes(graph, log=lambda msg: None)
+    graph.query("CALL db.awaitIndexes(300)")
+
+
+def time_hops(fn: Callable[[str], object], refs: List[str]) -> Dict[str, float]:
+    fn(refs[0])   # Warmup (Query-Plan-Cache)
+    latencies = []
+    for ref in refs:
+        start = time.perf_counter()
+        fn(ref)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {"median": statistics.median(latencies),
+            "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]}
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Misst die Hop-Latenz der Agent-Tools über die Graphgröße.")
+    cli.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    cli.add_argument("--hops", type=int, default=50, help="Hops pro Methode und Größe")
+    args = cli.parse_args()
+
+    load_dotenv()
+    url, user, password = os.getenv("NEO4J_URI"), os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")
+    graph = Neo4jGraph(url=url, username=user, password=password)
+    driver = GraphDatabase.driver(url, auth=(user, password))
+    rng = random.Random(11)
+
+    print(f"\n📏 BENCHMARK HOP-LATENZ ({args.hops} Hops pro Messung)")
+    print("=" * 66)
+    print(f"{'Knoten':>9}  {'Methode':<12}{'Median [ms]':>14}{'p95 [ms]':>12}{'Speedup':>10}")
+    print("-" * 66)
+    try:
+        for size in args.sizes:
+            reset(graph)
+            loader = BulkLoader()
+            loader.add_data(make_data(size))
+            loader.load(driver, log=lambda msg: None)
+
+            names = [node_name(rng.randrange(size)) for _ in range(args.hops)]
+            # Agenten schreiben Namen selten exakt so wie im Graphen
+            mixed = [name.upper() if i % 2 else name.lower() for i, name in enumerate(names)]
+            element_ids = [resolve_entity(graph, name, limit=1)[0]["element_id"] for name in names]
+
+            methods = {
+                "regex": (lambda ref: graph.query(REGEX_QUERY, params={"id": ref}), mixed),
+                "lookup_key": (lambda ref: get_neighborhood(graph, ref), mixed),
+                "fulltext": (lambda ref: get_neighborhood(graph, ref), [typo(n, rng) for n in names]),
+                "elementId": (lambda ref: get_neighborhood(graph, ref), element_ids),
+            }
+            baseline = None
+            for method, (fn, refs) in methods.items():
+                result = time_hops(fn, refs)
+                baseline = baseline or result["median"]
+                speedup = baseline / result["median"] if result["median"] else 0.0
+                print(f"{size:>9}  {method:<12}{result['median']:>14.2f}{result['p95']:>12.2f}"
+                      f"{speedup:>9.1f}x", flush=True)
+            print("-" * 66)
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark: LocalVectorIndex vs. Neo4j entity_index
+==================================================
+
+Lädt die Embeddings aller :Entity-Knoten in einen LocalVectorIndex und
+vergleicht pro Query
+  - neo4j        db.index.vector.queryNodes('entity_index', k, $vec)
+  - exact        Brute Force auf der normierten float32-Matrix (Ground Truth)
+  - hnsw ef=..   HNSW-Graph mit verschiedenen ef_search
+nach Recall@k (gegen exact) und Latenz p50/p99.
+
+Queries sind Embeddings vorhandener Knoten plus Rauschen (--noise), damit
+keine Embedding-Calls nötig sind. Liest nur, die Datenbank bleibt unverändert.
+
+Ohne Neo4j (nur exact vs. hnsw auf geclusterten Zufallsvektoren):
+    python benchmark_vector_index.py --synthetic 20000
+
+Aufruf:
+    python benchmark_vector_index.py [--queries 200] [--k 3 10] [--ef 16 64 128]
+"""
+
+import argparse
+import os
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from local_vector_index import LocalVectorIndex
+from schema_manager import EMBEDDING_DIM, VECTOR_INDEX_NAME
+
+
+def synthetic_rows(count: int, dim: int = EMBEDDING_DIM, clusters: int = 200, seed: int = 7) -> List[dict]:
+    """Geclusterte Vektoren - ähnliche Namen liegen auch bei echten Embeddings in Gruppen."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, count)] + 0.5 * rng.normal(size=(count, dim))
+    return [{"eid": f"synthetic:{i}", "id": f"Entity {i}", "labels": ["Entity"], "embedding": v.tolist()}
+            for i, v in enumerate(vectors)]
+
+
+def make_queries(index: LocalVectorIndex, count: int, noise: float, seed: int = 11) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    base = index.matrix[rng.integers(0, len(index), count)]
+    return (base + noise * rng.normal(size=base.shape) / np.sqrt(index.dim)).astype(np.float32)
+
+
+def measure(search: Callable[[np.ndarray], List[str]], queries: np.ndarray,
+            truth: List[List[str]] = None) -> Dict[str, float]:
+    search(queries[0])   # Warmup
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(search(q))
+        latencies.append((time.perf_counter() - start) * 1000)
+    recall = None
+    if truth is not None:
+        recall = float(np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth) if t]))
+    return {"p50": float(np.percentile(latencies, 50)), "p99": float(np.percentile(latencies, 99)),
+            "recall": recall, "results": results}
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Vergleicht den In-Process-Vektorindex mit entity_index.")
+    cli.add_argument("--synthetic", type=int, default=None, help="Zufallsvektoren statt Neo4j (Anzahl)")
+    cli.add_argument("--queries", type=int, default=200)
+    cli.add_argument("--k", type=int, nargs="+", default=[3, 10])
+    cli.add_argument("--ef", type=int, nargs="+", default=[16, 64, 128])
+    cli.add_argument("--noise", type=float, default=0.3, help="Rauschen relativ zur Vektorlänge")
+    args = cli.parse_args()
+
+    graph = None
+    index = LocalVectorIndex(hnsw_threshold=None)
+    start = time.perf_counter()
+    if args.synthetic:
+        index.upsert(synthetic_rows(args.synthetic))
+    else:
+        from dotenv import load_dotenv
+        from langchain_community.graphs import Neo4jGraph
+
+        load_dotenv()
+        graph = Neo4jGraph(url=os.getenv("NEO4J_URI"), username=os.getenv("NEO4J_USERNAME"),
+                           password=os.getenv("NEO4J_PASSWORD"))
+        index.load(graph)
+    load_s = time.perf_counter() - start
+    if not len(index):
+        print("❌ Keine Embeddings gefunden.")
+        return
+
+    start = time.perf_counter()
+    index.build_hnsw()
+    build_s = time.perf_counter() - start
+    s = index.stats()
+    print(f"\n📦 {s['vectors']} Vektoren (dim {s['dim']}, {s['memory_mb']:.1f} MB) | "
+          f"geladen in {load_s:.1f}s, HNSW gebaut in {build_s:.1f}s")
+
+    queries = make_queries(index, args.queries, args.noise)
+    print(f"\n📏 BENCHMARK VEKTORSUCHE ({args.queries} Queries)")
+    print("=" * 64)
+    print(f"{'k':>4}  {'Methode':<16}{'Recall@k':>10}{'p50 [ms]':>12}{'p99 [ms]':>12}")
+    print("-" * 64)
+    for k in args.k:
+        exact = measure(lambda q: [r["element_id"] for r in index.search(q, k, exact=True)], queries)
+        truth = exact["results"]
+        methods = {"exact": exact}
+        if graph is not None:
+            query = f"""
+                CALL db.index.vector.queryNodes('{VECTOR_INDEX_NAME}', $k, $vec) YIELD node
+                RETURN elementId(node) AS eid
+            """
+            methods["neo4j"] = measure(lambda q: [row["eid"] for row in graph.query(
+                query, params={"k": k, "vec": q.tolist()})], queries, truth)
+        for ef in args.ef:
+            methods[f"hnsw ef={ef}"] = measure(
+                lambda q: [r["element_id"] for r in index.search(q, k, exact=False, ef=ef)], queries, truth)
+
+        for name, m in methods.items():
+            recall = "1.000" if name == "exact" else f"{m['recall']:.3f}"
+            print(f"{k:>4}  {name:<16}{recall:>10}{m['p50']:>12.3f}{m['p99']:>12.3f}", flush=True)
+        print("-" * 64)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+Bulk-Loader für große Graphen
+=============================
+
+`Neo4jGraph.add_graph_documents` schickt pro GraphDocument eigene
+MERGE-Statements. Bei zehntausenden Knoten dominiert das die Build-Zeit.
+
+Der BulkLoader sammelt erst alles ein (GraphDocuments oder die JSONL-
+Checkpoints aus checkpoint.py), dedupliziert und gruppiert:
+  - Knoten nach Label                                 (id -> Properties)
+  - Beziehungen nach (Typ, Start-Label, Ziel-Label)
+
+und schreibt dann in UNWIND-Batches à `batch_size`, eine Managed Transaction
+(`session.execute_write`, mit Retry bei transienten Fehlern) pro Batch:
+
+    UNWIND $rows AS row MERGE (n:Label {id: row.id}) SET n += row.props, n:Entity
+    UNWIND $rows AS row MATCH (s:A {id: ...}) MATCH (t:B {id: ...}) MERGE (s)-[r:TYP]->(t) ...
+
+Die Lookups brauchen die Constraints aus schema_manager.py, sonst ist jede
+Zeile ein Label-Scan.
+
+Für den Erstimport sehr großer Korpora gibt es zusätzlich `export_admin_csv`:
+CSV-Dateien mit Header für `neo4j-admin database import full` - das umgeht
+den Transaktions-Layer komplett (DB muss dafür gestoppt und leer sein).
+
+Aufruf:
+    python bulk_loader.py checkpoints/attis_chunks.jsonl [--batch-size 1000]
+    python bulk_loader.py checkpoints/*.jsonl --csv import/    # nur CSV-Export
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+from checkpoint import graph_documents_to_data
+from graph_writer import lookup_key, quote_name
+from query_cache import BUMP_VERSION_QUERY
+
+DEFAULT_BATCH_SIZE = 1000
+ENTITY_LABEL = "Entity"
+
+RelKey = Tuple[str, str, str]   # (Typ, Start-Label, Ziel-Label)
+
+
+@dataclass
+class LoadStats:
+    nodes: int = 0
+    relationships: int = 0
+    batches: int = 0
+    node_s: float = 0.0
+    rel_s: float = 0.0
+
+    @property
+    def wall_s(self) -> float:
+        return self.node_s + self.rel_s
+
+    def rows_per_s(self) -> float:
+        return (self.nodes + self.relationships) / self.wall_s if self.wall_s else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.nodes} Knoten + {self.relationships} Beziehungen in {self.batches} Batches, "
+                f"{self.wall_s:.1f}s (Knoten {self.node_s:.1f}s, Beziehungen {self.rel_s:.1f}s), "
+                f"{self.rows_per_s():.0f} Zeilen/s")
+
+
+def _batches(rows: List[dict], size: int) -> Iterable[List[dict]]:
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+class BulkLoader:
+    """
+    Sammelt Knoten/Beziehungen aus vielen Dokumenten und schreibt sie
+    gruppiert. Doppelte Knoten (Label + id) werden zusammengeführt, spätere
+    Properties gewinnen - wie beim MERGE mit SET +=.
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, entity_label: str = ENTITY_LABEL):
+        self.batch_size = batch_size
+        self.entity_label = entity_label
+        self.nodes: Dict[str, Dict[str, dict]] = {}
+        self.rels: Dict[RelKey, Dict[Tuple[str, str], dict]] = {}
+        self.documents = 0
+
+    # --- Einsammeln ---
+
+    def _add_node(self, label: str, node_id: str, props: dict = None):
+        self.nodes.setdefault(label, {}).setdefault(node_id, {}).update(props or {})
+
+    def add_data(self, data: dict):
+        """Ein Dict im Format von checkpoint.graph_documents_to_data."""
+        for doc in data["graph_documents"]:
+            self.documents += 1
+            for n in doc["nodes"]:
+                self._add_node(n["type"], n["id"], n.get("properties"))
+            for r in doc["relationships"]:
+                source, target = r["source"], r["target"]
+                # Endpunkte existieren danach garantiert -> im Write reicht MATCH
+                self._add_node(source["type"], source["id"])
+                self._add_node(target["type"], target["id"])
+                key = (r["type"], source["type"], target["type"])
+                self.rels.setdefault(key, {}).setdefault((source["id"], target["id"]), {}).update(
+                    r.get("properties") or {})
+
+    def add_graph_documents(self, graph_docs):
+        self.add_data(graph_documents_to_data(graph_docs))
+
+    def add_checkpoint(self, path: str) -> int:
+        """Alle Einheiten einer Checkpoint-Datei (spätere Einträge pro Key gewinnen)."""
+        entries = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # abgebrochene letzte Zeile
+                entries[entry["key"]] = entry["data"]
+        for data in entries.values():
+            if "graph_documents" in data:
+                self.add_data(data)
+        return len(entries)
+
+    def counts(self) -> Tuple[int, int]:
+        return (sum(len(v) for v in self.nodes.values()), sum(len(v) for v in self.rels.values()))
+
+    # --- Schreiben ---
+
+    def _node_query(self, label: str) -> str:
+        extra = f", n:{quote_name(self.entity_label)}" if self.entity_label else ""
+        return f"""
+            UNWIND $rows AS row
+            MERGE (n:{quote_name(label)} {{id: row.id}})
+            SET n += row.props{extra}
+            SET n.lookup_key = row.lookup_key
+        """
+
+    @staticmethod
+    def _rel_query(rel_type: str, source_label: str, target_label: str) -> str:
+        return f"""
+            UNWIND $rows AS row
+            MATCH (s:{quote_name(source_label)} {{id: row.source}})
+            MATCH (t:{quote_name(target_label)} {{id: row.target}})
+            MERGE (s)-[r:{quote_name(rel_type)}]->(t)
+            SET r += row.props
+        """
+
+    def load(self, driver, database: str = None, log=print) -> LoadStats:
+        """Schreibt alles nach Neo4j: erst alle Knoten, dann alle Beziehungen."""
+        stats = LoadStats()
+
+        def run_batch(tx, query: str, rows: List[dict]):
+            tx.run(query, rows=rows).consume()
+
+        with driver.session(database=database) as session:
+            start = time.perf_counter()
+            for label, by_id in self.nodes.items():
+                rows = [{"id": node_id, "lookup_key": lookup_key(node_id), "props": props}
+                        for node_id, props in by_id.items()]
+                query = self._node_query(label)
+                for batch in _batches(rows, self.batch_size):
+                    session.execute_write(run_batch, query, batch)
+                    stats.batches += 1
+                    stats.nodes += len(batch)
+            stats.node_s = time.perf_counter() - start
+            log(f"   📥 {stats.nodes} Knoten in {stats.node_s:.1f}s")
+
+            start = time.perf_counter()
+            for (rel_type, source_label, target_label), by_pair in self.rels.items():
+                rows = [{"source": s, "target": t, "props": props} for (s, t), props in by_pair.items()]
+                query = self._rel_query(rel_type, source_label, target_label)
+                for batch in _batches(rows, self.batch_size):
+                    session.execute_write(run_batch, query, batch)
+                    stats.batches += 1
+                    stats.relationships += len(batch)
+            stats.rel_s = time.perf_counter() - start
+            log(f"   🔗 {stats.relationships} Beziehungen in {stats.rel_s:.1f}s")
+            session.execute_write(lambda tx: tx.run(BUMP_VERSION_QUERY).consume())
+        return stats
+
+    # --- Offline: CSV für neo4j-admin ---
+
+    def export_admin_csv(self, out_dir: str, array_delimiter: str = ";") -> List[str]:
+        """
+        Schreibt eine CSV pro Label und pro Beziehungsgruppe (Header in der
+        ersten Zeile) und gibt die Argumente für neo4j-admin zurück.
+
+        Jedes Label bekommt einen eigenen ID-Space - dieselbe id darf also
+        als Person und als Ort vorkommen, wie beim MERGE auf (Label, id).
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        args = []
+
+        for label, by_id in self.nodes.items():
+            path = os.path.join(out_dir, f"nodes_{_file_slug(label)}.csv")
+            columns = _property_columns(by_id.values(), array_delimiter)
+            labels = ";".join(l for l in (label, self.entity_label) if l)
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow([f"id:ID({label})", ":LABEL", "lookup_key:string"]
+                                + [header for _, header in columns])
+                for node_id, props in by_id.items():
+                    writer.writerow([node_id, labels, lookup_key(node_id)]
+                                    + [_csv_value(props.get(name), array_delimiter) for name, _ in columns])
+            args.append(f"--nodes={path}")
+
+        for (rel_type, source_label, target_label), by_pair in self.rels.items():
+            path = os.path.join(out_dir, f"rels_{_file_slug(rel_type)}_{_file_slug(source_label)}"
+                                         f"_{_file_slug(target_label)}.csv")
+            columns = _property_columns(by_pair.values(), array_delimiter)
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow([f":START_ID({source_label})", f":END_ID({target_label})", ":TYPE"]
+                                + [header for _, header in columns])
+                for (source, target), props in by_pair.items():
+                    writer.writerow([source, target, rel_type] + [_csv_value(props.get(name), array_delimiter)
+                                                                  for name, _ in columns])
+            args.append(f"--relationships={path}")
+
+        return args
+
+
+def _file_slug(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _csv_type(values: List) -> str:
+    """neo4j-admin-Typ einer Spalte; gemischte Typen werden string."""
+    present = [v for v in values if v is not None]
+    if not present:
+        return "string"
+    if all(isinstance(v, bool) for v in present):
+        return "boolean"
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        return "long"
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return "double"
+    if all(isinstance(v, (list, tuple)) for v in present):
+        items = [x for v in present for x in v]
+        inner = _csv_type(items) if items else "string"
+        return f"{inner}[]" if inner in ("long", "double", "boolean") else "string[]"
+    return "string"
+
+
+def _property_columns(props_list: Iterable[dict], array_delimiter: str) -> List[Tuple[str, str]]:
+    """[(Property, Header "name:typ")] über alle Zeilen einer Datei."""
+    props_list = list(props_list)
+    names = []
+    for props in props_list:
+        names.extend(k for k in props if k not in names and k != "id")
+    columns = []
+    for name in names:
+        csv_type = _csv_type([p.get(name) for p in props_list])
+        columns.append((name, f"{name}:{csv_type}"))
+    return columns
+
+
+def _csv_value(value, array_delimiter: str) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple)):
+        return array_delimiter.join(_csv_value(v, array_delimiter) for v in value)
+    return str(value)
+
+
+def admin_import_command(args: List[str], database: str = "neo4j", array_delimiter: str = ";") -> str:
+    return (f"neo4j-admin database import full {database} --overwrite-destination "
+            f"--array-delimiter=\"{array_delimiter}\" " + " ".join(args))
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Lädt Extraktions-Checkpoints gebündelt nach Neo4j.")
+    cli.add_argument("checkpoints", nargs="+", help="JSONL-Checkpoint-Dateien (checkpoint.py)")
+    cli.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    cli.add_argument("--csv", metavar="DIR", default=None,
+                     help="Statt zu laden: CSV für neo4j-admin database import schreiben")
+    cli.add_argument("--no-schema", action="store_true", help="Constraints/Indizes nicht anlegen")
+    args = cli.parse_args()
+
+    loader = BulkLoader(batch_size=args.batch_size)
+    for path in args.checkpoints:
+        units = loader.add_checkpoint(path)
+        print(f"📂 {path}: {units} Einheiten")
+    nodes, rels = loader.counts()
+    print(f"   -> {loader.documents} Dokumente, {nodes} Knoten, {rels} Beziehungen "
+          f"({len(loader.nodes)} Labels, {len(loader.rels)} Beziehungsgruppen)")
+
+    if args.csv:
+        import_args = loader.export_admin_csv(args.csv)
+        print(f"\n💾 {len(import_args)} CSV-Dateien in {args.csv}. Import (DB gestoppt + leer):")
+        print(f"   {admin_import_command(import_args)}")
+        return
+
+    from dotenv import load_dotenv
+    from neo4j import GraphDatabase
+
+    from schema_manager import plan_schema
+
+    load_dotenv()
+    driver = GraphDatabase.driver(os.getenv("NEO4J_URI"),
+                                  auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")))
+    try:
+        if not args.no_schema:
+            with driver.session() as session:
+                for statement in plan_schema(loader.nodes, vector_dim=None):
+                    try:
+                        session.run(statement.cypher).consume()
+                    except Exception as e:
+                        print(f"   ⚠️  {statement.name}: {str(e)[:100]}")
+        print("\n🚚 Lade...")
+        stats = loader.load(driver)
+    finally:
+        driver.close()
+    print(f"\n✅ {stats.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Checkpoints für lange Extraktionsläufe
+======================================
+
+Jede fertig extrahierte Einheit (Abschnitt, Chunk, Fenster) wird sofort als
+eine Zeile an eine JSONL-Datei angehängt:
+
+    {"key": "...", "fingerprint": "...", "data": {...}}
+
+Bricht der Lauf ab (Ollama-Timeout, OOM, Strg+C), kann er mit `--resume`
+weiterlaufen: Einheiten, deren Key UND Fingerprint im Checkpoint stehen,
+werden von dort übernommen statt erneut ans LLM zu gehen. Ändert sich der
+Input (Text, Modell, Modus), ändert sich der Fingerprint und die Einheit wird
+neu extrahiert.
+
+Ohne `resume` beginnt die Datei leer. Eine halb geschriebene letzte Zeile
+(Abbruch mitten im Schreiben) wird beim Laden ignoriert.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import List, Optional
+
+CHECKPOINT_DIR = "checkpoints"
+
+
+def fingerprint(*parts) -> str:
+    """Stabiler Hash über alle Teile, die das Extraktionsergebnis bestimmen."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()[:16]
+
+
+def checkpoint_path(name: str) -> str:
+    return os.path.join(CHECKPOINT_DIR, f"{name}.jsonl")
+
+
+class ExtractionCheckpoint:
+    """
+    Append-only JSONL-Checkpoint, thread-safe (parallele Abschnitte/Fenster
+    dürfen gleichzeitig `append` aufrufen).
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.resume = resume
+        self.reused = 0
+        self.written = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if resume and os.path.exists(path):
+            self._load()
+        else:
+            open(path, "w", encoding="utf-8").close()
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # abgebrochene letzte Zeile
+                # Spätere Einträge gewinnen
+                self._entries[entry["key"]] = (entry["fingerprint"], entry["data"])
+
+        # Nach einer abgebrochenen Zeile muss der nächste Eintrag auf einer neuen Zeile beginnen
+        with open(self.path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, fp: str) -> Optional[dict]:
+        """Gespeichertes Ergebnis, falls Key und Fingerprint passen - sonst None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != fp:
+                return None
+            self.reused += 1
+            return entry[1]
+
+    def append(self, key: str, fp: str, data: dict):
+        line = json.dumps({"key": key, "fingerprint": fp, "data": data}, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._entries[key] = (fp, data)
+            self.written += 1
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "reused": self.reused, "written": self.written}
+
+    def summary(self) -> str:
+        return (f"Checkpoint {self.path}: {self.reused} Einheiten übernommen, "
+                f"{self.written} neu geschrieben")
+
+
+# --- LangChain GraphDocuments (für die LLMGraphTransformer-Skripte) ---
+
+def graph_documents_to_data(graph_docs) -> dict:
+    """GraphDocuments -> JSON-fähiges Dict (Knoten/Kanten inkl. Properties)."""
+    docs = []
+    for doc in graph_docs:
+        docs.append({
+            "nodes": [{"id": n.id, "type": n.type, "properties": dict(n.properties)} for n in doc.nodes],
+            "relationships": [{
+                "source": {"id": r.source.id, "type": r.source.type},
+                "target": {"id": r.target.id, "type": r.target.type},
+                "type": r.type,
+                "properties": dict(r.properties),
+            } for r in doc.relationships],
+        })
+    return {"graph_documents": docs}
+
+
+def graph_documents_from_data(data: dict, source_documents) -> List:
+    """Gegenstück zu graph_documents_to_data; `source_documents` wie beim Extrahieren."""
+    from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+
+    graph_docs = []
+    for doc, source in zip(data["graph_documents"], source_documents):
+        nodes = [Node(id=n["id"], type=n["type"], properties=n["properties"]) for n in doc["nodes"]]
+        rels = [Relationship(
+            source=Node(id=r["source"]["id"], type=r["source"]["type"]),
+            target=Node(id=r["target"]["id"], type=r["target"]["type"]),
+            type=r["type"],
+            properties=r["properties"],
+        ) for r in doc["relationships"]]
+        graph_docs.append(GraphDocument(nodes=nodes, relationships=rels, source=source))
+    return graph_docs
@@ -0,0 +1,188 @@
+"""
+Embedding-Backfill für bestehende Graphen
+=========================================
+
+Vorher (benchmark_graph_build.py):
+
+    for record in graph.query("MATCH (n) RETURN n.id AS id"):
+        vec = embedder.embed_query(record["id"])
+        graph.query("MATCH (n) WHERE n.id = $id SET n.embedding = $vec", ...)
+
+Pro Knoten ein Embedding-Call und ein label-loses MATCH über `n.id` - ohne
+Index ist das jedes Mal ein Scan über den ganzen Graphen, insgesamt also
+quadratisch.
+
+Hier:
+
+  MATCH (n) WHERE n.embedding IS NULL ... ──stream──> Seiten à page_size
+      │ Seite in Batches à batch_size zerlegen
+      │ embed_documents(batch) (parallel, AdaptiveLimiter regelt)
+      └─> UNWIND $rows MATCH (n) WHERE elementId(n) = row.eid SET n.embedding = ...
+
+Der Lookup per elementId ist ein direkter Zugriff, kein Scan. Die Knoten
+werden in einem einzigen lesenden Durchlauf gestreamt, geschrieben wird pro
+Seite in einer eigenen Transaktion.
+
+Fortsetzbar ohne eigene Checkpoint-Datei: der Zustand steht in der DB. Bei
+einem Abbruch sind alle fertigen Seiten committet, der nächste Lauf holt nur
+noch Knoten mit `embedding IS NULL`. Fehlgeschlagene Batches bleiben NULL
+und werden beim nächsten Lauf erneut versucht.
+
+Aufruf:
+    python embedding_backfill.py [--label Entity] [--page-size 1000] [--batch-size 64] [--workers 4]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from graph_writer import quote_name
+from query_cache import BUMP_VERSION_QUERY
+
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_WORKERS = 4
+
+
+@dataclass
+class BackfillStats:
+    total: int = 0          # Knoten ohne Embedding beim Start
+    embedded: int = 0
+    failed: int = 0
+    pages: int = 0
+    dimension: Optional[int] = None
+    embed_s: float = 0.0
+    write_s: float = 0.0
+    wall_s: float = 0.0
+
+    def nodes_per_s(self) -> float:
+        return self.embedded / self.wall_s if self.wall_s else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.embedded}/{self.total} Knoten eingebettet in {self.wall_s:.1f}s "
+                f"({self.nodes_per_s():.1f} Knoten/s, {self.pages} Seiten, "
+                f"Embedding {self.embed_s:.1f}s, Schreiben {self.write_s:.1f}s, "
+                f"{self.failed} fehlgeschlagen)")
+
+
+def _missing_filter(label: Optional[str], text_property: str) -> str:
+    match = f"MATCH (n:{quote_name(label)})" if label else "MATCH (n)"
+    return f"{match} WHERE n.embedding IS NULL AND n.{quote_name(text_property)} IS NOT NULL"
+
+
+def _write_page(tx, rows: List[dict]):
+    tx.run("""
+        UNWIND $rows AS row
+        MATCH (n) WHERE elementId(n) = row.eid
+        SET n.embedding = row.embedding, n.embedded_at = timestamp()
+    """, rows=rows).consume()
+
+
+def backfill_embeddings(driver, embedder, label: str = None, text_property: str = "id",
+                        page_size: int = DEFAULT_PAGE_SIZE, batch_size: int = DEFAULT_BATCH_SIZE,
+                        workers: int = DEFAULT_WORKERS, database: str = None,
+                        log: Callable[[str], None] = print) -> BackfillStats:
+    """
+    Bettet alle Knoten ohne `embedding` ein (Text = `n.<text_property>`).
+
+    driver: neo4j.Driver. Gestreamt wird über eine eigene Session, damit
+    nicht alle Knoten auf einmal im Speicher landen.
+    """
+    stats = BackfillStats()
+    where = _missing_filter(label, text_property)
+    start = time.perf_counter()
+
+    with driver.session(database=database) as reader, driver.session(database=database) as writer:
+        stats.total = reader.run(f"{where} RETURN count(n) AS c").single()["c"]
+        log(f"⚡ Embedding-Backfill: {stats.total} Knoten ohne Embedding")
+        if stats.total == 0:
+            return stats
+
+        def embed_batch(batch: List[dict]):
+            try:
+                return embedder.embed_documents([row["text"] for row in batch]), None
+            except Exception as e:
+                return None, e
+
+        def flush(page: List[dict]):
+            t0 = time.perf_counter()
+            batches = [page[i:i + batch_size] for i in range(0, len(page), batch_size)]
+            rows = []
+            for batch, (vectors, error) in zip(batches, executor.map(embed_batch, batches)):
+                if error is not None:
+                    stats.failed += len(batch)
+                    log(f"   ❌ Embedding-Batch fehlgeschlagen ({len(batch)} Knoten): {str(error)[:100]}")
+                    continue
+                rows += [{"eid": row["eid"], "embedding": vector} for row, vector in zip(batch, vectors)]
+            t1 = time.perf_counter()
+            if rows:
+                if stats.dimension is None:
+                    stats.dimension = len(rows[0]["embedding"])
+                writer.execute_write(_write_page, rows)
+            t2 = time.perf_counter()
+
+            stats.embed_s += t1 - t0
+            stats.write_s += t2 - t1
+            stats.embedded += len(rows)
+            stats.pages += 1
+            stats.wall_s = t2 - start
+            log(f"   📦 Seite {stats.pages}: {stats.embedded + stats.failed}/{stats.total} "
+                f"({stats.nodes_per_s():.1f} Knoten/s)")
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            page: List[dict] = []
+            result = reader.run(f"{where} RETURN elementId(n) AS eid, "
+                                f"toString(n.{quote_name(text_property)}) AS text")
+            for record in result:
+                page.append({"eid": record["eid"], "text": record["text"]})
+                if len(page) >= page_size:
+                    flush(page)
+                    page = []
+            if page:
+                flush(page)
+        if stats.embedded:
+            writer.execute_write(lambda tx: tx.run(BUMP_VERSION_QUERY).consume())
+
+    stats.wall_s = time.perf_counter() - start
+    return stats
+
+
+def main():
+    from dotenv import load_dotenv
+    from neo4j import GraphDatabase
+
+    from adaptive_limiter import LimitedOllamaEmbeddings, shared_limiter
+
+    cli = argparse.ArgumentParser(description="Berechnet fehlende Knoten-Embeddings in Batches.")
+    cli.add_argument("--label", default=None, help="Nur Knoten mit diesem Label (Standard: alle)")
+    cli.add_argument("--property", default="id", help="Property, deren Text eingebettet wird")
+    cli.add_argument("--model", default="nomic-embed-text")
+    cli.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    cli.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    cli.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                     help="Obergrenze paralleler Embedding-Batches")
+    args = cli.parse_args()
+
+    load_dotenv()
+    driver = GraphDatabase.driver(os.getenv("NEO4J_URI"),
+                                  auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")))
+    embed_limiter = shared_limiter("embed", max_limit=args.workers)
+    embedder = LimitedOllamaEmbeddings(model=args.model, limiter=embed_limiter)
+    try:
+        stats = backfill_embeddings(driver, embedder, label=args.label, text_property=args.property,
+                                    page_size=args.page_size, batch_size=args.batch_size,
+                                    workers=args.workers)
+    finally:
+        driver.close()
+
+    print(f"\n✅ {stats.summary()}")
+    print(f"🎚️  {embed_limiter.summary()}")
+    if stats.failed:
+        print("   -> Fehlgeschlagene Knoten haben weiter kein Embedding; einfach erneut starten.")
+
+
+if __name__ == "__main__":
+    main()
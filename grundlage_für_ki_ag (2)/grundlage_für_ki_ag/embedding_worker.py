@@ -0,0 +1,183 @@
+"""
+Hintergrund-Embeddings für die Graph-Builder
+=============================================
+
+Statt nach der Extraktion jeden Knoten einzeln mit `embed_query` zu
+vektorisieren, läuft hier ein Thread parallel zur LLM-Extraktion:
+
+  Builder ──submit(neue Entities)──> Queue ──> BackgroundEmbedder
+                                                 │ dedupliziert (normalisierte ID)
+                                                 │ sammelt Batches
+                                                 │ embed_documents([...])
+                                                 └─> UNWIND ... SET n.embedding
+
+Die Knoten müssen schon in Neo4j stehen, wenn sie eingereicht werden (der
+Worker MATCHt nur und setzt das Embedding).
+
+Ein fehlgeschlagener Batch wird bis zu `retries`-mal mit Backoff wiederholt.
+Scheitert er endgültig, werden seine IDs wieder aus `seen` entfernt (ein
+späteres submit() versucht es erneut) und in `failed` gemeldet.
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from graph_writer import quote_name
+
+_STOP = object()
+DEFAULT_RETRIES = 3
+RETRY_BACKOFF_S = 1.0
+
+
+def _default_normalize(entity_id: str) -> str:
+    return " ".join(entity_id.split()).lower()
+
+
+class BackgroundEmbedder:
+    """
+    Berechnet Embeddings in einem eigenen Thread und schreibt sie in die DB.
+
+    on_dimension(dim) wird einmalig aufgerufen, sobald das erste Embedding da
+    ist - z.B. um den Vector Index anzulegen.
+    """
+
+    def __init__(self, embedder, graph, batch_size: int = 32, max_wait_s: float = 0.5,
+                 normalize: Callable[[str], str] = _default_normalize,
+                 on_dimension: Optional[Callable[[int], None]] = None,
+                 log: Callable[[str], None] = print, retries: int = DEFAULT_RETRIES):
+        self.embedder = embedder
+        self.retries = retries
+        self.graph = graph
+        self.batch_size = batch_size
+        self.max_wait_s = max_wait_s
+        self.normalize = normalize
+        self.on_dimension = on_dimension
+        self.log = log
+
+        self.embedded = 0
+        self.batches = 0
+        self.errors = 0            # fehlgeschlagene Versuche (inkl. erfolgreicher Retries)
+        self.failed: List[str] = []  # endgültig ohne Embedding
+        self.busy_s = 0.0
+        self.dimension: Optional[int] = None
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._seen = set()
+        self._seen_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="background-embedder", daemon=True)
+        self._thread.start()
+
+    # --- Producer-Seite ---
+
+    def submit(self, entities: Iterable[Tuple[str, str]], vectors: Dict[str, List[float]] = None):
+        """
+        Reicht (entity_id, label) Paare ein; bereits gesehene IDs werden übersprungen.
+        `vectors` (normalisierte ID -> Embedding, z.B. aus der Entity Resolution)
+        werden nur noch geschrieben, nicht erneut eingebettet.
+        """
+        for entity_id, label in entities:
+            key = self.normalize(entity_id)
+            with self._seen_lock:
+                if key in self._seen:
+                    continue
+                self._seen.add(key)
+            self._queue.put((entity_id, label, (vectors or {}).get(key)))
+
+    def mark_seen(self, entity_ids: Iterable[str]):
+        """Merkt IDs als erledigt vor (z.B. weil sie schon ein Embedding in der DB haben)."""
+        with self._seen_lock:
+            self._seen.update(self.normalize(entity_id) for entity_id in entity_ids)
+
+    def close(self) -> dict:
+        """Wartet, bis alle eingereichten Entities eingebettet sind."""
+        self._queue.put(_STOP)
+        self._thread.join()
+        return self.stats()
+
+    def stats(self) -> dict:
+        return {
+            "embedded": self.embedded,
+            "batches": self.batches,
+            "errors": self.errors,
+            "failed": len(self.failed),
+            "busy_s": self.busy_s,
+            "pending": self._queue.qsize(),
+        }
+
+    # --- Worker-Seite ---
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch: List[Tuple[str, str, Optional[List[float]]]] = []
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch.append(item)
+
+            # Batch auffüllen, aber nicht ewig warten
+            deadline = time.monotonic() + self.max_wait_s
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._process(batch)
+
+    def _process(self, batch: List[Tuple[str, str, Optional[List[float]]]]):
+        start = time.perf_counter()
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    self._embed_and_write(batch)
+                    return
+                except Exception as e:
+                    self.errors += 1
+                    self.log(f"❌ Embedding-Batch fehlgeschlagen ({len(batch)} Entities, "
+                             f"Versuch {attempt + 1}/{self.retries + 1}): {str(e)[:100]}")
+                    if attempt < self.retries:
+                        time.sleep(RETRY_BACKOFF_S * 2 ** attempt)
+
+            # Endgültig gescheitert: nicht als erledigt merken
+            with self._seen_lock:
+                self._seen.difference_update(self.normalize(entity_id) for entity_id, _, _ in batch)
+            self.failed.extend(entity_id for entity_id, _, _ in batch)
+        finally:
+            self.busy_s += time.perf_counter() - start
+
+    def _embed_and_write(self, batch: List[Tuple[str, str, Optional[List[float]]]]):
+        vectors = [vector for _, _, vector in batch]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            embedded = self.embedder.embed_documents([batch[i][0] for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+
+        if self.dimension is None and vectors:
+            self.dimension = len(vectors[0])
+            if self.on_dimension is not None:
+                self.on_dimension(self.dimension)
+
+        rows_by_label: Dict[str, List[dict]] = {}
+        for (entity_id, label, _), vector in zip(batch, vectors):
+            rows_by_label.setdefault(label, []).append({"id": entity_id, "embedding": vector})
+
+        for label, rows in rows_by_label.items():
+            self.graph.query(f"""
+                UNWIND $rows AS row
+                MATCH (n:{quote_name(label)} {{id: row.id}})
+                SET n.embedding = row.embedding, n.embedded_at = timestamp()
+            """, params={"rows": rows})
+
+        self.embedded += len(batch)
+        self.batches += 1
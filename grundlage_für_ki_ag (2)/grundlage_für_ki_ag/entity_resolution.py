@@ -0,0 +1,367 @@
+"""
+Fuzzy Entity Resolution
+=======================
+
+`merge_entities` fasst nur Namen zusammen, die nach `normalize_id` identisch
+sind. "Peter Klein", "Hr. Klein" und "P. Klein" landen so als drei Knoten im
+Graphen. Dieser Resolver erkennt solche Varianten, ohne alle Paare zu
+vergleichen:
+
+  1. Blocking  - MinHash-LSH über Zeichen-3-Gramme + Nachnamen-Blöcke
+                 (nur Namen im selben Bucket werden überhaupt verglichen)
+  2. Regeln    - Titel/Initialen/Nummern müssen zusammenpassen
+                 ("Raum 404" != "Raum 303", "Peter Klein" != "Petra Klein")
+  3. Cosine    - Embedding-Ähnlichkeit auf den Kandidatenpaaren
+
+Die kanonische Erwähnung ("Peter Klein") hat meist keine Anrede. Das
+Geschlecht einer zusammengeführten Variante ("Hr. Klein") wird deshalb an der
+Entity gemerkt - "Fr. Klein" passt danach nicht mehr zu "Peter Klein".
+Erwähnungen nur aus Anrede/Initiale ("Fr. Klein", "P. Klein") werden nicht
+zusammengeführt, wenn mehrere passende Entities verschiedene Vornamen haben.
+
+Der Resolver arbeitet online: jede neue Erwähnung wird gegen alle bisher
+bekannten Entities aufgelöst und danach selbst in den Index aufgenommen. Die
+erste Schreibweise bleibt die kanonische (wie bei merge_entities).
+
+Mit `resolve_against_graph` werden Erwähnungen zusätzlich batchweise gegen
+die Entities in Neo4j aufgelöst (über den Vektor-Index `entity_index`).
+"""
+
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Titel/Anreden, die für den Vergleich entfernt werden
+TITLES = {"hr", "herr", "fr", "frau", "dr", "prof", "mr", "mrs", "ms", "dipl", "ing"}
+GENDER_TITLES = {"hr": "m", "herr": "m", "mr": "m", "fr": "w", "frau": "w", "mrs": "w", "ms": "w"}
+PERSON_TYPES = {"Person"}
+
+_WORD = re.compile(r"\w+")
+_DIGITS = re.compile(r"\d+")
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def _normalize(name: str) -> str:
+    return " ".join(name.replace('"', "").replace("'", "").lower().split())
+
+
+def char_ngrams(text: str, n: int = 3) -> Set[str]:
+    padded = f" {text} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+@dataclass
+class _Mention:
+    name: str                      # kanonische Schreibweise
+    norm: str
+    entity_type: str
+    tokens: List[str]              # ohne Titel
+    gender: Optional[str]          # aus der Anrede, bei Entities auch aus zusammengeführten Varianten
+    numbers: Tuple[str, ...]
+    ngrams: Set[str]
+    vector: np.ndarray = field(default=None, repr=False)
+
+
+def _parse(name: str, entity_type: str) -> _Mention:
+    norm = _normalize(name)
+    words = _WORD.findall(norm)
+    gender = next((GENDER_TITLES[w] for w in words if w in GENDER_TITLES), None)
+    tokens = [w for w in words if w not in TITLES]
+    return _Mention(
+        name=name, norm=norm, entity_type=entity_type, tokens=tokens, gender=gender,
+        numbers=tuple(_DIGITS.findall(norm)), ngrams=char_ngrams(norm),
+    )
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def names_compatible(a: _Mention, b: _Mention) -> bool:
+    """Harte Regeln, die eine Zusammenführung ausschließen."""
+    if a.entity_type != b.entity_type:
+        return False
+    if a.numbers != b.numbers:
+        return False  # "Raum 404" vs "Raum 303", "13:45" vs "13:46"
+
+    if a.entity_type not in PERSON_TYPES:
+        return True
+
+    if a.gender and b.gender and a.gender != b.gender:
+        return False  # "Hr. Klein" vs "Fr. Klein"
+    if not a.tokens or not b.tokens:
+        return False
+    if a.tokens[-1] != b.tokens[-1]:
+        return False  # Nachname muss gleich sein
+
+    # Vornamen: jeder Vorname des kürzeren Namens muss passen (gleich oder Initiale)
+    short, long_ = sorted((a.tokens[:-1], b.tokens[:-1]), key=len)
+    for token in short:
+        if not any(t == token or (len(token) == 1 and t.startswith(token))
+                   or (len(t) == 1 and token.startswith(t)) for t in long_):
+            return False
+    return True
+
+
+def _has_first_name(mention: _Mention) -> bool:
+    return any(len(token) > 1 for token in mention.tokens[:-1])
+
+
+def first_names_ambiguous(mention: _Mention, candidates: Sequence[_Mention]) -> bool:
+    """Nur Anrede/Initiale und passende Entities mit verschiedenen Vornamen -> nicht raten."""
+    if mention.entity_type not in PERSON_TYPES or _has_first_name(mention):
+        return False
+    first_names = {tuple(c.tokens[:-1]) for c in candidates if _has_first_name(c)}
+    return len(first_names) > 1
+
+
+class MinHashLSH:
+    """MinHash-Signaturen + Banding. Nur Namen im selben Band-Bucket werden Kandidaten."""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 42):
+        if num_perm % bands:
+            raise ValueError("num_perm muss durch bands teilbar sein")
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._a = rng.randint(1, 2 ** 31 - 1, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, 2 ** 31 - 1, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+
+    def signature(self, shingles: Set[str]) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        # (num_perm x n_shingles) -> Minimum pro Permutation
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def query(self, signature: np.ndarray, max_bucket_size: int = 0) -> Dict[int, int]:
+        """
+        Kandidaten -> Anzahl gemeinsamer Bänder (Schätzer für die Jaccard-Ähnlichkeit).
+        Überfüllte Buckets (z.B. alle "raum ..."-Namen) werden mit max_bucket_size
+        übersprungen, sonst kippt das Blocking wieder Richtung "alle Paare".
+        """
+        found: Dict[int, int] = {}
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key, ())
+            if max_bucket_size and len(bucket) > max_bucket_size:
+                continue
+            for item in bucket:
+                found[item] = found.get(item, 0) + 1
+        return found
+
+    def insert(self, item: int, signature: np.ndarray):
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(item)
+
+
+class EntityResolver:
+    """
+    Online-Resolver: `resolve()` bildet jede Erwähnung (Name, Typ) auf die
+    kanonische Schreibweise ab und nimmt neue Entities in den Index auf.
+
+    embed_fn: Liste von Namen -> Liste von Vektoren (z.B. embedder.embed_documents)
+    """
+
+    def __init__(self, embed_fn: Callable[[List[str]], Sequence[Sequence[float]]],
+                 person_threshold: float = 0.60, threshold: float = 0.90,
+                 min_jaccard: float = 0.5, num_perm: int = 64, bands: int = 16,
+                 max_block_size: int = 200, max_candidates: int = 50):
+        self.embed_fn = embed_fn
+        self.person_threshold = person_threshold
+        self.threshold = threshold
+        self.min_jaccard = min_jaccard
+        self.max_block_size = max_block_size
+        self.max_candidates = max_candidates
+
+        self.lsh = MinHashLSH(num_perm=num_perm, bands=bands)
+        self._entities: List[_Mention] = []
+        self._by_norm: Dict[Tuple[str, str], int] = {}         # (Typ, norm) -> Entity-Index
+        self._blocks: Dict[Tuple[str, str], List[int]] = {}    # (Typ, Nachname) -> Entities
+
+        self.pairs_compared = 0
+        self.merges = 0
+
+    # --- Intern ---
+
+    def _candidates(self, mention: _Mention, signature: np.ndarray) -> List[int]:
+        found = self.lsh.query(signature, self.max_block_size)
+        if mention.entity_type in PERSON_TYPES and mention.tokens:
+            block = self._blocks.get((mention.entity_type, mention.tokens[-1]), [])
+            if len(block) <= self.max_block_size:  # riesige Blöcke (z.B. "müller") überspringen
+                for i in block:
+                    found.setdefault(i, 0)
+        candidates = [i for i in found if self._entities[i].entity_type == mention.entity_type]
+        # Ähnlichste zuerst (meiste gemeinsame LSH-Bänder), bei Gleichstand die ältere Entity
+        candidates.sort(key=lambda i: (-found[i], i))
+        return candidates[:self.max_candidates]
+
+    def _score(self, mention: _Mention, other: _Mention) -> float:
+        self.pairs_compared += 1
+        if not names_compatible(mention, other):
+            return 0.0
+        cosine = float(np.dot(mention.vector, other.vector))
+        if mention.entity_type in PERSON_TYPES:
+            return cosine if cosine >= self.person_threshold else 0.0
+        if cosine >= self.threshold and _jaccard(mention.ngrams, other.ngrams) >= self.min_jaccard:
+            return cosine
+        return 0.0
+
+    def _add(self, mention: _Mention, signature: np.ndarray) -> int:
+        index = len(self._entities)
+        self._entities.append(mention)
+        self._by_norm[(mention.entity_type, mention.norm)] = index
+        self.lsh.insert(index, signature)
+        if mention.entity_type in PERSON_TYPES and mention.tokens:
+            self._blocks.setdefault((mention.entity_type, mention.tokens[-1]), []).append(index)
+        return index
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    # --- API ---
+
+    def similarity(self, a: Tuple[str, str], a_vector: Sequence[float],
+                   b: Tuple[str, str], b_vector: Sequence[float]) -> float:
+        """Score zweier (Name, Typ)-Paare wie in resolve(); 0.0 = nicht zusammenführen."""
+        mention, other = _parse(*a), _parse(*b)
+        mention.vector, other.vector = self._unit(a_vector), self._unit(b_vector)
+        return self._score(mention, other)
+
+    def add_known(self, entities: Sequence[Tuple[str, str]],
+                  vectors: Optional[Sequence[Sequence[float]]] = None):
+        """Nimmt bereits kanonische Entities (z.B. aus der DB) ohne Auflösung auf."""
+        if vectors is None:
+            vectors = self.embed_fn([name for name, _ in entities]) if entities else []
+        for (name, entity_type), vector in zip(entities, vectors):
+            mention = _parse(name, entity_type)
+            if (entity_type, mention.norm) in self._by_norm:
+                continue
+            mention.vector = self._unit(vector)
+            self._add(mention, self.lsh.signature(mention.ngrams))
+
+    def resolve(self, mentions: Sequence[Tuple[str, str]],
+                vectors: Optional[Dict[Tuple[str, str], Sequence[float]]] = None) -> Dict[Tuple[str, str], str]:
+        """
+        Löst (Name, Typ) Erwähnungen auf. Rückgabe: (Name, Typ) -> kanonischer Name.
+        Reihenfolge-stabil: bei gleicher Eingabe immer das gleiche Ergebnis.
+        `vectors` ((Name, Typ) -> Embedding) spart den embed_fn-Call für diese Namen.
+        """
+        result: Dict[Tuple[str, str], str] = {}
+        pending: List[Tuple[Tuple[str, str], _Mention]] = []
+
+        for name, entity_type in mentions:
+            if (name, entity_type) in result:
+                continue
+            mention = _parse(name, entity_type)
+            known = self._by_norm.get((entity_type, mention.norm))
+            if known is not None:
+                result[(name, entity_type)] = self._entities[known].name
+            else:
+                pending.append(((name, entity_type), mention))
+
+        # Exakte Dubletten innerhalb des Batches nur einmal einbetten
+        unique: Dict[Tuple[str, str], _Mention] = {}
+        for _, mention in pending:
+            unique.setdefault((mention.entity_type, mention.norm), mention)
+        vectors = vectors or {}
+        missing = [m for m in unique.values() if (m.name, m.entity_type) not in vectors]
+        if missing:
+            for mention, vector in zip(missing, self.embed_fn([m.name for m in missing])):
+                mention.vector = self._unit(vector)
+        for mention in unique.values():
+            if mention.vector is None:
+                mention.vector = self._unit(vectors[(mention.name, mention.entity_type)])
+
+        for key, mention in pending:
+            known = self._by_norm.get((mention.entity_type, mention.norm))
+            if known is not None:
+                result[key] = self._entities[known].name
+                continue
+
+            mention = unique[(mention.entity_type, mention.norm)]
+            signature = self.lsh.signature(mention.ngrams)
+            best, best_score, matches = None, 0.0, []
+            for candidate in self._candidates(mention, signature):
+                score = self._score(mention, self._entities[candidate])
+                if score > 0:
+                    matches.append(self._entities[candidate])
+                if score > best_score:
+                    best, best_score = candidate, score
+            if best is not None and first_names_ambiguous(mention, matches):
+                # "P. Klein" bei "Peter Klein" und "Petra Klein": unaufgelöst lassen und
+                # nicht indizieren, sonst zieht die Variante spätere Erwähnungen an
+                result[key] = mention.name
+            elif best is not None:
+                # Variante merken, damit dieselbe Schreibweise nicht erneut verglichen wird
+                self._by_norm[(mention.entity_type, mention.norm)] = best
+                canonical = self._entities[best]
+                if canonical.gender is None:
+                    canonical.gender = mention.gender   # "Hr. Klein" -> "Peter Klein" ist männlich
+                self.merges += 1
+                result[key] = canonical.name
+            else:
+                self._add(mention, signature)
+                result[key] = mention.name
+
+        return result
+
+    def stats(self) -> dict:
+        return {"entities": len(self._entities), "pairs_compared": self.pairs_compared,
+                "merges": self.merges}
+
+
+def resolve_against_graph(graph, resolver: EntityResolver, mentions: Sequence[Tuple[str, str]],
+                          k: int = 5, index_name: str = "entity_index",
+                          vectors: Optional[Dict[Tuple[str, str], Sequence[float]]] = None
+                          ) -> Dict[Tuple[str, str], str]:
+    """
+    Löst Erwähnungen batchweise gegen die Entities in Neo4j auf: EIN Query mit
+    UNWIND über alle Vektoren, dann dieselben Namensregeln wie lokal.
+    Rückgabe: (Name, Typ) -> id des existierenden Knotens (nur Treffer).
+
+    Ohne Vektor-Index (frische DB, der Builder legt ihn erst nach dem ersten
+    Embedding-Batch an) gibt es nichts aufzulösen -> {}.
+    `vectors` ((Name, Typ) -> Embedding) vermeidet erneutes Einbetten.
+    """
+    mentions = list(dict.fromkeys(mentions))
+    if not mentions:
+        return {}
+    if not graph.query("SHOW INDEXES YIELD name WHERE name = $name RETURN name",
+                       params={"name": index_name}):
+        return {}
+
+    if vectors is None or any(m not in vectors for m in mentions):
+        vectors = dict(zip(mentions, resolver.embed_fn([name for name, _ in mentions])))
+    rows = [{"i": i, "vec": list(map(float, vectors[m]))} for i, m in enumerate(mentions)]
+
+    hits = graph.query(f"""
+        UNWIND $rows AS row
+        CALL db.index.vector.queryNodes('{index_name}', $k, row.vec)
+        YIELD node, score
+        RETURN row.i AS i, node.id AS id, [l IN labels(node) WHERE l <> 'Entity'][0] AS type,
+               node.embedding AS embedding, score
+        ORDER BY i, score DESC
+    """, params={"rows": rows, "k": k})
+
+    result: Dict[Tuple[str, str], str] = {}
+    for hit in hits:
+        key = mentions[hit["i"]]
+        if key in result or hit["id"] is None:
+            continue
+        if resolver.similarity(key, vectors[key], (hit["id"], hit["type"] or ""), hit["embedding"]) > 0:
+            result[key] = hit["id"]
+    return result
@@ -4,6 +4,8 @@ from neo4j import GraphDatabase
 from neo4j_graphrag.retrievers import VectorCypherRetriever
 from neo4j_graphrag.generation import GraphRAG
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
+from query_cache import CypherResultCache, VersionStamp, cache_retriever, read_graph_version
+from hybrid_retriever import HybridRRFRetriever, ensure_fulltext_index
 
 load_dotenv()
 
@@ -42,6 +44,10 @@ llm_adapter = GoogleGenAIAdapter(llm)
 # Wir nutzen den Index "entity_index", den setup_db.py erstellt hat.
 
 INDEX_NAME = "entity_index"
+FULLTEXT_INDEX_NAME = "entity_fulltext"
+# "hybrid": Fulltext + Vektor parallel, RRF-fusioniert (exakte Namen wie "H100" gewinnen)
+# "vector": nur VectorCypherRetriever
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
 
 # Die Query holt den gefundenen Knoten UND seine Nachbarn (Context)
 retrieval_query = """
@@ -55,12 +61,26 @@ RETURN
 """
 
 # --- 3. RAG INITIALISIEREN ---
-retriever = VectorCypherRetriever(
-    driver,
-    index_name=INDEX_NAME,
-    embedder=embedder,        # Wichtig: Embeddet deine Frage live
-    retrieval_query=retrieval_query,
-)
+if RETRIEVAL_MODE == "hybrid":
+    ensure_fulltext_index(driver)   # entity_fulltext auf :Entity(id), wie setup_db.py
+    retriever = HybridRRFRetriever(
+        driver,
+        embedder=embedder,
+        retrieval_query=retrieval_query,   # gleiche Nachbar-Expansion wie im Vektor-Modus
+        vector_index_name=INDEX_NAME,
+        fulltext_index_name=FULLTEXT_INDEX_NAME,
+    )
+else:
+    retriever = VectorCypherRetriever(
+        driver,
+        index_name=INDEX_NAME,
+        embedder=embedder,        # Wichtig: Embeddet deine Frage live
+        retrieval_query=retrieval_query,
+    )
+# Gleiche Frage -> kein neuer Embedding-Call und keine neue Vector-Query,
+# solange die Graph-Version (query_cache.bump_graph_version) gleich bleibt
+query_cache = CypherResultCache()
+cache_retriever(retriever, query_cache, VersionStamp(lambda: read_graph_version(driver)))
 
 rag = GraphRAG(retriever=retriever, llm=llm_adapter)
 
@@ -72,7 +92,7 @@ questions = [
     "Tell me about Steve Jobs."
 ]
 
-print("\n🔎 Starte Graph-Suche (Context Mode)...\n")
+print(f"\n🔎 Starte Graph-Suche (Context Mode, {RETRIEVAL_MODE})...\n")
 
 try:
     for q in questions:
@@ -90,4 +110,5 @@ try:
         print("-" * 60)
 
 finally:
+    query_cache.print_stats()
     driver.close()
\ No newline at end of file
@@ -0,0 +1,450 @@
+"""
+Graph-Tools für die Agenten: indexgestützte Namenssuche und Nachbarschaft
+=========================================================================
+
+Die Agent-Tools suchten bisher mit
+
+    MATCH (n) WHERE n.id =~ ('(?i)' + $id) OR n.name =~ ('(?i)' + $id)
+
+Ein Regex-Vergleich kann keinen Index nutzen -> jeder Hop ist ein Scan über
+alle Knoten, und Eingaben wie "C++" oder "Dr. (Attis)" sind kaputte Regexe.
+
+Stattdessen:
+  1. exakter Treffer auf `lookup_key` (graph_writer.lookup_key(), beim
+     Schreiben gesetzt) über den Range-Index :Entity(lookup_key),
+  2. sonst Fulltext-Index entity_fulltext mit Fuzzy-Terms (Tippfehler,
+     Teilnamen),
+  3. Ergebnisse enthalten `elementId`s. Gibt der Agent im nächsten Hop eine
+     elementId statt eines Namens an, wird der Knoten direkt adressiert.
+
+Mehrere Hops in einem Schritt:  expand_paths(graph, "Microsoft", max_hops=3,
+rel_types=["USES", "MANUFACTURED_BY", "LOCATED_IN"]) liefert die Pfade ab dem
+Start-Knoten aus einer einzigen Query, statt dass das LLM Knoten für Knoten
+get_neighborhood aufruft (ein LLM-Roundtrip pro Hop).
+
+Mehrere Start-Kandidaten auf einmal:  get_neighborhoods(graph, ["A", "B", eid])
+- ein UNWIND-Query für alle, gruppiert pro Entity, mit gemeinsamem Zeilenbudget.
+
+Verbindung zwischen zwei Entities:  shortest_paths(graph, "Twitter", "PayPal")
+- beide Endpunkte über den Index aufgelöst, ein (all)ShortestPaths-Query.
+
+Bestandsgraphen ohne lookup_key:  backfill_lookup_keys(graph)
+"""
+
+import ast
+import re
+from typing import Dict, List
+
+from graph_writer import lookup_key, quote_name
+from query_cache import bump_graph_version
+from schema_manager import ENTITY_LABEL, FULLTEXT_INDEX_NAME, LOOKUP_PROPERTY, apply_schema, lookup_statements
+
+DEFAULT_NEIGHBOR_LIMIT = 20
+DEFAULT_CANDIDATE_LIMIT = 5
+DEFAULT_MAX_HOPS = 3
+MAX_HOPS = 5
+DEFAULT_FANOUT = 10        # Kanten pro Knoten und Hop
+DEFAULT_PATH_LIMIT = 30
+DEFAULT_ROW_BUDGET = 60    # Nachbarn insgesamt über alle Entities eines Batch-Calls
+DEFAULT_SHORTEST_HOPS = 6
+DEFAULT_SHORTEST_LIMIT = 5
+DIRECTIONS = {"out": ("-", "->"), "in": ("<-", "-"), "both": ("-", "-")}
+BACKFILL_PAGE_SIZE = 5000
+
+# Neo4j 5: "<db-nummer>:<db-uuid>:<id>"
+ELEMENT_ID_RE = re.compile(r"^\d+:[0-9a-fA-F-]{36}:\d+$")
+# Sonderzeichen der Lucene-Query-Syntax
+LUCENE_SPECIAL_RE = re.compile(r'([+\-!(){}\[\]^"~*?:\\/]|&&|\|\|)')
+
+
+def clean_input(text: str) -> str:
+    """Agent-Eingaben kommen oft mit Anführungszeichen und angehängten Zeilen."""
+    return str(text).strip().split("\n")[0].strip().strip('"').strip("'").strip()
+
+
+def is_element_id(text: str) -> bool:
+    return bool(ELEMENT_ID_RE.match(text))
+
+
+# =============================================================================
+# SCHEMA & BACKFILL
+# =============================================================================
+
+def ensure_lookup_indexes(graph, log=print) -> Dict[str, int]:
+    """Range-Index auf :Entity(lookup_key) und Fulltext-Index (idempotent)."""
+    return apply_schema(graph, lookup_statements(), log=log)
+
+
+def backfill_lookup_keys(graph, page_size: int = BACKFILL_PAGE_SIZE, log=print) -> int:
+    """Setzt lookup_key für alle Knoten mit id, denen er fehlt.
+
+    Der Schlüssel wird in Python berechnet (dieselbe Funktion wie beim
+    Schreiben), damit Unicode-Normalisierung exakt übereinstimmt.
+    """
+    total = 0
+    while True:
+        page = graph.query(f"""
+            MATCH (n) WHERE n.id IS NOT NULL AND n.{LOOKUP_PROPERTY} IS NULL
+            RETURN elementId(n) AS eid, n.id AS id
+            LIMIT $limit
+        """, params={"limit": page_size})
+        if not page:
+            break
+        rows = [{"eid": row["eid"], "key": lookup_key(row["id"])} for row in page]
+        graph.query(f"""
+            UNWIND $rows AS row
+            MATCH (n) WHERE elementId(n) = row.eid
+            SET n.{LOOKUP_PROPERTY} = row.key
+        """, params={"rows": rows})
+        total += len(rows)
+    if total:
+        bump_graph_version(graph)
+        log(f"   🔑 lookup_key für {total} Knoten nachgetragen")
+    return total
+
+
+# =============================================================================
+# SUCHE
+# =============================================================================
+
+def fulltext_query(name: str) -> str:
+    """Lucene-Query: Sonderzeichen escaped, jeder Term mit Fuzzy-Suffix."""
+    terms = [LUCENE_SPECIAL_RE.sub(r"\\\1", term) for term in lookup_key(name).split()]
+    return " AND ".join(f"{term}~" for term in terms if term)
+
+
+def start_element_ids(graph, ref: str) -> List[str]:
+    """elementId direkt, sonst alle exakten Treffer bzw. der beste Fuzzy-Treffer."""
+    ref = clean_input(ref)
+    if is_element_id(ref):
+        return [ref]
+    return pick_start_ids(resolve_entity(graph, ref))
+
+
+# Query-Texte sind Konstanten bzw. Builder, damit async_agent.py dieselben nutzt
+_CANDIDATE_RETURN = """
+    RETURN elementId(node) AS element_id, coalesce(node.id, node.name) AS id,
+           labels(node) AS labels, score
+"""
+EXACT_LOOKUP_QUERY = f"""
+    MATCH (node:{ENTITY_LABEL} {{{LOOKUP_PROPERTY}: $key}})
+    WITH node, 1.0 AS score LIMIT $limit
+""" + _CANDIDATE_RETURN
+FULLTEXT_LOOKUP_QUERY = """
+    CALL db.index.fulltext.queryNodes($index, $query, {limit: $limit})
+    YIELD node, score
+""" + _CANDIDATE_RETURN
+BATCH_LOOKUP_QUERY = f"""
+    UNWIND $keys AS key
+    MATCH (node:{ENTITY_LABEL} {{{LOOKUP_PROPERTY}: key}})
+    RETURN key, collect(elementId(node)) AS element_ids
+"""
+NEIGHBORHOOD_QUERY = """
+    MATCH (n) WHERE elementId(n) IN $element_ids
+    MATCH (n)-[r]-(m)
+    RETURN coalesce(n.id, n.name) AS source, elementId(n) AS source_element_id,
+           type(r) AS rel, startNode(r) = n AS outgoing,
+           coalesce(m.id, m.name) AS target, elementId(m) AS target_element_id,
+           labels(m) AS target_labels
+    LIMIT $limit
+"""
+NEIGHBORHOODS_QUERY = """
+    UNWIND $starts AS start
+    MATCH (n) WHERE elementId(n) = start.element_id
+    CALL {
+        WITH n
+        OPTIONAL MATCH (n)-[r]-(m)
+        RETURN r, m LIMIT $per_start
+    }
+    // OPTIONAL: Entities ohne Kanten liefern eine Zeile mit leerer Liste statt "nicht gefunden"
+    RETURN start.ref AS ref, coalesce(n.id, n.name) AS source, elementId(n) AS source_element_id,
+           collect(CASE WHEN r IS NOT NULL THEN
+                       {rel: type(r), outgoing: startNode(r) = n, target: coalesce(m.id, m.name),
+                        target_element_id: elementId(m)} END) AS neighbors
+"""
+
+
+def pick_start_ids(candidates: List[dict]) -> List[str]:
+    """Alle exakten Treffer (dieselbe id unter mehreren Labels), sonst nur der beste Fuzzy-Treffer."""
+    if candidates and candidates[0]["match"] == "fuzzy":
+        candidates = candidates[:1]
+    return [c["element_id"] for c in candidates]
+
+
+def resolve_entity(graph, name: str, limit: int = DEFAULT_CANDIDATE_LIMIT) -> List[dict]:
+    """Kandidaten für einen Namen: zuerst exakt über lookup_key, sonst fuzzy über Fulltext.
+
+    Jede Zeile hat element_id, id, labels, score und match ("exact" | "fuzzy").
+    """
+    key = lookup_key(clean_input(name))
+    if not key:
+        return []
+    exact = graph.query(EXACT_LOOKUP_QUERY, params={"key": key, "limit": limit})
+    if exact:
+        return [dict(row, match="exact") for row in exact]
+
+    query = fulltext_query(name)
+    if not query:
+        return []
+    try:
+        fuzzy = graph.query(FULLTEXT_LOOKUP_QUERY,
+                            params={"index": FULLTEXT_INDEX_NAME, "query": query, "limit": limit})
+    except Exception:
+        # Fulltext-Index fehlt (ensure_lookup_indexes nicht gelaufen)
+        return []
+    return [dict(row, match="fuzzy") for row in fuzzy]
+
+
+def get_neighborhood(graph, ref: str, limit: int = DEFAULT_NEIGHBOR_LIMIT) -> List[dict]:
+    """Nachbarn eines Knotens. `ref` ist eine elementId oder ein Name.
+
+    Bei einem Namen zählen alle exakten Treffer (dieselbe id unter mehreren
+    Labels), bei Fuzzy-Treffern nur der beste.
+    """
+    element_ids = start_element_ids(graph, ref)
+    if not element_ids:
+        return []
+    return graph.query(NEIGHBORHOOD_QUERY, params={"element_ids": element_ids, "limit": limit})
+
+
+def resolve_entities(graph, refs: List[str]) -> Dict[str, List[str]]:
+    """
+    elementIds für viele Refs: elementIds direkt, Namen per UNWIND über den
+    lookup_key-Index in einer Query. Nur Namen ohne exakten Treffer gehen
+    einzeln an den Fulltext-Fallback.
+    """
+    resolved = {ref: [ref] for ref in refs if is_element_id(ref)}
+    keys = {ref: lookup_key(ref) for ref in refs if ref not in resolved}
+    if keys:
+        rows = graph.query(BATCH_LOOKUP_QUERY, params={"keys": sorted(set(keys.values()))})
+        by_key = {row["key"]: row["element_ids"] for row in rows}
+        for ref, key in keys.items():
+            resolved[ref] = by_key.get(key) or start_element_ids(graph, ref)
+    return resolved
+
+
+def get_neighborhoods(graph, refs: List[str], row_budget: int = DEFAULT_ROW_BUDGET) -> List[dict]:
+    """Nachbarschaften mehrerer Knoten (Namen oder elementIds) in einem UNWIND-Query.
+
+    Das Budget wird gleichmäßig auf die aufgelösten Start-Knoten verteilt.
+    Rückgabe pro Ref in Eingabe-Reihenfolge:
+        {ref, source, source_element_id, neighbors: [{rel, outgoing, target, target_element_id}]}
+    Nicht gefundene Refs kommen mit source=None und leerer Liste zurück.
+    """
+    refs = unique_refs(refs)
+    starts = neighborhood_starts(refs, resolve_entities(graph, refs))
+    rows = []
+    if starts:
+        rows = graph.query(NEIGHBORHOODS_QUERY,
+                           params={"starts": starts, "per_start": max(1, row_budget // len(starts))})
+    return group_neighborhoods(refs, rows)
+
+
+def unique_refs(refs: List[str]) -> List[str]:
+    return list(dict.fromkeys(clean_input(r) for r in refs if clean_input(r)))
+
+
+def neighborhood_starts(refs: List[str], resolved: Dict[str, List[str]]) -> List[dict]:
+    return [{"ref": ref, "element_id": eid} for ref in refs for eid in resolved.get(ref, [])]
+
+
+def group_neighborhoods(refs: List[str], rows: List[dict]) -> List[dict]:
+    groups = {ref: [] for ref in refs}
+    for row in rows:
+        groups[row["ref"]].append(row)
+    result = []
+    for ref in refs:
+        if not groups[ref]:
+            result.append({"ref": ref, "source": None, "source_element_id": None, "neighbors": []})
+        result.extend(groups[ref])
+    return result
+
+
+def parse_entity_list(text: str) -> List[str]:
+    """Agent-Eingabe als Liste: "A; B; C", eine pro Zeile oder ['A', 'B']."""
+    text = str(text).strip()
+    if text.startswith("["):
+        try:
+            return [str(item) for item in ast.literal_eval(text)]
+        except (ValueError, SyntaxError):
+            text = text.strip("[]")
+    return [clean_input(part) for part in re.split(r"[;\n|]", text) if clean_input(part)]
+
+
+def paths_query(max_hops: int, rel_types: List[str] = None, direction: str = "both") -> str:
+    """
+    Ausgerollte k-Hop-Expansion: pro Hop ein CALL-Subquery mit LIMIT $fanout,
+    damit ein Hub-Knoten nicht die ganze Ergebnismenge flutet (das kann ein
+    Pfad-Pattern *1..k nicht). OPTIONAL MATCH lässt kürzere Pfade (Sackgassen)
+    stehen; bereits besuchte Knoten werden nicht erneut betreten.
+    """
+    left, right = DIRECTIONS[direction]
+    types = ":" + "|".join(quote_name(t) for t in rel_types) if rel_types else ""
+    lines = ["MATCH (n0) WHERE elementId(n0) IN $element_ids"]
+    for i in range(1, max_hops + 1):
+        visited = ", ".join(f"n{j}" for j in range(i))
+        lines.append(f"""CALL {{
+            WITH {visited}
+            OPTIONAL MATCH (n{i - 1}){left}[r{i}{types}]{right}(n{i})
+            WHERE NOT n{i} IN [{visited}]
+            RETURN r{i}, n{i} LIMIT $fanout
+        }}""")
+    hops = ", ".join(
+        f"CASE WHEN r{i} IS NULL THEN NULL ELSE {{rel: type(r{i}), outgoing: startNode(r{i}) = n{i - 1}, "
+        f"node: coalesce(n{i}.id, n{i}.name), element_id: elementId(n{i})}} END"
+        for i in range(1, max_hops + 1))
+    lines.append(f"""WITH n0, [hop IN [{hops}] WHERE hop IS NOT NULL] AS hops
+        WHERE size(hops) > 0
+        RETURN coalesce(n0.id, n0.name) AS start, hops
+        ORDER BY size(hops) DESC
+        LIMIT $limit""")
+    return "\n".join(lines)
+
+
+def expand_paths(graph, ref: str, max_hops: int = DEFAULT_MAX_HOPS, rel_types: List[str] = None,
+                 direction: str = "both", fanout: int = DEFAULT_FANOUT,
+                 limit: int = DEFAULT_PATH_LIMIT) -> List[dict]:
+    """Pfade bis max_hops ab `ref` (Name oder elementId) in einer Query.
+
+    Jede Zeile: start, hops = [{rel, outgoing, node, element_id}, ...].
+    Längste Pfade zuerst.
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction muss einer von {sorted(DIRECTIONS)} sein, nicht {direction!r}")
+    element_ids = start_element_ids(graph, ref)
+    if not element_ids:
+        return []
+    return graph.query(paths_query(max(1, min(max_hops, MAX_HOPS)), rel_types, direction),
+                       params={"element_ids": element_ids, "fanout": fanout, "limit": limit})
+
+
+def shortest_paths(graph, source_ref: str, target_ref: str, max_hops: int = DEFAULT_SHORTEST_HOPS,
+                   rel_types: List[str] = None, all_paths: bool = True,
+                   limit: int = DEFAULT_SHORTEST_LIMIT) -> List[dict]:
+    """Kürzeste Verbindung(en) zwischen zwei Entities (Namen oder elementIds), ungerichtet.
+
+    Jede Zeile: nodes, element_ids, hops = [{rel, outgoing}, ...] (hops[i] verbindet
+    nodes[i] und nodes[i+1]). Leere Liste, wenn ein Endpunkt fehlt oder es keinen
+    Pfad bis max_hops gibt.
+    """
+    sources = start_element_ids(graph, source_ref)
+    targets = start_element_ids(graph, target_ref)
+    if not sources or not targets:
+        return []
+    return graph.query(shortest_paths_query(max_hops, rel_types, all_paths),
+                       params={"sources": sources, "targets": targets, "limit": limit})
+
+
+def shortest_paths_query(max_hops: int, rel_types: List[str] = None, all_paths: bool = True) -> str:
+    # Die Pfadlänge muss im Pattern stehen, Cypher kann sie nicht parametrisieren
+    max_hops = max(1, min(int(max_hops), 2 * DEFAULT_SHORTEST_HOPS))
+    types = ":" + "|".join(quote_name(t) for t in rel_types) if rel_types else ""
+    function = "allShortestPaths" if all_paths else "shortestPath"
+    return f"""
+        MATCH (a) WHERE elementId(a) IN $sources
+        MATCH (b) WHERE elementId(b) IN $targets AND a <> b
+        MATCH p = {function}((a)-[{types}*..{max_hops}]-(b))
+        WITH p, nodes(p) AS ns, relationships(p) AS rs
+        RETURN [n IN ns | coalesce(n.id, n.name)] AS nodes,
+               [n IN ns | elementId(n)] AS element_ids,
+               [i IN range(0, size(rs) - 1) | {{rel: type(rs[i]), outgoing: startNode(rs[i]) = ns[i]}}] AS hops
+        ORDER BY size(rs)
+        LIMIT $limit
+    """
+
+
+def parse_connection_request(text: str) -> dict:
+    """Agent-Eingabe "Start; Ziel; REL1,REL2; max_hops" -> kwargs für shortest_paths."""
+    parts = [p.strip() for p in clean_input(text).split(";")]
+    if len(parts) < 2 or not parts[1]:
+        raise ValueError("Eingabe braucht Start und Ziel: 'Start; Ziel[; REL1,REL2][; max_hops]'")
+    kwargs = {"source_ref": parts[0], "target_ref": parts[1]}
+    if len(parts) > 2 and parts[2]:
+        kwargs["rel_types"] = [t.strip().upper() for t in parts[2].split(",") if t.strip()]
+    if len(parts) > 3 and parts[3].isdigit():
+        kwargs["max_hops"] = int(parts[3])
+    return kwargs
+
+
+def parse_path_request(text: str) -> dict:
+    """
+    Agent-Eingabe "Start; REL1,REL2; hops; out|in|both" -> kwargs für expand_paths.
+    Nur der Start ist Pflicht.
+    """
+    parts = [p.strip() for p in clean_input(text).split(";")]
+    kwargs = {"ref": parts[0]}
+    if len(parts) > 1 and parts[1]:
+        kwargs["rel_types"] = [t.strip().upper() for t in parts[1].split(",") if t.strip()]
+    if len(parts) > 2 and parts[2].isdigit():
+        kwargs["max_hops"] = int(parts[2])
+    if len(parts) > 3 and parts[3].lower() in DIRECTIONS:
+        kwargs["direction"] = parts[3].lower()
+    return kwargs
+
+
+# =============================================================================
+# AUSGABE FÜR DEN AGENTEN
+# =============================================================================
+
+def format_candidates(rows: List[dict]) -> str:
+    if not rows:
+        return "Keine Knoten gefunden."
+    return "\n".join(f"{row['id']} {row['labels']} (elementId: {row['element_id']}, "
+                     f"{row.get('match', 'vector')}, score {row['score']:.2f})" for row in rows)
+
+
+def format_neighborhood(rows: List[dict], ref: str) -> str:
+    if not rows:
+        return f"Keine Nachbarn für '{clean_input(ref)}' gefunden."
+    lines = []
+    for row in rows:
+        arrow = f"--[{row['rel']}]-->" if row["outgoing"] else f"<--[{row['rel']}]--"
+        lines.append(f"{row['source']} {arrow} {row['target']} (elementId: {row['target_element_id']})")
+    return "\n".join(lines)
+
+
+def format_neighborhoods(groups: List[dict]) -> str:
+    """Ein Block pro Entity, Budget-Kürzung ist schon im Query passiert."""
+    blocks = []
+    for group in groups:
+        if group["source"] is None:
+            blocks.append(f"## {group['ref']}: nicht gefunden")
+            continue
+        lines = [f"## {group['source']} (elementId: {group['source_element_id']})"]
+        for n in group["neighbors"]:
+            arrow = f"--[{n['rel']}]-->" if n["outgoing"] else f"<--[{n['rel']}]--"
+            lines.append(f"{arrow} {n['target']} (elementId: {n['target_element_id']})")
+        if not group["neighbors"]:
+            lines.append("(keine Nachbarn)")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def format_connections(rows: List[dict], source_ref: str, target_ref: str) -> str:
+    """Ein Pfad pro Zeile als Kette kompakter Tripel."""
+    if not rows:
+        return f"Keine Verbindung zwischen '{clean_input(source_ref)}' und '{clean_input(target_ref)}' gefunden."
+    lines = []
+    for row in rows:
+        triples = []
+        for i, hop in enumerate(row["hops"]):
+            left, right = row["nodes"][i], row["nodes"][i + 1]
+            if not hop["outgoing"]:
+                left, right = right, left
+            triples.append(f"({left})-[{hop['rel']}]->({right})")
+        lines.append(", ".join(triples))
+    return "\n".join(lines)
+
+
+def format_paths(rows: List[dict], ref: str) -> str:
+    """Ein Pfad pro Zeile, am Ende die elementId des letzten Knotens zum Weiterhangeln."""
+    if not rows:
+        return f"Keine Pfade ab '{clean_input(ref)}' gefunden."
+    lines = []
+    for row in rows:
+        path = str(row["start"])
+        for hop in row["hops"]:
+            arrow = f"--[{hop['rel']}]-->" if hop["outgoing"] else f"<--[{hop['rel']}]--"
+            path += f" {arrow} {hop['node']}"
+        lines.append(f"{path} (elementId: {row['hops'][-1]['element_id']})")
+    return "\n".join(lines)
@@ -0,0 +1,128 @@
+"""
+Streaming Graph Writer
+======================
+
+Schreibt Knoten und Beziehungen abschnittsweise nach Neo4j, statt alles bis
+zum Schluss im Speicher zu halten und dann ein einziges
+`graph.add_graph_documents([...])` abzusetzen.
+
+Pro Flush wird gruppiert:
+  - Knoten nach Label              -> UNWIND $rows MERGE (n:Label {id: row.id})
+  - Beziehungen nach (Typ, Labels) -> UNWIND $rows MATCH ... MERGE (s)-[r:TYP]->(t)
+
+Alle Werte gehen als Parameter rein; nur Labels/Typen werden (gequotet) in
+den Query-Text eingesetzt, weil Cypher sie nicht parametrisieren kann.
+
+`sections` (Provenienz) wird vereinigt statt überschrieben, damit Fakten aus
+anderen Abschnitten beim MERGE nicht verloren gehen.
+
+Jeder Knoten bekommt beim Schreiben `lookup_key` (siehe lookup_key()), damit
+die Agent-Tools Namen case-insensitiv über einen Range-Index finden statt
+per Regex über alle Knoten.
+"""
+
+import unicodedata
+from typing import Dict, Iterable, List, Tuple
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def quote_name(name: str) -> str:
+    """Label/Beziehungstyp sicher für Cypher quoten."""
+    return "`" + name.replace("`", "") + "`"
+
+
+def _batches(rows: List[dict], size: int) -> Iterable[List[dict]]:
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def lookup_key(name: str) -> str:
+    """Normalisierter Suchschlüssel: Unicode NFKC, casefold, ohne Anführungszeichen, Whitespace vereinheitlicht."""
+    key = unicodedata.normalize("NFKC", str(name)).casefold()
+    key = key.replace('"', "").replace("'", "").replace("„", "").replace("“", "")
+    return " ".join(key.split())
+
+
+def node_row(node_id: str, properties: dict = None, sections: List[str] = None) -> dict:
+    return {"id": node_id, "lookup_key": lookup_key(node_id),
+            "props": dict(properties or {}), "sections": list(sections or [])}
+
+
+def rel_row(source_id: str, target_id: str, properties: dict = None, sections: List[str] = None) -> dict:
+    return {"source": source_id, "target": target_id,
+            "props": dict(properties or {}), "sections": list(sections or [])}
+
+
+class StreamingGraphWriter:
+    """
+    Schreibt pro Aufruf von `write()` sofort in die DB.
+
+    nodes: {label: [node_row(...), ...]}
+    rels:  {(rel_type, source_label, target_label): [rel_row(...), ...]}
+    """
+
+    def __init__(self, graph, batch_size: int = DEFAULT_BATCH_SIZE, entity_label: str = "Entity"):
+        self.graph = graph
+        self.batch_size = batch_size
+        self.entity_label = entity_label
+        self.nodes_written = 0
+        self.rels_written = 0
+        self.queries = 0
+
+    def write_nodes(self, label: str, rows: List[dict]):
+        extra_label = f", n:{quote_name(self.entity_label)}" if self.entity_label else ""
+        query = f"""
+            UNWIND $rows AS row
+            MERGE (n:{quote_name(label)} {{id: row.id}})
+            SET n += row.props{extra_label}
+            SET n.lookup_key = row.lookup_key
+            SET n.sections = coalesce(n.sections, []) +
+                [s IN row.sections WHERE NOT s IN coalesce(n.sections, [])]
+        """
+        for batch in _batches(rows, self.batch_size):
+            self.graph.query(query, params={"rows": batch})
+            self.queries += 1
+            self.nodes_written += len(batch)
+
+    def write_relationships(self, rel_type: str, source_label: str, target_label: str, rows: List[dict]):
+        query = f"""
+            UNWIND $rows AS row
+            MATCH (s:{quote_name(source_label)} {{id: row.source}})
+            MATCH (t:{quote_name(target_label)} {{id: row.target}})
+            MERGE (s)-[r:{quote_name(rel_type)}]->(t)
+            SET r += row.props
+            SET r.sections = coalesce(r.sections, []) +
+                [x IN row.sections WHERE NOT x IN coalesce(r.sections, [])]
+        """
+        for batch in _batches(rows, self.batch_size):
+            self.graph.query(query, params={"rows": batch})
+            self.queries += 1
+            self.rels_written += len(batch)
+
+    def write(self, nodes: Dict[str, List[dict]], rels: Dict[Tuple[str, str, str], List[dict]]):
+        """Erst alle Knoten, dann die Beziehungen (die MATCHen auf die Knoten)."""
+        for label, rows in nodes.items():
+            self.write_nodes(label, rows)
+        for (rel_type, source_label, target_label), rows in rels.items():
+            self.write_relationships(rel_type, source_label, target_label, rows)
+
+    def write_graph_document(self, graph_doc):
+        """Komfort-Variante für ein komplettes LangChain GraphDocument."""
+        nodes: Dict[str, List[dict]] = {}
+        for node in graph_doc.nodes:
+            props = dict(node.properties)
+            sections = props.pop("sections", [])
+            nodes.setdefault(node.type, []).append(node_row(node.id, props, sections))
+
+        rels: Dict[Tuple[str, str, str], List[dict]] = {}
+        for rel in graph_doc.relationships:
+            props = dict(rel.properties)
+            sections = props.pop("sections", [])
+            key = (rel.type, rel.source.type, rel.target.type)
+            rels.setdefault(key, []).append(rel_row(rel.source.id, rel.target.id, props, sections))
+
+        self.write(nodes, rels)
+
+    def stats(self) -> dict:
+        return {"nodes": self.nodes_written, "relationships": self.rels_written, "queries": self.queries}
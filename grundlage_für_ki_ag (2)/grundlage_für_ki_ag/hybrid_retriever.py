@@ -0,0 +1,222 @@
+"""
+Hybrid-Retrieval: Fulltext + Vektor, fusioniert per Reciprocal Rank Fusion
+==========================================================================
+
+VectorCypherRetriever sucht nur über Embeddings der nackten Namen. Exakte
+Bezeichner wie "Raum 404" oder "H100" verlieren dort gegen semantisch
+ähnliche, aber falsche Knoten ("Raum 403", "A100") -> Rückfragen und
+Retries kosten zusätzliche LLM-Calls.
+
+HybridRRFRetriever fragt parallel
+  - den Vektor-Index (entity_index, Frage wird live embeddet) und
+  - den Fulltext-Index (entity_fulltext, Lucene-Terms der Frage)
+ab und fusioniert beide Ranglisten per RRF:
+
+    score(knoten) = Σ_liste  1 / (rrf_k + rang_in_liste)
+
+Nur die Ränge zählen, nicht die Scores (Cosine und Lucene-BM25 sind nicht
+vergleichbar). Die top_k fusionierten Knoten laufen danach durch dieselbe
+retrieval_query wie beim VectorCypherRetriever (`node` und `score` sind
+gebunden), die Nachbar-Expansion bleibt also unverändert.
+
+    ensure_fulltext_index(driver)     # entity_fulltext auf :Entity(id)
+    retriever = HybridRRFRetriever(driver, embedder=embedder, retrieval_query=retrieval_query)
+    rag = GraphRAG(retriever=retriever, llm=llm)
+
+Der Fulltext-Index wird über schema_manager (plan_schema / setup_db.py)
+zusammen mit entity_index angelegt und von Neo4j bei jedem Write gepflegt.
+ensure_fulltext_index nutzt dieselbe Definition (:Entity(id)) - gefunden
+werden also nur Knoten mit dem Label :Entity.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from neo4j import RoutingControl
+from neo4j.exceptions import ClientError
+from neo4j_graphrag.retrievers.base import Retriever
+from neo4j_graphrag.types import RawSearchResult, RetrieverResultItem
+
+from graph_tools import LUCENE_SPECIAL_RE
+from graph_writer import lookup_key
+from schema_manager import FULLTEXT_INDEX_NAME, VECTOR_INDEX_NAME, fulltext_index
+
+DEFAULT_RRF_K = 60            # Konstante aus Cormack et al. (2009)
+DEFAULT_CANDIDATE_K = 20      # Kandidaten pro Liste vor der Fusion
+MIN_TERM_LENGTH = 2
+
+INDEX_INFO_QUERY = """
+    SHOW INDEXES YIELD name, labelsOrTypes, properties
+    WHERE name = $name
+    RETURN labelsOrTypes AS labels, properties
+"""
+VECTOR_QUERY = """
+    CALL db.index.vector.queryNodes($index, $k, $embedding)
+    YIELD node, score
+    RETURN elementId(node) AS eid
+"""
+FULLTEXT_QUERY = """
+    CALL db.index.fulltext.queryNodes($index, $query, {limit: $k})
+    YIELD node, score
+    RETURN elementId(node) AS eid
+"""
+# Wie VectorCypherRetriever: retrieval_query sieht `node` und `score`
+FUSED_PREFIX = """
+    UNWIND $hits AS hit
+    MATCH (node) WHERE elementId(node) = hit.eid
+    WITH node, hit.score AS score
+"""
+
+
+# =============================================================================
+# FULLTEXT-INDEX (DEFINITION AUS SCHEMA_MANAGER)
+# =============================================================================
+
+def ensure_fulltext_index(driver, database: str = None, log=print) -> bool:
+    """
+    Legt entity_fulltext nach der Definition aus schema_manager an
+    (:Entity(id), wie setup_db.py). Existiert ein gleichnamiger Index mit
+    anderen Labels/Properties, wird er nicht angefasst, sondern gemeldet.
+    Gibt True zurück, wenn der Index der Definition entspricht.
+    """
+    statement = fulltext_index()
+    records, _, _ = driver.execute_query(INDEX_INFO_QUERY, name=statement.name, database_=database,
+                                         routing_=RoutingControl.READ)
+    if records:
+        labels, properties = list(records[0]["labels"]), list(records[0]["properties"])
+        if labels == [statement.label] and properties == [statement.prop]:
+            return True
+        log(f"   ⚠️ Fulltext-Index '{statement.name}' ist auf {'|'.join(labels)}({', '.join(properties)}) "
+            f"angelegt statt auf {statement.label}({statement.prop}). "
+            f"Neu anlegen mit: DROP INDEX {statement.name}")
+        return False
+    driver.execute_query(statement.cypher, database_=database)
+    log(f"   🔤 Fulltext-Index '{statement.name}' auf {statement.label}({statement.prop}) angelegt")
+    return True
+
+
+def _index_missing(error: ClientError) -> bool:
+    """Nur ein fehlender Index schaltet die Fulltext-Hälfte ab, nicht z.B. ein Lucene-Parse-Fehler."""
+    if error.code == "Neo.ClientError.Schema.IndexNotFound":
+        return True
+    message = (error.message or "").lower()
+    # Ältere 5.x-Versionen melden den fehlenden Index nur als ProcedureCallFailed
+    return (error.code == "Neo.ClientError.Procedure.ProcedureCallFailed"
+            and "no such" in message and "index" in message)
+
+
+# =============================================================================
+# FUSION
+# =============================================================================
+
+def question_terms(text: str) -> str:
+    """Lucene-Query aus einer Frage: escapte Terms, ODER-verknüpft (ein Treffer genügt)."""
+    words = [word.strip("?!.,;:()") for word in lookup_key(text).split()]
+    return " OR ".join(LUCENE_SPECIAL_RE.sub(r"\\\1", word) for word in words if len(word) >= MIN_TERM_LENGTH)
+
+
+def reciprocal_rank_fusion(rankings: Dict[str, List[str]], rrf_k: int = DEFAULT_RRF_K,
+                           weights: Dict[str, float] = None) -> List[Tuple[str, float, Dict[str, int]]]:
+    """
+    rankings: Liste -> elementIds in Rangfolge. Ergebnis absteigend nach
+    RRF-Score: (elementId, score, {liste: rang}) mit Rang ab 1.
+    """
+    scores: Dict[str, float] = {}
+    ranks: Dict[str, Dict[str, int]] = {}
+    for source, eids in rankings.items():
+        weight = (weights or {}).get(source, 1.0)
+        for rank, eid in enumerate(dict.fromkeys(eids), start=1):
+            scores[eid] = scores.get(eid, 0.0) + weight / (rrf_k + rank)
+            ranks.setdefault(eid, {})[source] = rank
+    return sorted(((eid, score, ranks[eid]) for eid, score in scores.items()), key=lambda hit: -hit[1])
+
+
+# =============================================================================
+# RETRIEVER
+# =============================================================================
+
+class HybridRRFRetriever(Retriever):
+    """
+    Drop-in für VectorCypherRetriever (gleiche retrieval_query, gleiche
+    search(query_text=..., top_k=...)-Signatur, nutzbar mit GraphRAG und
+    query_cache.cache_retriever).
+    """
+
+    def __init__(self, driver, embedder, retrieval_query: str,
+                 vector_index_name: str = VECTOR_INDEX_NAME,
+                 fulltext_index_name: str = FULLTEXT_INDEX_NAME,
+                 rrf_k: int = DEFAULT_RRF_K, candidate_k: int = DEFAULT_CANDIDATE_K,
+                 weights: Dict[str, float] = None,
+                 result_formatter: Optional[Callable] = None, neo4j_database: Optional[str] = None):
+        super().__init__(driver, neo4j_database)
+        self.embedder = embedder
+        self.retrieval_query = retrieval_query
+        self.vector_index_name = vector_index_name
+        self.fulltext_index_name = fulltext_index_name
+        self.rrf_k = rrf_k
+        self.candidate_k = candidate_k
+        self.weights = weights
+        self.result_formatter = result_formatter
+        self._executor = ThreadPoolExecutor(max_workers=2)
+        self._fulltext_missing = False
+
+    def _eids(self, query: str, **params) -> List[str]:
+        records, _, _ = self.driver.execute_query(query, parameters_=params, database_=self.neo4j_database,
+                                                  routing_=RoutingControl.READ)
+        return [r["eid"] for r in records]
+
+    def _vector_ranking(self, query_text: str, k: int) -> Tuple[List[str], float]:
+        start = time.perf_counter()
+        embedding = self.embedder.embed_query(query_text)
+        eids = self._eids(VECTOR_QUERY, index=self.vector_index_name, k=k, embedding=embedding)
+        return eids, (time.perf_counter() - start) * 1000
+
+    def _fulltext_ranking(self, query_text: str, k: int) -> Tuple[List[str], float]:
+        start = time.perf_counter()
+        lucene = question_terms(query_text)
+        if not lucene or self._fulltext_missing:
+            return [], 0.0
+        try:
+            eids = self._eids(FULLTEXT_QUERY, index=self.fulltext_index_name, query=lucene, k=k)
+        except ClientError as e:
+            if _index_missing(e):
+                # Index fehlt (ensure_fulltext_index nicht gelaufen) -> ab jetzt nur Vektor
+                print(f"⚠️ Fulltext-Index fehlt, ab jetzt nur Vektor: {e.message}")
+                self._fulltext_missing = True
+            else:
+                print(f"⚠️ Fulltext-Suche fehlgeschlagen, für diese Frage nur Vektor: {e.message}")
+            return [], 0.0
+        return eids, (time.perf_counter() - start) * 1000
+
+    def get_search_results(self, query_text: str, top_k: int = 5,
+                           candidate_k: Optional[int] = None) -> RawSearchResult:
+        """
+        Beide Indizes parallel (Fulltext läuft, während die Frage embeddet
+        wird), RRF über die Ränge, dann retrieval_query für die top_k.
+        """
+        k = max(candidate_k or self.candidate_k, top_k)
+        vector = self._executor.submit(self._vector_ranking, query_text, k)
+        fulltext = self._executor.submit(self._fulltext_ranking, query_text, k)
+        (vector_eids, vector_ms), (fulltext_eids, fulltext_ms) = vector.result(), fulltext.result()
+
+        fused = reciprocal_rank_fusion({"vector": vector_eids, "fulltext": fulltext_eids},
+                                       self.rrf_k, self.weights)[:top_k]
+        hits = [{"eid": eid, "score": score} for eid, score, _ in fused]
+        records = []
+        if hits:
+            records, _, _ = self.driver.execute_query(FUSED_PREFIX + self.retrieval_query,
+                                                      parameters_={"hits": hits},
+                                                      database_=self.neo4j_database,
+                                                      routing_=RoutingControl.READ)
+        return RawSearchResult(records=records, metadata={
+            "ranks": [{"eid": eid, "score": score, **ranks} for eid, score, ranks in fused],
+            "vector_ms": vector_ms, "fulltext_ms": fulltext_ms,
+            "fulltext_only": len(set(fulltext_eids) - set(vector_eids)),
+        })
+
+    def get_result_formatter(self) -> Callable:
+        return self.result_formatter or self.default_record_formatter
+
+    def default_record_formatter(self, record) -> RetrieverResultItem:
+        return RetrieverResultItem(content=str(record), metadata={"score": record.get("score")})
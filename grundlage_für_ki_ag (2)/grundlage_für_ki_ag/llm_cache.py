@@ -0,0 +1,179 @@
+"""
+Persistenter LLM-Cache für die Guided-Extraktoren
+==================================================
+
+Legt jede LLM-Antwort als Datei auf der Platte ab (ähnlich wie
+ragtest/cache/extract_graph bei der Microsoft-Pipeline). Der Schlüssel ist ein
+SHA-256 über den fertig gerenderten Prompt, den llm_string von LangChain und
+die `params` des Caches (Modellname + Generierungs-Parameter). Ändert sich nur
+der Prompt für einen Knotentyp, werden auch nur dessen Calls neu bezahlt.
+
+`params` gehört in den Cache, weil der llm_string eines nackten ChatOllama
+weder Modell noch Temperatur enthält - zwei Builder mit verschiedenen Modellen
+im selben Verzeichnis bekämen sonst gegenseitig ihre Antworten.
+
+Verwendung:
+    from llm_cache import DiskLRUCache
+    LLM_PARAMS = {"model": "gemma3:12b", "temperature": 0}
+    cache = DiskLRUCache("cache/llm", max_mb=512, params=LLM_PARAMS)
+    llm = LimitedChatOllama(**LLM_PARAMS, cache=cache)
+    ...
+    cache.print_stats()
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+CACHE_VERSION = "v1"
+FILE_PREFIX = "chat_"
+
+
+def cache_key(prompt: str, llm_string: str, params: dict = None) -> str:
+    """Content-Hash aus gerendertem Prompt + llm_string + Modell/Parametern."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(llm_string.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DiskLRUCache(BaseCache):
+    """
+    LangChain-Cache auf der Platte mit größenbasierter LRU-Verdrängung.
+
+    Die "zuletzt benutzt"-Reihenfolge steht in der mtime der Dateien, damit
+    sie auch über Neustarts hinweg erhalten bleibt.
+
+    params: Modellname und Generierungs-Parameter (model, temperature, ...),
+    gehen in jeden Schlüssel ein.
+    """
+
+    def __init__(self, cache_dir: str, max_mb: float = 512, params: dict = None):
+        self.cache_dir = cache_dir
+        self.params = dict(params or {})
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> Dateigröße
+        self._total_bytes = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    # --- Intern ---
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{FILE_PREFIX}{key}_{CACHE_VERSION}")
+
+    def _load_index(self):
+        """Liest vorhandene Einträge ein, älteste zuerst."""
+        suffix = f"_{CACHE_VERSION}"
+        found = []
+        for name in os.listdir(self.cache_dir):
+            if not (name.startswith(FILE_PREFIX) and name.endswith(suffix)):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            key = name[len(FILE_PREFIX):-len(suffix)]
+            found.append((stat.st_mtime, key, stat.st_size))
+
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    # --- BaseCache API ---
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = cache_key(prompt, llm_string, self.params)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+                generations = [loads(g) for g in record["generations"]]
+            except (OSError, ValueError, KeyError):
+                # Kaputte/gelöschte Datei -> wie ein Miss behandeln
+                self._total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            os.utime(path)
+            self.hits += 1
+            return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = cache_key(prompt, llm_string, self.params)
+        record = {
+            "llm_string": llm_string,
+            "params": self.params,
+            "generations": [dumps(g) for g in return_val],
+        }
+        payload = json.dumps(record, ensure_ascii=False)
+        path = self._path(key)
+
+        with self._lock:
+            # Erst in eine temporäre Datei, damit ein Abbruch keinen halben Eintrag hinterlässt
+            tmp_path = f"{path}.tmp{threading.get_ident()}"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+            size = os.path.getsize(path)
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                try:
+                    os.remove(self._path(key))
+                except FileNotFoundError:
+                    pass
+            self._entries.clear()
+            self._total_bytes = 0
+
+    # --- Statistik ---
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_mb": self._total_bytes / (1024 * 1024),
+            }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"🗄️  LLM-Cache: {s['hits']} Hits / {s['misses']} Misses "
+              f"({s['hit_rate']:.0%}) | {s['entries']} Einträge, {s['size_mb']:.1f} MB, "
+              f"{s['evictions']} verdrängt", flush=True)
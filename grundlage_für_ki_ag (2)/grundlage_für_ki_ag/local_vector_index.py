@@ -0,0 +1,415 @@
+"""
+In-Process Vektorindex als Spiegel von entity_index
+===================================================
+
+Jeder search_entities-Call schickt den Query-Vektor an Neo4j
+(db.index.vector.queryNodes('entity_index', ...)) - ein Netzwerk-Roundtrip,
+der während eines Builds außerdem mit der Schreiblast konkurriert.
+
+LocalVectorIndex hält die Embeddings der :Entity-Knoten im Prozess:
+  - eine zusammenhängende float32-Matrix mit vorab normierten Zeilen,
+    Cosine = ein Matrix-Vektor-Produkt (exakt, Brute Force),
+  - ab hnsw_threshold Vektoren zusätzlich ein HNSW-Graph (approximativ,
+    ~log(n) statt n Vergleiche pro Suche). Der Aufbau ist reines Python
+    (Sekunden pro tausend Vektoren) und läuft deshalb in einem
+    Hintergrund-Thread; bis er fertig ist, wird exakt gesucht.
+
+Scores sind wie beim Neo4j-Index (1 + cos) / 2, damit Schwellwerte gleich
+bleiben.
+
+Aktualisierung über die Graph-Version (query_cache.py): refresh() lädt nur
+Knoten mit `embedded_at >= zuletzt gesehen` nach (embedding_backfill und
+embedding_worker setzen embedded_at). Passt die Anzahl danach nicht zur DB
+(gelöschte Knoten, Embeddings ohne embedded_at), wird komplett neu geladen.
+
+    index = LocalVectorIndex()
+    index.load(graph)                       # roher Neo4jGraph, nicht CachedGraph
+    index.refresh(graph, stamp.current())   # billig, solange die Version gleich bleibt
+    index.search(vector, k=3)
+
+Vergleich mit Neo4j (Recall@k, p50/p99): benchmark_vector_index.py
+"""
+
+import heapq
+import math
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from query_cache import read_graph_version
+from schema_manager import ENTITY_LABEL
+
+EMBEDDED_AT = "embedded_at"
+DEFAULT_HNSW_THRESHOLD = 50_000
+DEFAULT_M = 16
+DEFAULT_EF_CONSTRUCTION = 100
+DEFAULT_EF_SEARCH = 64
+COMPACT_RATIO = 0.25      # Anteil toter Zeilen, ab dem neu aufgebaut wird
+
+_RETURN = f"""
+    RETURN elementId(n) AS eid, coalesce(n.id, n.name) AS id, labels(n) AS labels,
+           n.embedding AS embedding, n.{EMBEDDED_AT} AS embedded_at
+"""
+LOAD_QUERY = f"MATCH (n:{ENTITY_LABEL}) WHERE n.embedding IS NOT NULL" + _RETURN
+CHANGED_QUERY = f"MATCH (n:{ENTITY_LABEL}) WHERE n.{EMBEDDED_AT} >= $since AND n.embedding IS NOT NULL" + _RETURN
+COUNT_QUERY = f"MATCH (n:{ENTITY_LABEL}) WHERE n.embedding IS NOT NULL RETURN count(n) AS c"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+# =============================================================================
+# HNSW
+# =============================================================================
+
+class HNSWGraph:
+    """
+    Hierarchical Navigable Small World über die Zeilen einer normierten Matrix
+    (Distanz = 1 - Skalarprodukt). Schlank gehalten: Nachbarauswahl nach
+    Distanz, Löschen über Tombstones im Besitzer (LocalVectorIndex).
+    """
+
+    def __init__(self, vectors: Callable[[], np.ndarray], m: int = DEFAULT_M,
+                 ef_construction: int = DEFAULT_EF_CONSTRUCTION, seed: int = 42):
+        self.vectors = vectors
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = ef_construction
+        self.level_mult = 1 / math.log(m)
+        self.rng = random.Random(seed)
+        self.layers: List[Dict[int, List[int]]] = []   # layers[l][node] -> Nachbarn
+        self.entry: Optional[int] = None
+        self.entry_level = -1
+
+    def _search_layer(self, q: np.ndarray, entries: List[int], ef: int, layer: int) -> List[Tuple[float, int]]:
+        vecs = self.vectors()
+        links = self.layers[layer]
+        visited = set(entries)
+        dists = (1.0 - vecs[entries] @ q).tolist()
+        candidates = list(zip(dists, entries))
+        heapq.heapify(candidates)
+        results = [(-d, n) for d, n in candidates]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            dist, node = heapq.heappop(candidates)
+            if dist > -results[0][0] and len(results) >= ef:
+                break
+            fresh = [n for n in links.get(node, ()) if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            # Alle Nachbarn eines Knotens in einem Matrixprodukt
+            for d, n in zip((1.0 - vecs[fresh] @ q).tolist(), fresh):
+                if len(results) < ef or d < -results[0][0]:
+                    heapq.heappush(candidates, (d, n))
+                    heapq.heappush(results, (-d, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted((-d, n) for d, n in results)
+
+    def _greedy_descent(self, q: np.ndarray, down_to: int) -> List[int]:
+        entry = [self.entry]
+        for layer in range(self.entry_level, down_to, -1):
+            entry = [self._search_layer(q, entry, 1, layer)[0][1]]
+        return entry
+
+    def add(self, node: int):
+        vecs = self.vectors()
+        q = vecs[node]
+        level = int(-math.log(1.0 - self.rng.random()) * self.level_mult)
+        while len(self.layers) <= level:
+            self.layers.append({})
+        if self.entry is None:
+            for layer in range(level + 1):
+                self.layers[layer][node] = []
+            self.entry, self.entry_level = node, level
+            return
+
+        entry = self._greedy_descent(q, level)
+        for layer in range(min(level, self.entry_level), -1, -1):
+            found = self._search_layer(q, entry, self.ef_construction, layer)
+            limit = self.m0 if layer == 0 else self.m
+            neighbors = [n for _, n in found[:self.m]]
+            self.layers[layer][node] = neighbors
+            for n in neighbors:
+                links = self.layers[layer][n]
+                links.append(node)
+                if len(links) > limit:
+                    keep = np.argsort(1.0 - vecs[links] @ vecs[n])[:limit]
+                    self.layers[layer][n] = [links[i] for i in keep]
+            entry = [n for _, n in found]
+        for layer in range(self.entry_level + 1, level + 1):
+            self.layers[layer][node] = []
+        if level > self.entry_level:
+            self.entry, self.entry_level = node, level
+
+    def search(self, q: np.ndarray, k: int, ef: int) -> List[Tuple[float, int]]:
+        if self.entry is None:
+            return []
+        return self._search_layer(q, self._greedy_descent(q, 0), max(ef, k), 0)
+
+
+# =============================================================================
+# INDEX
+# =============================================================================
+
+class LocalVectorIndex:
+    """Exakte Cosine-Suche auf einer float32-Matrix, ab hnsw_threshold über HNSW."""
+
+    def __init__(self, hnsw_threshold: Optional[int] = DEFAULT_HNSW_THRESHOLD, m: int = DEFAULT_M,
+                 ef_construction: int = DEFAULT_EF_CONSTRUCTION, ef_search: int = DEFAULT_EF_SEARCH):
+        self.hnsw_threshold = hnsw_threshold
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.full_loads = 0
+        self.incremental_rows = 0
+        self._lock = threading.RLock()
+        self._generation = 0                  # ändert sich bei clear()/compact() -> laufender Build verwerfen
+        self._building: Optional[threading.Thread] = None
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def dim(self) -> int:
+        return self._matrix.shape[1]
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix[:self._size]
+
+    # --- Aufbau ---
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._reset()
+
+    def _reset(self):
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        self.element_ids: List[str] = []
+        self.names: List[str] = []
+        self.labels: List[List[str]] = []
+        self._rows: Dict[str, int] = {}
+        self.hnsw: Optional[HNSWGraph] = None
+        self.version: Optional[int] = None
+        self.since: Optional[int] = None    # größtes gesehenes embedded_at
+
+    def _reserve(self, rows: int, dim: int):
+        if self._matrix.shape[1] not in (0, dim):
+            raise ValueError(f"Embedding-Dimension {dim} passt nicht zum Index ({self._matrix.shape[1]})")
+        needed = self._size + rows
+        if needed <= self._matrix.shape[0]:
+            return
+        capacity = max(needed, 2 * self._matrix.shape[0], 1024)
+        matrix = np.zeros((capacity, dim), dtype=np.float32)
+        if self._size:
+            matrix[:self._size] = self._matrix[:self._size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._matrix, self._alive = matrix, alive
+
+    def _kill(self, eid: str):
+        row = self._rows.pop(eid, None)
+        if row is not None:
+            self._alive[row] = False
+
+    def upsert(self, rows: List[dict]) -> int:
+        """Zeilen mit eid, id, labels, embedding (wie LOAD_QUERY). Gibt die Anzahl neuer Vektoren zurück."""
+        if not rows:
+            return 0
+        with self._lock:
+            return self._upsert(rows)
+
+    def _upsert(self, rows: List[dict]) -> int:
+        vectors = _normalize([row["embedding"] for row in rows])
+        fresh = []
+        for row, vector in zip(rows, vectors):
+            existing = self._rows.get(row["eid"])
+            if existing is not None:
+                if np.allclose(self._matrix[existing], vector, atol=1e-6):
+                    continue
+                if self.hnsw is None and self._building is None:
+                    self._matrix[existing] = vector   # ohne Graph einfach überschreiben
+                    continue
+                self._kill(row["eid"])                # im HNSW: Tombstone + neuer Knoten
+            fresh.append((row, vector))
+
+        self._reserve(len(fresh), vectors.shape[1])
+        start = self._size
+        for offset, (row, vector) in enumerate(fresh):
+            i = start + offset
+            self._matrix[i] = vector
+            self._alive[i] = True
+            self._rows[row["eid"]] = i
+            self.element_ids.append(row["eid"])
+            self.names.append(row["id"])
+            self.labels.append(row["labels"])
+        self._size += len(fresh)
+
+        if self.hnsw is not None:
+            for i in range(start, self._size):
+                self.hnsw.add(i)
+        elif self.hnsw_threshold is not None and len(self) >= self.hnsw_threshold:
+            self._build_in_background()
+        if self._size and (self._size - len(self)) / self._size > COMPACT_RATIO:
+            self.compact()
+        return len(fresh)
+
+    def remove(self, element_ids: List[str]):
+        with self._lock:
+            for eid in element_ids:
+                self._kill(eid)
+
+    def build_hnsw(self):
+        """Synchron aufbauen (Benchmarks, exact=False ohne fertigen Graphen)."""
+        with self._lock:
+            self.hnsw = HNSWGraph(lambda: self._matrix, self.m, self.ef_construction)
+            for i in np.flatnonzero(self._alive[:self._size]):
+                self.hnsw.add(int(i))
+
+    def _build_in_background(self):
+        """HNSW über die aktuellen Zeilen außerhalb des Locks bauen, dann nachziehen und einsetzen."""
+        if self._building is not None:
+            return
+        generation, snapshot = self._generation, self._size
+
+        def build():
+            graph = HNSWGraph(lambda: self._matrix, self.m, self.ef_construction)
+            for i in range(snapshot):
+                if generation != self._generation:
+                    break             # clear()/compact(): Zeilen passen nicht mehr zur Matrix
+                graph.add(i)          # Tombstones filtert search() über _alive
+            with self._lock:
+                if self._building is not threading.current_thread():
+                    return            # compact() hat schon einen neuen Build gestartet
+                self._building = None
+                if generation != self._generation:
+                    # clear() dazwischen -> neu starten, sobald wieder genug Zeilen da sind
+                    if self.hnsw is None and self.hnsw_threshold is not None and len(self) >= self.hnsw_threshold:
+                        self._build_in_background()
+                    return
+                for i in range(snapshot, self._size):
+                    graph.add(i)
+                self.hnsw = graph
+
+        self._building = threading.Thread(target=build, name="hnsw-build", daemon=True)
+        self._building.start()
+
+    def wait_for_hnsw(self, timeout: float = None) -> bool:
+        """Wartet auf laufende Hintergrund-Builds (auch neu gestartete). True, wenn der Graph steht."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        thread = self._building
+        while thread is not None:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if thread.is_alive():
+                break             # Timeout
+            thread = self._building
+        return self.hnsw is not None
+
+    def compact(self):
+        """Tote Zeilen entfernen, HNSW (falls vorhanden) im Hintergrund neu aufbauen."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        keep = np.flatnonzero(self._alive[:self._size])
+        had_hnsw = self.hnsw is not None or self._building is not None
+        self._generation += 1
+        self._matrix = np.ascontiguousarray(self._matrix[keep])
+        self._alive = np.ones(len(keep), dtype=bool)
+        self._size = len(keep)
+        self.element_ids = [self.element_ids[i] for i in keep]
+        self.names = [self.names[i] for i in keep]
+        self.labels = [self.labels[i] for i in keep]
+        self._rows = {eid: i for i, eid in enumerate(self.element_ids)}
+        self.hnsw = None
+        self._building = None
+        if had_hnsw:
+            self._build_in_background()
+
+    # --- Neo4j ---
+
+    def _remember(self, rows: List[dict]):
+        stamps = [row["embedded_at"] for row in rows if row.get("embedded_at") is not None]
+        if stamps:
+            self.since = max(stamps + ([self.since] if self.since is not None else []))
+
+    def load(self, graph, version: int = None) -> int:
+        """Alle :Entity-Embeddings neu laden. `graph` ohne Query-Cache übergeben."""
+        self.clear()
+        self.version = read_graph_version(graph) if version is None else version
+        rows = graph.query(LOAD_QUERY)
+        self._remember(rows)
+        self.upsert(rows)
+        self.full_loads += 1
+        return len(self)
+
+    def refresh(self, graph, version: int = None) -> int:
+        """Nachladen, wenn sich die Graph-Version geändert hat. Gibt die Zahl geladener Zeilen zurück."""
+        version = read_graph_version(graph) if version is None else version
+        if self.version is None:
+            return self.load(graph, version)
+        if version == self.version:
+            return 0
+        if self.since is None:
+            return self.load(graph, version)   # Bestand ohne embedded_at
+        rows = graph.query(CHANGED_QUERY, params={"since": self.since})
+        self._remember(rows)
+        self.upsert(rows)
+        self.incremental_rows += len(rows)
+        self.version = version
+        if graph.query(COUNT_QUERY)[0]["c"] != len(self):
+            return self.load(graph, version)
+        return len(rows)
+
+    # --- Suche ---
+
+    def search(self, vector, k: int = 3, exact: bool = None, ef: int = None) -> List[dict]:
+        """
+        Top-k wie db.index.vector.queryNodes: element_id, id, labels, score = (1 + cos) / 2.
+        exact=None: HNSW, sobald er fertig ist, sonst exakt.
+        """
+        if exact is False and self.hnsw is None:
+            self.build_hnsw()
+        with self._lock:
+            return self._search(vector, k, exact, ef)
+
+    def _search(self, vector, k: int, exact: Optional[bool], ef: Optional[int]) -> List[dict]:
+        if not self._rows:
+            return []
+        q = _normalize(vector)
+        use_exact = self.hnsw is None if exact is None else exact
+        if use_exact:
+            sims = self.matrix @ q
+            sims[~self._alive[:self._size]] = -np.inf
+            k = min(k, len(self))
+            top = np.argpartition(-sims, k - 1)[:k]
+            hits = [(float(sims[i]), int(i)) for i in top[np.argsort(-sims[top])]]
+        else:
+            # Tombstones belegen Plätze -> etwas mehr holen und filtern
+            found = self.hnsw.search(q, k + (self._size - len(self)), ef or self.ef_search)
+            hits = [(1.0 - d, i) for d, i in found if self._alive[i]][:k]
+        return [{"element_id": self.element_ids[i], "id": self.names[i], "labels": self.labels[i],
+                 "score": (1.0 + sim) / 2.0} for sim, i in hits]
+
+    def stats(self) -> dict:
+        return {"vectors": len(self), "rows": self._size, "dim": self.dim, "hnsw": self.hnsw is not None,
+                "hnsw_building": self._building is not None,
+                "version": self.version, "full_loads": self.full_loads,
+                "incremental_rows": self.incremental_rows,
+                "memory_mb": self._matrix.nbytes / (1024 * 1024)}
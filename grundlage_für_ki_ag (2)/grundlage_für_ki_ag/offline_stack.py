@@ -0,0 +1,319 @@
+"""
+Deterministische Stand-ins für Ollama und Neo4j
+===============================================
+
+Damit lassen sich die Stufen der Builder (Chunking, Extraktion, Parsing,
+Merging, Embedding, Schreiben) ohne GPU und ohne Datenbank reproduzierbar
+messen:
+
+  FakeChatModel   - LangChain-Chatmodell, das die Extraktions-Prompts der
+                    Builder versteht und per Regex "extrahiert"
+  FakeEmbeddings  - Hash-Embeddings (Zeichen-3-Gramme), wie im
+                    Entity-Resolution-Benchmark
+  RecordingGraph  - nimmt graph.query(...) entgegen und zählt Writes/Zeilen
+  LatencyModel    - simulierte Antwortzeit: fix + pro Input-/Output-Token,
+                    optional mit begrenzten Server-Slots (OLLAMA_NUM_PARALLEL)
+
+Gleiche Eingabe -> gleiche Antwort, auch bei paralleler Ausführung. Mit
+`malformed_rate` liefert das Fake-LLM einen festen Anteil kaputter Antworten
+(Einleitungssatz, trailing comma), um den toleranten Parser mitzumessen.
+"""
+
+import json
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def _stable_hash(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+class LatencyModel:
+    """
+    latency = base_ms + in_tokens * per_input_token_ms + out_tokens * per_output_token_ms
+
+    `slots` begrenzt gleichzeitig bediente Requests (wie ein Ollama-Server mit
+    OLLAMA_NUM_PARALLEL) - weitere Requests warten. `scale=0` schaltet das
+    Schlafen ab (reiner CPU-Overhead der Pipeline).
+    """
+
+    def __init__(self, base_ms: float = 0.0, per_input_token_ms: float = 0.0,
+                 per_output_token_ms: float = 0.0, slots: int = 0, scale: float = 1.0):
+        self.base_ms = base_ms
+        self.per_input_token_ms = per_input_token_ms
+        self.per_output_token_ms = per_output_token_ms
+        self.scale = scale
+        self._slots = threading.BoundedSemaphore(slots) if slots > 0 else None
+
+    def seconds(self, in_tokens: int, out_tokens: int = 0) -> float:
+        ms = self.base_ms + in_tokens * self.per_input_token_ms + out_tokens * self.per_output_token_ms
+        return ms * self.scale / 1000.0
+
+    def wait(self, in_tokens: int, out_tokens: int = 0):
+        delay = self.seconds(in_tokens, out_tokens)
+        if delay <= 0:
+            return
+        if self._slots is None:
+            time.sleep(delay)
+            return
+        with self._slots:
+            time.sleep(delay)
+
+
+NO_LATENCY = LatencyModel()
+
+
+class CallCounter:
+    """Thread-sichere Zähler (Calls, Tokens, Zeilen) für die Fakes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.input_tokens = 0
+            self.output_tokens = 0
+            self.items = 0
+
+    def add(self, calls: int = 1, input_tokens: int = 0, output_tokens: int = 0, items: int = 0):
+        with self._lock:
+            self.calls += calls
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.items += items
+
+
+# =============================================================================
+# FAKE LLM
+# =============================================================================
+
+# Regex pro Knotentyp - grob, aber deterministisch
+ENTITY_PATTERNS = {
+    "Person": re.compile(r"\b(?:Dr\. )?[A-ZÄÖÜ][a-zäöüß]+(?:-[A-ZÄÖÜ][a-zäöüß]+)? [A-ZÄÖÜ][a-zäöüß]+\b"),
+    "Ort": re.compile(r"\bRaum \d+\b|\b(?:Teeküche|Kopierraum|Hauptkorridor(?: \w+)?|Empfangsbereich|Etage \d+)\b"),
+    "Objekt": re.compile(r"\b(?:[Gg]oldene Trophäe|[Rr]oter USB-Stick|[Rr]oter Swingline Tacker|"
+                         r"[Vv]eganes Druckerpapier|Chai-Latte|Double Espresso|Kaffeemaschine)\b"),
+    "Zeitpunkt": re.compile(r"\b\d{1,2}:\d{2}\b"),
+    "Rolle": re.compile(r"\b(?:CTO|Head of Sales|Praktikant|Sicherheitschef|Reinigungskraft|"
+                        r"Senior Vice President of Human Capital Flow)\b"),
+}
+
+# (Quelltyp, Zieltyp) -> Beziehung
+RELATION_RULES = {
+    ("Person", "Ort"): "BEFINDET_SICH_IN",
+    ("Objekt", "Ort"): "BEFINDET_SICH_IN",
+    ("Person", "Objekt"): "BEWEGT",
+    ("Person", "Person"): "INTERAGIERT_MIT",
+    ("Person", "Rolle"): "HAT_ROLLE",
+}
+
+_TEXT_BLOCK = re.compile(r'TEXT:\s*"""\s*(.*?)\s*"""', re.DOTALL)
+_SINGLE_TYPE = re.compile(r'Entitäten vom Typ "(\w+)"')
+_MULTI_TYPE = re.compile(r"Entitäten der folgenden Typen: ([^\n]+)")
+_ENTITY_BLOCK = re.compile(r"GEFUNDENE ENTITÄTEN:\s*\n(.*?)\n\s*\n", re.DOTALL)
+
+
+def fake_extract_nodes(text: str, node_types: List[str], max_per_type: int = 12) -> List[Dict[str, str]]:
+    nodes, seen = [], set()
+    for node_type in node_types:
+        pattern = ENTITY_PATTERNS.get(node_type)
+        if pattern is None:
+            continue
+        count = 0
+        for m in pattern.finditer(text):
+            key = (node_type, m.group(0).lower())
+            if key in seen:
+                continue
+            seen.add(key)
+            nodes.append({"id": m.group(0), "type": node_type})
+            count += 1
+            if count >= max_per_type:
+                break
+    return nodes
+
+
+def fake_extract_relationships(text: str, entities: Dict[str, List[str]],
+                               max_rels: int = 20) -> List[Dict[str, str]]:
+    """Verbindet Entities, die im Text nah beieinander stehen, nach RELATION_RULES."""
+    positions = []
+    for node_type, ids in entities.items():
+        for entity_id in ids:
+            pos = text.find(entity_id)
+            if pos >= 0:
+                positions.append((pos, node_type, entity_id))
+    positions.sort()
+    times = ENTITY_PATTERNS["Zeitpunkt"].findall(text)
+
+    rels = []
+    for (_, src_type, src), (_, tgt_type, tgt) in zip(positions, positions[1:]):
+        rel_type = RELATION_RULES.get((src_type, tgt_type))
+        if rel_type is None and (tgt_type, src_type) in RELATION_RULES:
+            rel_type, src, tgt = RELATION_RULES[(tgt_type, src_type)], tgt, src
+        if rel_type is None or src == tgt:
+            continue
+        rels.append({"source": src, "target": tgt, "relation_type": rel_type,
+                     "time": times[0] if times else ""})
+        if len(rels) >= max_rels:
+            break
+    return rels
+
+
+def fake_response(prompt: str) -> str:
+    """Antwort (JSON) auf einen Knoten- oder Beziehungs-Prompt der Builder."""
+    m = _TEXT_BLOCK.search(prompt)
+    text = m.group(1) if m else prompt
+
+    block = _ENTITY_BLOCK.search(prompt + "\n\n")
+    if block:
+        entities = {}
+        for line in block.group(1).strip().splitlines():
+            if ":" in line:
+                node_type, ids = line.split(":", 1)
+                entities[node_type.strip()] = [i.strip() for i in ids.split(",") if i.strip()]
+        return json.dumps({"relationships": fake_extract_relationships(text, entities)}, ensure_ascii=False)
+
+    single = _SINGLE_TYPE.search(prompt)
+    multi = _MULTI_TYPE.search(prompt)
+    if single:
+        node_types = [single.group(1)]
+    elif multi:
+        node_types = [t.strip() for t in multi.group(1).split(",")]
+    else:
+        node_types = list(ENTITY_PATTERNS)
+    return json.dumps({"nodes": fake_extract_nodes(text, node_types)}, ensure_ascii=False)
+
+
+def _malform(response: str) -> str:
+    """Typische Fehler kleiner Modelle: Einleitungssatz + trailing comma."""
+    return "Here is the output:\n```json\n" + response.replace("}]", "},]", 1) + "\n```"
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chatmodell ohne Netz: beantwortet die Extraktions-Prompts deterministisch.
+    `bind(format=...)` (structured_output "schema") wird akzeptiert und ignoriert.
+    Mit `record=True` werden alle Antworten in `responses` gesammelt.
+    """
+
+    malformed_rate: float = 0.0
+    record: bool = False
+    _latency: Any = PrivateAttr(default=None)
+    _counter: Any = PrivateAttr(default=None)
+    _responses: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default=None)
+
+    def __init__(self, *, latency: LatencyModel = None, counter: CallCounter = None, **kwargs):
+        super().__init__(**kwargs)
+        self._latency = latency or NO_LATENCY
+        self._counter = counter or CallCounter()
+        self._responses = []
+        self._lock = threading.Lock()
+
+    @property
+    def counter(self) -> CallCounter:
+        return self._counter
+
+    @property
+    def responses(self) -> List[str]:
+        return list(self._responses)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-extractor"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": "fake-extractor", "malformed_rate": self.malformed_rate}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        content = fake_response(prompt)
+        if self.malformed_rate and (_stable_hash(prompt) % 1000) < self.malformed_rate * 1000:
+            content = _malform(content)
+
+        in_tokens, out_tokens = estimate_tokens(prompt), estimate_tokens(content)
+        self._latency.wait(in_tokens, out_tokens)
+        self._counter.add(input_tokens=in_tokens, output_tokens=out_tokens)
+        if self.record:
+            with self._lock:
+                self._responses.append(content)
+
+        message = AIMessage(content=content, usage_metadata={
+            "input_tokens": in_tokens, "output_tokens": out_tokens,
+            "total_tokens": in_tokens + out_tokens})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+# =============================================================================
+# FAKE EMBEDDINGS + GRAPH
+# =============================================================================
+
+class FakeEmbeddings:
+    """Hash-Embeddings über Zeichen-3-Gramme (normiert), Schnittstelle wie OllamaEmbeddings."""
+
+    def __init__(self, dim: int = 768, latency: LatencyModel = None, counter: CallCounter = None):
+        self.dim = dim
+        self.latency = latency or NO_LATENCY
+        self.counter = counter or CallCounter()
+
+    def _vector(self, text: str) -> List[float]:
+        v = [0.0] * self.dim
+        padded = f"  {' '.join(text.lower().split())} "
+        for i in range(len(padded) - 2):
+            v[_stable_hash(padded[i:i + 3]) % self.dim] += 1.0
+        norm = sum(x * x for x in v) ** 0.5 or 1.0
+        return [x / norm for x in v]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.latency.wait(sum(estimate_tokens(t) for t in texts))
+        self.counter.add(items=len(texts))
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class RecordingGraph:
+    """
+    Ersetzt Neo4jGraph: zählt Queries und Zeilen (Länge von params["rows"]).
+    Lesende Queries liefern eine leere Liste.
+    """
+
+    WRITE_PATTERN = re.compile(r"\b(MERGE|CREATE|SET|DELETE)\b", re.IGNORECASE)
+
+    def __init__(self, latency: LatencyModel = None):
+        self.latency = latency or NO_LATENCY
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.queries = 0
+            self.writes = 0
+            self.rows = 0
+
+    def query(self, cypher: str, params: Optional[dict] = None) -> List[dict]:
+        rows = len((params or {}).get("rows", []) or [])
+        self.latency.wait(rows)
+        with self._lock:
+            self.queries += 1
+            if self.WRITE_PATTERN.search(cypher):
+                self.writes += 1
+                self.rows += rows
+        return []
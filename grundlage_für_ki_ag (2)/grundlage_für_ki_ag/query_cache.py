@@ -0,0 +1,269 @@
+"""
+Read-through Cache für Cypher-Ergebnisse
+========================================
+
+Der ReAct-Agent ruft `get_neighborhood` / `search_entities` pro Frage oft
+mehrfach mit denselben Argumenten auf (und über Fragen hinweg erst recht) -
+jeder Aufruf war ein eigener Roundtrip zu Neo4j.
+
+    graph = CachedGraph(Neo4jGraph(...), CypherResultCache(max_entries=2048, ttl_s=600))
+    graph.query(...)          # lesend: aus dem Cache, sonst Neo4j
+    cache_retriever(retriever, graph.cache, graph.stamp)   # neo4j_graphrag-Retriever
+
+Schlüssel: Query-Text mit normalisiertem Whitespace + Parameter (sortiertes
+JSON). Verdrängung per LRU (max_entries) und TTL.
+
+Invalidierung über einen Versionsstempel im Graphen:
+
+    (:GraphVersion {key: "graph"}).version
+
+Die Version ist kein Zähler ab 1, sondern mindestens timestamp() (ms): ein
+voller Rebuild (`MATCH (n) DETACH DELETE n`) löscht auch den Versionsknoten,
+der nächste Bump landet trotzdem über allem, was ein Cache schon gesehen hat.
+
+Builder rufen nach dem Schreiben bump_graph_version() auf. Der Cache liest die
+Version höchstens alle `check_interval_s` Sekunden (ein Index-Lookup) und
+verwirft bei einer Änderung alle Einträge. Schreibende Queries über
+CachedGraph gehen am Cache vorbei und bumpen selbst.
+
+Hit-Raten werden pro Query-Form (Query-Text ohne Parameter) gezählt:
+    graph.cache.print_stats()
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+VERSION_LABEL = "GraphVersion"
+VERSION_KEY = "graph"
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_S = 300.0
+DEFAULT_CHECK_INTERVAL_S = 2.0
+SHAPE_CHARS = 60
+
+READ_VERSION_QUERY = f"MATCH (v:{VERSION_LABEL} {{key: '{VERSION_KEY}'}}) RETURN v.version AS version"
+BUMP_VERSION_QUERY = f"""
+    MERGE (v:{VERSION_LABEL} {{key: '{VERSION_KEY}'}})
+    SET v.version = CASE WHEN coalesce(v.version, 0) >= timestamp() THEN v.version + 1
+                         ELSE timestamp() END,
+        v.updated_at = datetime()
+    RETURN v.version AS version
+"""
+
+WRITE_PATTERN = re.compile(r"\b(CREATE|MERGE|SET|DELETE|REMOVE|DROP|FOREACH|LOAD\s+CSV)\b|\bIN\s+TRANSACTIONS\b",
+                           re.IGNORECASE)
+# Schema-DDL ändert keine Ergebnisse -> kein Versions-Bump (sonst invalidiert jeder Agent-Start alle Caches)
+SCHEMA_PATTERN = re.compile(r"^\s*(CREATE|DROP)\s+(\w+\s+)*(INDEX|CONSTRAINT)\b", re.IGNORECASE)
+
+
+# =============================================================================
+# VERSIONSSTEMPEL
+# =============================================================================
+
+def _run(graph, query: str) -> list:
+    """Neo4jGraph (graph.query) oder neo4j-Driver (driver.execute_query)."""
+    if hasattr(graph, "query"):
+        return graph.query(query)
+    records, _, _ = graph.execute_query(query)
+    return [record.data() for record in records]
+
+
+def read_graph_version(graph) -> int:
+    rows = _run(graph, READ_VERSION_QUERY)
+    return rows[0]["version"] if rows else 0
+
+
+def bump_graph_version(graph) -> int:
+    """Nach dem Schreiben aufrufen: macht die Query-Caches aller Agenten ungültig."""
+    return _run(graph, BUMP_VERSION_QUERY)[0]["version"]
+
+
+class VersionStamp:
+    """Liest die Graph-Version höchstens alle check_interval_s Sekunden."""
+
+    def __init__(self, reader: Callable[[], int], check_interval_s: float = DEFAULT_CHECK_INTERVAL_S):
+        self.reader = reader
+        self.check_interval_s = check_interval_s
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+
+    def current(self) -> int:
+        with self._lock:
+            now = time.monotonic()
+            if self._version is None or now - self._checked_at >= self.check_interval_s:
+                self._version = self.reader()
+                self._checked_at = now
+            return self._version
+
+    def expire(self):
+        """Nächster current()-Aufruf liest neu (z.B. nach eigenem Write)."""
+        with self._lock:
+            self._checked_at = 0.0
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split())
+
+
+def query_shape(query: str) -> str:
+    """Kurzname für die Statistik: Anfang des Query-Texts + Hash des ganzen Texts."""
+    text = normalize_query(query)
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:6]
+    return f"{text[:SHAPE_CHARS]}… #{digest}" if len(text) > SHAPE_CHARS else f"{text} #{digest}"
+
+
+def _params_key(params: Optional[dict]) -> str:
+    return json.dumps(params or {}, sort_keys=True, default=str, ensure_ascii=False)
+
+
+class CypherResultCache:
+    """LRU + TTL im Speicher, thread-safe. Gilt immer nur für eine Graph-Version."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_s: float = DEFAULT_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.version: Optional[int] = None
+        self.evictions = 0
+        self.expired = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._shapes: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, shape: str, field: str):
+        self._shapes.setdefault(shape, {"hits": 0, "misses": 0})[field] += 1
+
+    def sync_version(self, version: int):
+        """Verwirft alle Einträge, wenn sich die Graph-Version geändert hat."""
+        with self._lock:
+            if self.version is not None and version != self.version:
+                self._entries.clear()
+                self.invalidations += 1
+            self.version = version
+
+    def get(self, query: str, params: Optional[dict] = None, shape: str = None) -> Tuple[bool, Any]:
+        key = (normalize_query(query), _params_key(params))
+        shape = shape or query_shape(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_s:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self._count(shape, "misses")
+                return False, None
+            self._entries.move_to_end(key)
+            self._count(shape, "hits")
+            return True, entry[1]
+
+    def put(self, query: str, params: Optional[dict], value: Any):
+        key = (normalize_query(query), _params_key(params))
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # --- Statistik ---
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = sum(s["hits"] for s in self._shapes.values())
+            misses = sum(s["misses"] for s in self._shapes.values())
+            shapes = {shape: dict(s, hit_rate=s["hits"] / (s["hits"] + s["misses"]))
+                      for shape, s in self._shapes.items()}
+            return {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "entries": len(self._entries),
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "invalidations": self.invalidations,
+                "version": self.version,
+                "shapes": shapes,
+            }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"🗄️  Cypher-Cache: {s['hits']} Hits / {s['misses']} Misses ({s['hit_rate']:.0%}) | "
+              f"{s['entries']} Einträge, {s['evictions']} verdrängt, {s['expired']} abgelaufen, "
+              f"{s['invalidations']}x invalidiert (Graph-Version {s['version']})", flush=True)
+        for shape, st in sorted(s["shapes"].items(), key=lambda item: -(item[1]["hits"] + item[1]["misses"])):
+            print(f"   {st['hit_rate']:>4.0%}  {st['hits']:>5}/{st['hits'] + st['misses']:<5} {shape}", flush=True)
+
+
+# =============================================================================
+# EINBINDUNG
+# =============================================================================
+
+class CachedGraph:
+    """
+    Wrapper um Neo4jGraph mit derselben query()-Signatur. Alle anderen
+    Attribute (schema, refresh_schema, ...) werden durchgereicht.
+    """
+
+    def __init__(self, graph, cache: CypherResultCache = None,
+                 check_interval_s: float = DEFAULT_CHECK_INTERVAL_S):
+        self.graph = graph
+        self.cache = cache or CypherResultCache()
+        self.stamp = VersionStamp(lambda: read_graph_version(graph), check_interval_s)
+
+    def query(self, query: str, params: dict = None) -> list:
+        if SCHEMA_PATTERN.match(query):
+            return self.graph.query(query, params=params or {})
+        if WRITE_PATTERN.search(query):
+            result = self.graph.query(query, params=params or {})
+            bump_graph_version(self.graph)
+            self.stamp.expire()
+            return result
+
+        self.cache.sync_version(self.stamp.current())
+        hit, value = self.cache.get(query, params)
+        if hit:
+            return list(value)
+        result = self.graph.query(query, params=params or {})
+        self.cache.put(query, params, result)
+        return list(result)
+
+    def __getattr__(self, name: str):
+        return getattr(self.graph, name)
+
+
+def cache_retriever(retriever, cache: CypherResultCache, stamp: VersionStamp):
+    """
+    Hängt den Cache vor retriever.search() eines neo4j_graphrag-Retrievers
+    (VectorCypherRetriever, ...). Die Form ist die retrieval_query, der
+    Schlüssel zusätzlich Frage + top_k. Die Instanz wird direkt gepatcht,
+    weil GraphRAG den Retriever-Typ prüft.
+    """
+    search = retriever.search
+    retrieval_query = getattr(retriever, "retrieval_query", None) or type(retriever).__name__
+
+    def cached_search(*args, **kwargs):
+        cache.sync_version(stamp.current())
+        params = {"args": list(args), "kwargs": kwargs}
+        hit, value = cache.get(retrieval_query, params)
+        if hit:
+            return value
+        value = search(*args, **kwargs)
+        cache.put(retrieval_query, params, value)
+        return value
+
+    retriever.search = cached_search
+    return retriever
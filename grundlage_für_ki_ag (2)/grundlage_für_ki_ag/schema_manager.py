@@ -0,0 +1,435 @@
+"""
+Schema-Manager: Constraints und Indizes aus den Builder-Schemas
+===============================================================
+
+setup_db.py legte bisher nur für Person und Organization eine
+Uniqueness-Constraint an. Die Builder MERGEn aber auf `id` für Ort, Objekt,
+Zeitpunkt, Rolle, Location, Product, God, Weapon, ... - ohne Index ist jedes
+dieser MERGEs ein Label-Scan.
+
+Dieser Modul
+  1. liest per `ast` aus allen Builder-Skripten die Listen ALLOWED_NODES /
+     allowed_nodes / target_nodes (auch als Keyword-Argument
+     `allowed_nodes=[...]`) und die Beziehungslisten,
+  2. leitet daraus ab und legt idempotent (IF NOT EXISTS) an:
+       - pro Label:      UNIQUE-Constraint auf id (bringt einen Range-Index mit)
+       - :Entity(id):    Range-Index (eine id kann unter mehreren Typen vorkommen)
+       - :Entity(lookup_key): Range-Index für die case-insensitive Namenssuche
+       - Fulltext-Index entity_fulltext auf :Entity(id): unscharfer Fallback in
+         graph_tools, Fulltext-Hälfte von hybrid_retriever (RRF mit entity_index)
+       - :Entity(embedded_at): Range-Index für LocalVectorIndex.refresh()
+       - EXTRA_NODE_KEYS (z.B. :SectionState(key) aus krimi_graph_builder)
+       - Vector-Index entity_index auf :Entity(embedding)
+  3. berichtet, welche MERGE/MATCH-Lookups im Code nicht durch einen Index
+     gedeckt sind (kein Label, Label ohne Index, Regex-Vergleich).
+
+Aufruf:
+    python schema_manager.py                # Schema anzeigen + Report (offline)
+    python schema_manager.py --apply        # zusätzlich in Neo4j anlegen
+"""
+
+import argparse
+import ast
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from graph_writer import quote_name
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+ENTITY_LABEL = "Entity"
+VECTOR_INDEX_NAME = "entity_index"
+FULLTEXT_INDEX_NAME = "entity_fulltext"
+LOOKUP_PROPERTY = "lookup_key"       # graph_writer.lookup_key()
+EMBEDDING_DIM = 768   # nomic-embed-text
+
+# Variablennamen, unter denen die Builder ihre Schemas ablegen
+NODE_LIST_NAMES = {"ALLOWED_NODES", "allowed_nodes", "target_nodes"}
+REL_LIST_NAMES = {"ALLOWED_RELATIONSHIPS", "allowed_relationships", "allowed_rels", "target_rels"}
+
+# Schlüssel, die nicht aus einer Typ-Liste kommen
+EXTRA_NODE_KEYS = {"SectionState": "key",    # krimi_graph_builder.SECTION_STATE_LABEL
+                   "GraphVersion": "key"}    # query_cache.VERSION_LABEL
+
+
+# =============================================================================
+# 1. SCHEMAS AUS DEN BUILDERN LESEN
+# =============================================================================
+
+@dataclass
+class BuilderSchema:
+    path: str
+    nodes: List[str]
+    relationships: List[str]
+
+
+def _python_files(root: str) -> Iterable[str]:
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith((".", "__")))
+        for name in sorted(files):
+            if name.endswith(".py"):
+                yield os.path.join(directory, name)
+
+
+def _parse(path: str) -> Optional[ast.Module]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return ast.parse(f.read(), filename=path)
+    except (SyntaxError, UnicodeDecodeError):
+        return None
+
+
+def _string_list(node: ast.AST) -> Optional[List[str]]:
+    try:
+        value = ast.literal_eval(node)
+    except (ValueError, SyntaxError):
+        return None
+    if isinstance(value, (list, tuple)) and all(isinstance(v, str) for v in value):
+        return list(value)
+    return None
+
+
+def read_builder_schema(path: str) -> Optional[BuilderSchema]:
+    """Knoten-/Beziehungslisten eines Skripts (None, wenn es keine hat)."""
+    tree = _parse(path)
+    if tree is None:
+        return None
+    nodes, rels = [], []
+
+    def add(name: str, value: ast.AST):
+        values = _string_list(value)
+        if values is None:
+            return
+        if name in NODE_LIST_NAMES:
+            nodes.extend(v for v in values if v not in nodes)
+        elif name in REL_LIST_NAMES:
+            rels.extend(v for v in values if v not in rels)
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    add(target.id, node.value)
+        elif isinstance(node, ast.Call):
+            for keyword in node.keywords:
+                if keyword.arg:
+                    add(keyword.arg, keyword.value)
+
+    if not nodes and not rels:
+        return None
+    return BuilderSchema(os.path.relpath(path, ROOT_DIR), nodes, rels)
+
+
+def discover_schemas(root: str = ROOT_DIR) -> List[BuilderSchema]:
+    return [s for s in (read_builder_schema(p) for p in _python_files(root)) if s is not None]
+
+
+def merged_labels(schemas: List[BuilderSchema]) -> Tuple[List[str], List[str]]:
+    labels, rel_types = [], []
+    for s in schemas:
+        labels.extend(n for n in s.nodes if n not in labels)
+        rel_types.extend(r for r in s.relationships if r not in rel_types)
+    return labels, rel_types
+
+
+# =============================================================================
+# 2. CONSTRAINTS + INDIZES
+# =============================================================================
+
+@dataclass
+class SchemaStatement:
+    name: str
+    kind: str                  # "constraint" | "range" | "fulltext" | "vector"
+    label: str
+    prop: str
+    cypher: str
+    fallback: Optional[str] = None   # Range-Index, falls die Constraint an Dubletten scheitert
+
+
+def _slug(label: str) -> str:
+    return re.sub(r"\W+", "_", label).strip("_").lower()
+
+
+def _unique_constraint(label: str, prop: str) -> SchemaStatement:
+    name = f"unique_{_slug(label)}_{prop}"
+    return SchemaStatement(
+        name, "constraint", label, prop,
+        f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{quote_name(label)}) REQUIRE n.{prop} IS UNIQUE",
+        fallback=f"CREATE INDEX range_{_slug(label)}_{prop} IF NOT EXISTS "
+                 f"FOR (n:{quote_name(label)}) ON (n.{prop})")
+
+
+def _range_index(label: str, prop: str) -> SchemaStatement:
+    name = f"range_{_slug(label)}_{prop}"
+    return SchemaStatement(name, "range", label, prop,
+                           f"CREATE INDEX {name} IF NOT EXISTS FOR (n:{quote_name(label)}) ON (n.{prop})")
+
+
+def fulltext_index() -> SchemaStatement:
+    """Einzige Definition von entity_fulltext (auch hybrid_retriever.ensure_fulltext_index)."""
+    return SchemaStatement(FULLTEXT_INDEX_NAME, "fulltext", ENTITY_LABEL, "id",
+                           f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX_NAME} IF NOT EXISTS "
+                           f"FOR (n:{ENTITY_LABEL}) ON EACH [n.id]")
+
+
+def lookup_statements() -> List[SchemaStatement]:
+    """Indizes, auf die sich graph_tools.resolve_entity() verlässt."""
+    return [_range_index(ENTITY_LABEL, LOOKUP_PROPERTY), fulltext_index()]
+
+
+def _vector_index(vector_dim: int) -> SchemaStatement:
+    return SchemaStatement(VECTOR_INDEX_NAME, "vector", ENTITY_LABEL, "embedding", f"""
+        CREATE VECTOR INDEX {VECTOR_INDEX_NAME} IF NOT EXISTS
+        FOR (n:{ENTITY_LABEL}) ON (n.embedding)
+        OPTIONS {{indexConfig: {{
+          `vector.dimensions`: {vector_dim},
+          `vector.similarity_function`: 'cosine'
+        }}}}
+    """)
+
+
+def plan_schema(labels: Iterable[str], vector_dim: Optional[int] = EMBEDDING_DIM) -> List[SchemaStatement]:
+    """Alle Statements für die Labels; vector_dim=None lässt den Vector-Index weg."""
+    statements = [_unique_constraint(label, "id") for label in labels if label != ENTITY_LABEL]
+    statements.append(_range_index(ENTITY_LABEL, "id"))
+    statements += lookup_statements()
+    statements.append(_range_index(ENTITY_LABEL, "embedded_at"))   # local_vector_index.EMBEDDED_AT
+    statements += [_unique_constraint(label, prop) for label, prop in EXTRA_NODE_KEYS.items()]
+    if vector_dim:
+        statements.append(_vector_index(vector_dim))
+    return statements
+
+
+def apply_schema(graph, statements: List[SchemaStatement], log=print) -> Dict[str, int]:
+    """Führt die Statements aus (idempotent). Scheitert eine Constraint, wird der Range-Index angelegt."""
+    counts = {"ok": 0, "fallback": 0, "failed": 0}
+    for s in statements:
+        try:
+            graph.query(s.cypher)
+            counts["ok"] += 1
+        except Exception as e:
+            if s.fallback is None:
+                counts["failed"] += 1
+                log(f"   ❌ {s.name}: {str(e)[:120]}")
+                continue
+            # Typisch: Dubletten im Bestand oder schon ein Range-Index auf (Label, Property)
+            try:
+                graph.query(s.fallback)
+                counts["fallback"] += 1
+                log(f"   ⚠️  {s.name}: Constraint nicht möglich, Range-Index statt dessen "
+                    f"({str(e)[:80]})")
+            except Exception as e2:
+                counts["failed"] += 1
+                log(f"   ❌ {s.name}: {str(e2)[:120]}")
+    return counts
+
+
+def existing_indexes(graph) -> Set[Tuple[str, str]]:
+    """(Label, Property) aller Knoten-Indizes in der DB (Constraints bringen ihren eigenen mit)."""
+    rows = graph.query("""
+        SHOW INDEXES YIELD entityType, labelsOrTypes, properties
+        WHERE entityType = 'NODE' AND labelsOrTypes IS NOT NULL
+        RETURN labelsOrTypes AS labels, properties
+    """)
+    return {(label, prop) for r in rows for label in r["labels"] for prop in r["properties"]}
+
+
+def ensure_schema(graph, labels: Iterable[str], vector_dim: Optional[int] = EMBEDDING_DIM,
+                  log=print) -> Dict[str, int]:
+    """Für die Builder: Schema vor der Ingestion anlegen."""
+    statements = plan_schema(labels, vector_dim)
+    counts = apply_schema(graph, statements, log=log)
+    log(f"   🛡️  Schema: {counts['ok']} Constraints/Indizes bereit"
+        + (f", {counts['fallback']} als Range-Index" if counts["fallback"] else "")
+        + (f", {counts['failed']} fehlgeschlagen" if counts["failed"] else ""))
+    return counts
+
+
+# =============================================================================
+# 3. REPORT: NICHT INDEX-GESTÜTZTE LOOKUPS
+# =============================================================================
+
+# MERGE/MATCH (var:Label:... {prop: ...}) - Labels literal, `quoted` oder {placeholder}
+_CLAUSE = re.compile(
+    r"\b(MERGE|MATCH)\s*\(\s*(\w*)\s*((?::\s*(?:`[^`]*`|\{[^{}]*\}|\w+)\s*)*)\s*(?:\{\{?\s*(\w+)\s*:)?",
+    re.IGNORECASE)
+_LABEL = re.compile(r":\s*(`[^`]*`|\{[^{}]*\}|\w+)")
+_WHERE = re.compile(r"\bWHERE\s+(\w+)\.(\w+)\s*(=~|=|IN\b)", re.IGNORECASE)
+
+
+@dataclass
+class Lookup:
+    path: str
+    line: int
+    clause: str
+    labels: List[str]          # "?" = dynamisch
+    prop: str
+    op: str = "="
+    status: str = ""
+
+
+def _module_constants(tree: ast.Module) -> Dict[str, str]:
+    consts = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) \
+                and isinstance(node.value.value, str):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    consts[target.id] = node.value.value
+    return consts
+
+
+def _resolve_label(raw: str, consts: Dict[str, str]) -> str:
+    raw = raw.strip()
+    if raw.startswith("`"):
+        return raw.strip("`")
+    if raw.startswith("{"):
+        return consts.get(raw.strip("{} "), "?")
+    return raw
+
+
+def _query_strings(tree: ast.Module, source: str):
+    """(Zeile, Quelltext) aller String-Literale mit MATCH/MERGE (f-Strings mit Platzhaltern)."""
+    # Docstrings und andere String-Statements sind keine Queries
+    prose = {id(n.value) for n in ast.walk(tree) if isinstance(n, ast.Expr)}
+    for node in ast.walk(tree):
+        if id(node) in prose:
+            continue
+        if isinstance(node, ast.JoinedStr) or (isinstance(node, ast.Constant) and isinstance(node.value, str)):
+            text = ast.get_source_segment(source, node) or ""
+            if re.search(r"\b(MATCH|MERGE)\b", text) and "(" in text:
+                yield node.lineno, text
+
+
+def scan_lookups(root: str = ROOT_DIR) -> List[Lookup]:
+    lookups = []
+    for path in _python_files(root):
+        if os.path.abspath(path) == os.path.abspath(__file__):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+        tree = _parse(path)
+        if tree is None:
+            continue
+        rel = os.path.relpath(path, ROOT_DIR)
+        consts = _module_constants(tree)
+        seen = set()
+        for lineno, text in _query_strings(tree, source):
+            if (lineno, text) in seen:   # f-Strings enthalten verschachtelte Constants
+                continue
+            seen.add((lineno, text))
+            variables: Dict[str, List[str]] = {}
+            for m in _CLAUSE.finditer(text):
+                clause, var, label_part, prop = m.group(1).upper(), m.group(2), m.group(3), m.group(4)
+                labels = [_resolve_label(l, consts) for l in _LABEL.findall(label_part or "")]
+                if var and (labels or var not in variables):
+                    variables[var] = labels
+                if prop:
+                    line = lineno + text[:m.start()].count("\n")
+                    lookups.append(Lookup(rel, line, clause, labels, prop))
+            for m in _WHERE.finditer(text):
+                var, prop, op = m.group(1), m.group(2), m.group(3).upper()
+                if var not in variables:
+                    continue
+                line = lineno + text[:m.start()].count("\n")
+                lookups.append(Lookup(rel, line, "WHERE", variables[var], prop, op))
+
+        # add_graph_documents MERGEt (:Typ {id}) für jeden erlaubten Typ des Skripts
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call) and getattr(node.func, "attr", None) == "add_graph_documents":
+                lookups.append(Lookup(rel, node.lineno, "add_graph_documents", ["?"], "id"))
+    return lookups
+
+
+def classify(lookups: List[Lookup], indexed: Set[Tuple[str, str]],
+             schemas: List[BuilderSchema]) -> List[Lookup]:
+    """Setzt `status`; "✅" = durch einen Index gedeckt."""
+    by_file = {s.path: s.nodes for s in schemas}
+    for lk in lookups:
+        if lk.op == "=~":
+            lk.status = "❌ Regex-Vergleich - kein Index nutzbar"
+        elif not lk.labels:
+            lk.status = "❌ ohne Label - Scan über alle Knoten"
+        elif "?" in lk.labels:
+            allowed = by_file.get(lk.path, [])
+            missing = [l for l in allowed if (l, lk.prop) not in indexed]
+            if not allowed:
+                lk.status = "⚪ Label dynamisch (vom Aufrufer) - gedeckt, wenn der Builder ensure_schema nutzt"
+            elif missing:
+                lk.status = f"❌ Label dynamisch, kein Index für {', '.join(missing)}.{lk.prop}"
+            else:
+                lk.status = "✅ Label dynamisch, alle Typen des Skripts indexiert"
+        elif any((l, lk.prop) in indexed for l in lk.labels):
+            lk.status = "✅"
+        else:
+            lk.status = f"❌ kein Index auf {':'.join(lk.labels)}({lk.prop})"
+    return lookups
+
+
+def unknown_relationship_types(graph, rel_types: Iterable[str]) -> List[str]:
+    """Beziehungstypen in der DB, die in keiner Builder-Liste stehen (LLM-Wildwuchs)."""
+    rows = graph.query("CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType AS t")
+    allowed = set(rel_types)
+    return sorted(r["t"] for r in rows if r["t"] not in allowed)
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main():
+    cli = argparse.ArgumentParser(description="Leitet Constraints/Indizes aus den Builder-Schemas ab.")
+    cli.add_argument("--apply", action="store_true", help="Constraints/Indizes in Neo4j anlegen")
+    cli.add_argument("--dim", type=int, default=EMBEDDING_DIM, help="Dimension des Vector-Index (0 = keiner)")
+    cli.add_argument("--all", action="store_true", help="Auch gedeckte Lookups im Report zeigen")
+    args = cli.parse_args()
+
+    schemas = discover_schemas()
+    labels, rel_types = merged_labels(schemas)
+
+    print("\n🗂️  SCHEMAS DER BUILDER")
+    print("=" * 70)
+    for s in schemas:
+        print(f"   {s.path}")
+        print(f"      Knoten:      {', '.join(s.nodes) or '-'}")
+        print(f"      Beziehungen: {', '.join(s.relationships) or '-'}")
+
+    statements = plan_schema(labels, args.dim or None)
+    print(f"\n🛡️  {len(statements)} CONSTRAINTS / INDIZES")
+    for s in statements:
+        print(f"   {s.kind:<10} {s.name:<32} :{s.label}({s.prop})")
+
+    indexed = {(s.label, s.prop) for s in statements if s.kind not in ("vector", "fulltext")}
+    graph = None
+    if args.apply:
+        from dotenv import load_dotenv
+        from langchain_community.graphs import Neo4jGraph
+
+        load_dotenv()
+        graph = Neo4jGraph(url=os.getenv("NEO4J_URI"), username=os.getenv("NEO4J_USERNAME"),
+                           password=os.getenv("NEO4J_PASSWORD"))
+        print("\n⚙️  Lege an...")
+        counts = apply_schema(graph, statements)
+        print(f"   ✅ {counts['ok']} ok, {counts['fallback']} als Range-Index, {counts['failed']} fehlgeschlagen")
+        indexed = existing_indexes(graph)
+
+    lookups = classify(scan_lookups(), indexed, schemas)
+    uncovered = [lk for lk in lookups if lk.status.startswith("❌")]
+    dynamic = [lk for lk in lookups if lk.status.startswith("⚪")]
+    print(f"\n🔎 LOOKUPS IM CODE: {len(lookups)}, davon {len(uncovered)} nicht index-gestützt, "
+          f"{len(dynamic)} mit Label vom Aufrufer")
+    print("-" * 70)
+    for lk in (lookups if args.all else uncovered):
+        target = ":".join(lk.labels) or "(kein Label)"
+        print(f"   {lk.path}:{lk.line:<5} {lk.clause:<20} {target}.{lk.prop} {lk.op}")
+        print(f"      {lk.status}")
+
+    if graph is not None:
+        unknown = unknown_relationship_types(graph, rel_types)
+        if unknown:
+            print(f"\n⚠️  Beziehungstypen ohne Builder-Schema: {', '.join(unknown)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import os
 from dotenv import load_dotenv
 from neo4j import GraphDatabase
 
+from schema_manager import discover_schemas, merged_labels, plan_schema
+
 load_dotenv()
 
 # Konfiguration
@@ -39,10 +41,12 @@ def setup_database():
             }}}}
         """)
         
-        # 4. Constraints erstellen
-        print("   🛡️  Erstelle Constraints...")
-        session.run("CREATE CONSTRAINT unique_person_id IF NOT EXISTS FOR (n:Person) REQUIRE n.id IS UNIQUE")
-        session.run("CREATE CONSTRAINT unique_org_id IF NOT EXISTS FOR (n:Organization) REQUIRE n.id IS UNIQUE")
+        # 4. Constraints/Indizes für alle Knotentypen aller Builder (schema_manager.py)
+        labels, _ = merged_labels(discover_schemas())
+        statements = plan_schema(labels, vector_dim=None)  # Vector-Index steht schon (Schritt 3)
+        print(f"   🛡️  Erstelle {len(statements)} Constraints/Indizes für {len(labels)} Typen...")
+        for statement in statements:
+            session.run(statement.cypher)
         
     driver.close()
     print("✅ Datenbank ist jetzt KOMPLETT LEER und bereit.")
@@ -0,0 +1,182 @@
+"""
+Mehrstufige Pipeline mit begrenzten Queues
+==========================================
+
+Statt "erst alle Knoten eines Abschnitts, dann seine Beziehungen, dann der
+nächste Abschnitt" laufen die Stufen überlappend:
+
+    Items ──> [Stufe 1: n Worker] ──Queue(max)──> [Stufe 2: m Worker] ──> Ergebnisse
+
+Während Stufe 2 an Item i arbeitet, holt sich Stufe 1 schon Item i+1. Die
+begrenzte Queue sorgt für Backpressure: ist Stufe 2 der Engpass, blockiert
+Stufe 1, statt beliebig viele Zwischenergebnisse aufzustauen.
+
+Die Ergebnisse kommen in Eingabe-Reihenfolge zurück. Pro Stufe wird gemessen,
+wie lange die Worker gearbeitet, auf Input gewartet (unterversorgt) und auf
+Platz in der Ausgabe-Queue gewartet haben (blockiert). Die Stufe mit der
+höchsten Auslastung ist der Engpass.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+DEFAULT_QUEUE_SIZE = 4
+
+_STOP = object()
+
+
+class _Failure:
+    """Exception eines Workers - wird durchgereicht und beim Konsumenten geworfen."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+
+
+@dataclass
+class StageStats:
+    name: str
+    workers: int
+    items: int = 0
+    busy_s: float = 0.0
+    starved_s: float = 0.0   # Warten auf Input
+    blocked_s: float = 0.0   # Warten auf Platz in der Ausgabe-Queue
+
+    def utilization(self, wall_s: float) -> float:
+        return self.busy_s / (self.workers * wall_s) if wall_s else 0.0
+
+
+@dataclass
+class PipelineStats:
+    stages: List[StageStats] = field(default_factory=list)
+    wall_s: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def _add(self, index: int, items: int = 0, busy_s: float = 0.0,
+             starved_s: float = 0.0, blocked_s: float = 0.0):
+        with self._lock:
+            s = self.stages[index]
+            s.items += items
+            s.busy_s += busy_s
+            s.starved_s += starved_s
+            s.blocked_s += blocked_s
+
+    def bottleneck(self) -> str:
+        if not self.stages:
+            return ""
+        return max(self.stages, key=lambda s: s.utilization(self.wall_s)).name
+
+    def report(self) -> str:
+        lines = [f"Pipeline: {self.wall_s:.1f}s Wall-Time"]
+        for s in self.stages:
+            lines.append(f"  {s.name:<14} {s.workers} Worker, {s.items:>4} Items, "
+                         f"Auslastung {s.utilization(self.wall_s):>4.0%} "
+                         f"(arbeitet {s.busy_s:.1f}s, wartet auf Input {s.starved_s:.1f}s, "
+                         f"blockiert {s.blocked_s:.1f}s)")
+        if self.stages:
+            lines.append(f"  Engpass: {self.bottleneck()}")
+        return "\n".join(lines)
+
+
+def run_pipeline(items: Iterable[Any], stages: List[Stage], queue_size: int = DEFAULT_QUEUE_SIZE,
+                 stats: PipelineStats = None) -> Iterator[Any]:
+    """
+    Schickt jedes Item durch alle Stufen (Ausgabe von Stufe k = Eingabe von
+    Stufe k+1) und liefert die Endergebnisse in Eingabe-Reihenfolge.
+
+    Wirft eine Stufe eine Exception, wird sie beim Konsumenten geworfen,
+    sobald das betroffene Item an der Reihe ist.
+    """
+    if stats is None:
+        stats = PipelineStats()
+    base = len(stats.stages)
+    stats.stages.extend(StageStats(s.name, s.workers) for s in stages)
+
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    results: "queue.Queue" = queue.Queue()
+    outputs = queues[1:] + [results]
+    start = time.perf_counter()
+
+    def feed():
+        for index, item in enumerate(items):
+            queues[0].put((index, item))
+        for _ in range(stages[0].workers):
+            queues[0].put(_STOP)
+
+    def make_worker(k: int, alive: List[int], lock: threading.Lock):
+        stage, inbox, outbox = stages[k], queues[k], outputs[k]
+        next_workers = stages[k + 1].workers if k + 1 < len(stages) else 1
+
+        def work():
+            while True:
+                t0 = time.perf_counter()
+                entry = inbox.get()
+                t1 = time.perf_counter()
+                if entry is _STOP:
+                    stats._add(base + k, starved_s=t1 - t0)
+                    break
+                index, item = entry
+                if isinstance(item, _Failure):
+                    result = item
+                else:
+                    try:
+                        result = stage.fn(item)
+                    except BaseException as e:
+                        result = _Failure(e)
+                t2 = time.perf_counter()
+                # Vor dem put zählen: der Konsument kann den Report direkt nach
+                # dem letzten Ergebnis drucken
+                stats._add(base + k, items=1, busy_s=t2 - t1, starved_s=t1 - t0)
+                outbox.put((index, result))
+                stats._add(base + k, blocked_s=time.perf_counter() - t2)
+
+            # Der letzte Worker einer Stufe beendet die nächste
+            with lock:
+                alive[0] -= 1
+                last = alive[0] == 0
+            if last:
+                for _ in range(next_workers):
+                    outbox.put(_STOP)
+
+        return work
+
+    threads = [threading.Thread(target=feed, name="pipeline-feed", daemon=True)]
+    for k, stage in enumerate(stages):
+        alive, lock = [stage.workers], threading.Lock()
+        worker = make_worker(k, alive, lock)
+        threads += [threading.Thread(target=worker, name=f"pipeline-{stage.name}-{w}", daemon=True)
+                    for w in range(stage.workers)]
+    for t in threads:
+        t.start()
+
+    # Umsortieren in Eingabe-Reihenfolge
+    pending: Dict[int, Any] = {}
+    next_index = 0
+    wall_before = stats.wall_s
+    try:
+        while True:
+            entry = results.get()
+            if entry is _STOP:
+                break
+            index, result = entry
+            pending[index] = result
+            while next_index in pending:
+                result = pending.pop(next_index)
+                next_index += 1
+                if isinstance(result, _Failure):
+                    raise result.error
+                # Schon beim Yield setzen: Konsumenten, die genau n Ergebnisse
+                # mit next() holen, erreichen das finally erst beim close()
+                stats.wall_s = wall_before + time.perf_counter() - start
+                yield result
+    finally:
+        stats.wall_s = wall_before + time.perf_counter() - start
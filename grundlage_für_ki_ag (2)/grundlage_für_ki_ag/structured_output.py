@@ -0,0 +1,157 @@
+"""
+Strukturierte LLM-Ausgabe: JSON-Schema + toleranter Parser
+==========================================================
+
+Problem: `PydanticOutputParser` wirft, sobald llama3/gemma3 etwas vor das
+JSON schreibt ("Here is the output..."), ein Komma zu viel setzt oder das
+Schema aus den Format-Anweisungen zurückgibt. Der Extraktor verwirft dann den
+ganzen Typ - der LLM-Call war bezahlt, hat aber nichts gebracht.
+
+Drei Modi (OUTPUT_MODES):
+  "prompt" = wie bisher: Format-Anweisungen im Prompt, strikter Parser
+  "repair" = wie "prompt", aber kaputte Antworten werden mit json_repair
+             repariert und dann validiert
+  "schema" = zusätzlich wird Ollama das JSON-Schema als `format` mitgegeben
+             (constrained decoding) - das Modell KANN nur noch gültiges JSON
+             in der richtigen Struktur erzeugen
+
+Benutzung in einer Chain:
+
+    parser = make_parser(NodeList, output_mode, stats)
+    chain = prompt | structured_llm(llm, NodeList, output_mode) | parser
+"""
+
+import threading
+import typing
+from typing import Any, Optional, Type
+
+import json_repair
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import PydanticOutputParser
+from pydantic import BaseModel, ValidationError
+
+OUTPUT_MODES = ("schema", "repair", "prompt")
+DEFAULT_OUTPUT_MODE = "schema"
+
+
+class ParseStats:
+    """Zählt geparste, reparierte und verworfene Antworten (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.responses = 0
+            self.repaired = 0
+            self.failed = 0
+
+    def record(self, outcome: str):
+        with self._lock:
+            self.responses += 1
+            if outcome == "repaired":
+                self.repaired += 1
+            elif outcome == "failed":
+                self.failed += 1
+
+    def wasted_per_100(self, units: int) -> float:
+        """Verworfene Calls pro 100 Einheiten (z.B. Abschnitte)."""
+        return 100.0 * self.failed / units if units else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.responses} Antworten geparst, {self.repaired} repariert, "
+                f"{self.failed} verworfen")
+
+
+def _list_fields(model_cls: Type[BaseModel]):
+    return [name for name, f in model_cls.model_fields.items()
+            if typing.get_origin(f.annotation) in (list, typing.List)]
+
+
+def _is_schema_echo(obj, model_cls: Type[BaseModel]) -> bool:
+    """Das Modell hat das Schema aus den Format-Anweisungen "ausgefüllt"."""
+    return isinstance(obj, dict) and "properties" in obj and not set(model_cls.model_fields) & set(obj)
+
+
+def repair_parse(text: str, model_cls: Type[BaseModel]) -> BaseModel:
+    """
+    Holt mit json_repair das JSON aus einer kaputten Antwort und validiert es.
+
+    Typische Fälle, die hier gerettet werden:
+      - Einleitungssatz / Markdown-Fences um das JSON
+      - fehlende Klammern, trailing commas, einfache Anführungszeichen
+      - nackte Liste statt {"nodes": [...]}
+      - das Schema selbst mit den Daten unter "properties"
+    """
+    obj = json_repair.loads(text)
+
+    if _is_schema_echo(obj, model_cls):
+        obj = obj["properties"]
+
+    if isinstance(obj, list):
+        fields = _list_fields(model_cls)
+        if len(fields) == 1:
+            obj = {fields[0]: obj}
+
+    if not isinstance(obj, dict):
+        raise OutputParserException(f"Kein JSON-Objekt in der Antwort: {text[:100]!r}", llm_output=text)
+    try:
+        return model_cls.model_validate(obj)
+    except ValidationError as e:
+        raise OutputParserException(f"Repariertes JSON passt nicht zu {model_cls.__name__}: {e}",
+                                    llm_output=text) from e
+
+
+class TolerantPydanticOutputParser(PydanticOutputParser):
+    """
+    PydanticOutputParser, der bei Parse-Fehlern (optional) json_repair
+    versucht, bevor er aufgibt. Zählt jedes Ergebnis in `stats`.
+    """
+
+    repair: bool = True
+    stats: Optional[Any] = None
+
+    def _record(self, outcome: str):
+        if self.stats is not None:
+            self.stats.record(outcome)
+
+    def parse_result(self, result, *, partial: bool = False):
+        try:
+            parsed = super().parse_result(result, partial=partial)
+        except OutputParserException:
+            if not self.repair:
+                self._record("failed")
+                raise
+            try:
+                parsed = repair_parse(result[0].text, self.pydantic_object)
+            except OutputParserException:
+                self._record("failed")
+                raise
+            self._record("repaired")
+            return parsed
+
+        # Felder mit default_factory validieren auch ein ausgefülltes Schema
+        # ({"properties": {"nodes": [...]}}) - leer. Die Daten stecken darunter.
+        text = result[0].text
+        if self.repair and '"properties"' in text and _is_schema_echo(json_repair.loads(text), self.pydantic_object):
+            parsed = repair_parse(text, self.pydantic_object)
+            self._record("repaired")
+            return parsed
+        self._record("ok")
+        return parsed
+
+
+def make_parser(model_cls: Type[BaseModel], output_mode: str = DEFAULT_OUTPUT_MODE,
+                stats: ParseStats = None) -> TolerantPydanticOutputParser:
+    if output_mode not in OUTPUT_MODES:
+        raise ValueError(f"Unbekannter Output-Modus: {output_mode} (erlaubt: {OUTPUT_MODES})")
+    return TolerantPydanticOutputParser(pydantic_object=model_cls, repair=output_mode != "prompt",
+                                        stats=stats)
+
+
+def structured_llm(llm, model_cls: Type[BaseModel], output_mode: str = DEFAULT_OUTPUT_MODE):
+    """Im "schema"-Modus das LLM an das JSON-Schema von `model_cls` binden."""
+    if output_mode == "schema":
+        return llm.bind(format=model_cls.model_json_schema())
+    return llm
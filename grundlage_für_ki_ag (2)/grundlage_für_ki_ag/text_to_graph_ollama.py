@@ -1,15 +1,29 @@
+import argparse
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from langchain_experimental.graph_transformers import LLMGraphTransformer
 from langchain_community.graphs import Neo4jGraph
 from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_ollama import ChatOllama, OllamaEmbeddings
+
+from adaptive_limiter import LimitedChatOllama, LimitedOllamaEmbeddings, shared_limiter
+from checkpoint import ExtractionCheckpoint, checkpoint_path, fingerprint, graph_documents_from_data, graph_documents_to_data
+from schema_manager import ensure_schema
+from query_cache import bump_graph_version
 
 load_dotenv()
 
+cli = argparse.ArgumentParser(description="Baut den Graphen aus data/demo.txt mit Llama 3.1 (deutsches Schema).")
+cli.add_argument("--resume", action="store_true",
+                 help="Abgebrochenen Lauf fortsetzen: fertige Chunks aus dem Checkpoint übernehmen")
+args = cli.parse_args()
+
 TXT_FILE = "data/demo.txt"
+MODEL_NAME = "llama3.1:8b-instruct-fp16"
+CHECKPOINT_PATH = checkpoint_path("demo_ollama_chunks")  # Extraktion pro Chunk, für --resume
+MAX_WORKERS = 6  # Obergrenze paralleler Chunks - den Rest regelt der AdaptiveLimiter
 
 # 1. SETUP
 print("🔌 Verbinde zur DB...")
@@ -21,8 +35,9 @@ graph = Neo4jGraph(
 
 # 2. MODELLE
 print("🦙 Lade Llama 3.1 & Nomic...")
-llm = ChatOllama(model="llama3.1:8b-instruct-fp16", temperature=0)
-embedder = OllamaEmbeddings(model="nomic-embed-text")
+chat_limiter = shared_limiter("chat", max_limit=MAX_WORKERS)
+llm = LimitedChatOllama(model=MODEL_NAME, temperature=0, limiter=chat_limiter)
+embedder = LimitedOllamaEmbeddings(model="nomic-embed-text")
 
 # 3. SCHEMA AUF DEUTSCH (WICHTIG!) 🇩🇪
 # Wir erlauben dem Modell deutsche Begriffe, damit es den deutschen Text versteht.
@@ -41,6 +56,9 @@ llm_transformer = LLMGraphTransformer(
     strict_mode=False 
 )
 
+# Constraints/Indizes vor dem ersten MERGE, sonst ist jedes MERGE ein Label-Scan
+ensure_schema(graph, allowed_nodes)
+
 # --- ABLAUF ---
 
 if not os.path.exists(TXT_FILE):
@@ -59,55 +77,85 @@ documents = documents[:15]
 
 print(f"✂️  Verarbeite die ersten {len(documents)} Chunks...")
 
+checkpoint = ExtractionCheckpoint(CHECKPOINT_PATH, resume=args.resume)
+if args.resume:
+    print(f"♻️  Resume: {len(checkpoint)} Chunks im Checkpoint.")
+
 # C) Loop
 count_nodes = 0
 count_rels = 0 # Zähler für Beziehungen
 
-for i, doc in enumerate(documents):
-    
-    # Kurze Vorschau
-    preview = doc.page_content[:40].replace('\n', ' ')
-    print(f"\n--- Chunk {i+1}: '{preview}...' ---")
-    
+def extract_chunk(item):
+    """Extraktion eines Chunks (läuft parallel) -> (graph_docs, aus_checkpoint, fehler)."""
+    i, doc = item
     try:
+        chunk_fp = fingerprint(MODEL_NAME, allowed_nodes, allowed_rels, doc.page_content)
+        cached = checkpoint.get(f"chunk-{i}", chunk_fp)
+        if cached is not None:
+            return graph_documents_from_data(cached, [doc]), True, None
         graph_docs = llm_transformer.convert_to_graph_documents([doc])
+        checkpoint.append(f"chunk-{i}", chunk_fp, graph_documents_to_data(graph_docs))
+        return graph_docs, False, None
+    except Exception as e:
+        return None, False, e
+
+# Extraktion parallel, Ausgabe + Speichern in Chunk-Reihenfolge
+with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+    for i, (doc, (graph_docs, from_checkpoint, error)) in enumerate(
+            zip(documents, executor.map(extract_chunk, enumerate(documents)))):
         
-        if not graph_docs:
-            print("   ⚠️  Nichts gefunden.")
-            continue
-            
-        nodes = graph_docs[0].nodes
-        rels = graph_docs[0].relationships
-        
-        print(f"   📍 Knoten ({len(nodes)}): {[n.id for n in nodes[:3]]}...") # Zeige nur erste 3 Namen
-        
-        # JETZT WIRD ES SPANNEND: Findet er Beziehungen?
-        if len(rels) == 0:
-             print("   ⚠️  KEINE BEZIEHUNGEN GEFUNDEN (Prüfe Prompt/Sprache)")
-        else:
-            print(f"   🔗 Beziehungen ({len(rels)}):")
-            for r in rels:
-                print(f"      - {r.source.id} --[{r.type}]--> {r.target.id}")
-
-        # Embeddings & Speichern
-        for node in nodes:
-            if "name" not in node.properties:
-                node.properties["name"] = node.id
-            node.properties["embedding"] = embedder.embed_query(node.id)
-        
-        graph.add_graph_documents(graph_docs)
-        print("   💾 Gespeichert.")
+        # Kurze Vorschau
+        preview = doc.page_content[:40].replace('\n', ' ')
+        print(f"\n--- Chunk {i+1}: '{preview}...' ---")
         
-        count_nodes += len(nodes)
-        count_rels += len(rels)
+        if error is not None:
+            print(f" ❌ Fehler: {error}")
+            continue
+        if from_checkpoint:
+            print("   ♻️  Aus Checkpoint übernommen")
         
-    except Exception as e:
-        print(f" ❌ Fehler: {e}")
+        try:
+            if not graph_docs:
+                print("   ⚠️  Nichts gefunden.")
+                continue
+                
+            nodes = graph_docs[0].nodes
+            rels = graph_docs[0].relationships
+            
+            print(f"   📍 Knoten ({len(nodes)}): {[n.id for n in nodes[:3]]}...") # Zeige nur erste 3 Namen
+            
+            # JETZT WIRD ES SPANNEND: Findet er Beziehungen?
+            if len(rels) == 0:
+                 print("   ⚠️  KEINE BEZIEHUNGEN GEFUNDEN (Prüfe Prompt/Sprache)")
+            else:
+                print(f"   🔗 Beziehungen ({len(rels)}):")
+                for r in rels:
+                    print(f"      - {r.source.id} --[{r.type}]--> {r.target.id}")
+
+            # Embeddings (ein Batch pro Chunk) & Speichern
+            vectors = embedder.embed_documents([node.id for node in nodes]) if nodes else []
+            for node, vector in zip(nodes, vectors):
+                if "name" not in node.properties:
+                    node.properties["name"] = node.id
+                node.properties["embedding"] = vector
+            
+            graph.add_graph_documents(graph_docs)
+            print("   💾 Gespeichert.")
+            
+            count_nodes += len(nodes)
+            count_rels += len(rels)
+            
+        except Exception as e:
+            print(f" ❌ Fehler: {e}")
+
+print(f"\n🎚️  {chat_limiter.summary()}")
 
 # D) Index
 print("\n🏷️  Verteile Label ':Entity'...")
 graph.query("MATCH (n) WHERE n.embedding IS NOT NULL SET n:Entity")
+bump_graph_version(graph)   # Query-Caches der Agenten invalidieren
 
+print(f"♻️  {checkpoint.summary()}")
 print(f"\n🎉 FERTIG! Knoten: {count_nodes} | Beziehungen: {count_rels}")
 if count_rels == 0:
     print("❌ WARNUNG: Immer noch keine Beziehungen. Llama kommt mit dem Deutsch->Schema Mapping nicht klar.")
\ No newline at end of file
@@ -1,3 +1,4 @@
+import argparse
 import os
 import time
 from dotenv import load_dotenv
@@ -8,8 +9,18 @@ from langchain_core.documents import Document
 # WICHTIG: Die lokalen Helden importieren
 from langchain_ollama import ChatOllama, OllamaEmbeddings
 
+from checkpoint import ExtractionCheckpoint, checkpoint_path, fingerprint, graph_documents_from_data, graph_documents_to_data
+
 load_dotenv()
 
+cli = argparse.ArgumentParser(description="Minimaler Ollama-Test: Text -> Graph -> Embeddings -> Neo4j.")
+cli.add_argument("--resume", action="store_true",
+                 help="Extraktion aus dem Checkpoint des letzten Laufs übernehmen")
+args = cli.parse_args()
+
+MODEL_NAME = "gemma3:27b"
+CHECKPOINT_PATH = checkpoint_path("simple_test")
+
 # --- 1. CONFIG & SETUP ---
 print("\n🔌 1. Verbinde zur Datenbank...")
 graph = Neo4jGraph(
@@ -30,7 +41,7 @@ except:
 
 print("\n🦙 2. Lade lokale Modelle (Llama 3.1 & Nomic)...")
 llm = ChatOllama(
-    model="gemma3:27b", 
+    model=MODEL_NAME, 
     temperature=0  # Präzision ist wichtig
 )
 
@@ -59,11 +70,20 @@ documents = [Document(page_content=raw_text)]
 print(f"\n📄 3. Analysiere Text:\n   '{raw_text.strip().replace(chr(10), ' ')}'")
 
 # --- 4. EXTRAKTION ---
-print("\n🤖 4. Llama extrahiert Graphen (bitte warten)...")
-start_time = time.time()
-graph_documents = llm_transformer.convert_to_graph_documents(documents)
-end_time = time.time()
-print(f"   ✅ Fertig in {end_time - start_time:.2f} Sekunden.")
+checkpoint = ExtractionCheckpoint(CHECKPOINT_PATH, resume=args.resume)
+doc_fp = fingerprint(MODEL_NAME, allowed_nodes, allowed_rels, raw_text)
+cached = checkpoint.get("doc-0", doc_fp)
+
+if cached is not None:
+    print("\n♻️  4. Extraktion aus Checkpoint übernommen.")
+    graph_documents = graph_documents_from_data(cached, documents)
+else:
+    print("\n🤖 4. Llama extrahiert Graphen (bitte warten)...")
+    start_time = time.time()
+    graph_documents = llm_transformer.convert_to_graph_documents(documents)
+    end_time = time.time()
+    checkpoint.append("doc-0", doc_fp, graph_documents_to_data(graph_documents))
+    print(f"   ✅ Fertig in {end_time - start_time:.2f} Sekunden.")
 
 # --- 5. ANALYSE (VISUALISIERUNG IM TERMINAL) ---
 print("\n🔍 5. VORSCHAU - Was hat Llama gefunden?")
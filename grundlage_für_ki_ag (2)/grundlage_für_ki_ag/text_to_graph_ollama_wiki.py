@@ -1,4 +1,6 @@
+import argparse
 import os
+import threading
 import time
 from typing import List
 from dotenv import load_dotenv
@@ -8,13 +10,32 @@ from pydantic import BaseModel, Field
 from langchain_community.document_loaders import WikipediaLoader
 from langchain_community.graphs import Neo4jGraph
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
 from langchain_ollama import ChatOllama, OllamaEmbeddings
 from langchain_community.graphs.graph_document import GraphDocument, Node as LangChainNode, Relationship as LangChainRel
 from langchain_core.documents import Document
 
+from text_windows import CoverageStats, make_windows, map_windows
+from checkpoint import ExtractionCheckpoint, checkpoint_path, fingerprint
+from structured_output import ParseStats, make_parser, structured_llm
+
 load_dotenv()
 
+cli = argparse.ArgumentParser(description="Baut einen Graphen aus dem Wikipedia-Artikel 'PayPal Mafia'.")
+cli.add_argument("--resume", action="store_true",
+                 help="Abgebrochenen Lauf fortsetzen: fertige Fenster aus dem Checkpoint übernehmen")
+args = cli.parse_args()
+
+MODEL_NAME = "gemma3:27b"
+OUTPUT_MODE = "schema"  # JSON-Schema an Ollama + toleranter Parser (siehe structured_output.py)
+parse_stats = ParseStats()
+CHECKPOINT_PATH = checkpoint_path("wiki_windows")  # Extraktion pro Fenster, für --resume
+
+# Statt den Artikel bei 6000 Zeichen abzuschneiden, zerlegen wir ihn in
+# überlappende Fenster, die den ganzen Text abdecken.
+WINDOW_TOKENS = 1500
+WINDOW_OVERLAP_TOKENS = 150
+MAX_CONCURRENT_WINDOWS = 2
+
 # --- 1. CONFIG ---
 print("\n🔌 1. Verbinde zur Datenbank...")
 graph = Neo4jGraph(
@@ -31,7 +52,7 @@ except:
     pass
 
 # Modell Setup (Gemma oder Llama)
-llm = ChatOllama(model="gemma3:27b", temperature=0) 
+llm = ChatOllama(model=MODEL_NAME, temperature=0) 
 embedder = OllamaEmbeddings(model="nomic-embed-text")
 
 # --- 2. DATENSTRUKTUREN ---
@@ -51,9 +72,16 @@ class RelationshipList(BaseModel):
     relationships: List[IdentifiedRelationship]
 
 # --- 3. EXTRAKTOR-FUNKTIONEN ---
+# Fehlgeschlagene LLM-Calls pro Fenster-Thread zählen: solche Fenster kommen
+# nicht in den Checkpoint, damit --resume sie erneut versucht.
+_window_errors = threading.local()
+
+def _count_error():
+    _window_errors.count = getattr(_window_errors, "count", 0) + 1
+
 def extract_nodes_step_by_step(text: str, allowed_nodes: List[str]) -> List[IdentifiedNode]:
     all_nodes = []
-    parser = PydanticOutputParser(pydantic_object=IdentifiedNodeList)
+    parser = make_parser(IdentifiedNodeList, OUTPUT_MODE, parse_stats)
     
     template = """Extrahiere ALLE Entitäten vom Typ '{node_type}' aus dem Text.
     Text Ausschnitt: "{text_snippet}..."
@@ -67,28 +95,24 @@ def extract_nodes_step_by_step(text: str, allowed_nodes: List[str]) -> List[Iden
         input_variables=["node_type", "text_snippet"],
         partial_variables={"format_instructions": parser.get_format_instructions()}
     )
-    chain = prompt | llm | parser
-
-    # Wir verarbeiten den Text in Chunks, falls er zu lang ist, 
-    # aber für dieses Beispiel kürzen wir ihn einfach auf das Limit des Modells.
-    safe_text = text[:6000] # Limit für lokale LLMs, damit sie nicht abstürzen
+    chain = prompt | structured_llm(llm, IdentifiedNodeList, OUTPUT_MODE) | parser
 
     for node_type in allowed_nodes:
         print(f"   👉 Suche nach Typ: [{node_type}]...")
         try:
-            # Wir geben dem LLM nur die ersten 6000 Zeichen, das reicht für extrem viele Daten
-            result = chain.invoke({"node_type": node_type, "text_snippet": safe_text})
+            result = chain.invoke({"node_type": node_type, "text_snippet": text})
             print(f"      ✅ {len(result.nodes)} gefunden.")
             for n in result.nodes:
                 n.type = node_type
                 all_nodes.append(n)
         except Exception as e:
+            _count_error()
             print(f"      ❌ Fehler bei {node_type}: {e}")
             
     return all_nodes
 
 def extract_relationships_guided(text: str, nodes: List[IdentifiedNode], allowed_rels: List[str]) -> List[IdentifiedRelationship]:
-    parser = PydanticOutputParser(pydantic_object=RelationshipList)
+    parser = make_parser(RelationshipList, OUTPUT_MODE, parse_stats)
     node_list_str = ", ".join([f"{n.id}" for n in nodes])
     
     template = """Finde Beziehungen zwischen diesen Entitäten im Text.
@@ -105,18 +129,18 @@ def extract_relationships_guided(text: str, nodes: List[IdentifiedNode], allowed
         input_variables=["text_snippet", "node_list", "allowed_rels"],
         partial_variables={"format_instructions": parser.get_format_instructions()}
     )
-    chain = prompt | llm | parser
+    chain = prompt | structured_llm(llm, RelationshipList, OUTPUT_MODE) | parser
     
     print(f"   👉 Suche Beziehungen...")
     try:
-        # Auch hier: Safe Text Limit
         result = chain.invoke({
-            "text_snippet": text[:6000], 
+            "text_snippet": text, 
             "node_list": node_list_str,
             "allowed_rels": ", ".join(allowed_rels)
         })
         return result.relationships
     except Exception as e:
+        _count_error()
         print(f"      ❌ Fehler: {e}")
         return []
 
@@ -142,11 +166,51 @@ print(f"    📝 Vorschau: {full_text[:200]}...")
 target_nodes = ["Person", "Organization", "Product"]
 target_rels = ["FOUNDED", "WORKED_AT", "CREATED", "INVESTED_IN", "OWNED_BY"]
 
-# A) Knoten
-extracted_nodes = extract_nodes_step_by_step(full_text, target_nodes)
+windows = make_windows(full_text, WINDOW_TOKENS, WINDOW_OVERLAP_TOKENS)
+print(f"\n🪟 {len(windows)} Fenster à max. {WINDOW_TOKENS} Tokens ({WINDOW_OVERLAP_TOKENS} Overlap)")
+coverage = CoverageStats()
+
+checkpoint = ExtractionCheckpoint(CHECKPOINT_PATH, resume=args.resume)
+if args.resume:
+    print(f"♻️  Resume: {len(checkpoint)} Fenster im Checkpoint.")
+
+def extract_window(window):
+    key = f"window-{window.index}"
+    window_fp = fingerprint(MODEL_NAME, target_nodes, target_rels, window.text)
+    cached = checkpoint.get(key, window_fp)
+    if cached is not None:
+        print(f"   ♻️  Fenster {window.index+1} aus Checkpoint übernommen")
+        return ([IdentifiedNode.model_validate(n) for n in cached["nodes"]],
+                [IdentifiedRelationship.model_validate(r) for r in cached["relationships"]])
+    
+    # A) Knoten  B) Beziehungen - jeweils nur für dieses Fenster
+    _window_errors.count = 0
+    nodes = extract_nodes_step_by_step(window.text, target_nodes)
+    rels = extract_relationships_guided(window.text, nodes, target_rels)
+    if _window_errors.count == 0:
+        checkpoint.append(key, window_fp, {"nodes": [n.model_dump() for n in nodes],
+                                           "relationships": [r.model_dump() for r in rels]})
+    return nodes, rels
+
+extracted_nodes = []
+extracted_rels = []
+seen_nodes = set()
+seen_rels = set()
+
+# Fenster-Ergebnisse mergen (der Overlap erzeugt Dubletten)
+for nodes, rels in map_windows(extract_window, windows, MAX_CONCURRENT_WINDOWS, coverage):
+    for n in nodes:
+        if n.id not in seen_nodes:
+            seen_nodes.add(n.id)
+            extracted_nodes.append(n)
+    for r in rels:
+        if (r.source, r.type, r.target) not in seen_rels:
+            seen_rels.add((r.source, r.type, r.target))
+            extracted_rels.append(r)
 
-# B) Beziehungen
-extracted_rels = extract_relationships_guided(full_text, extracted_nodes, target_rels)
+print(f"\n📏 {coverage.summary()}")
+print(f"♻️  {checkpoint.summary()}")
+print(f"🧾 Parser: {parse_stats.summary()}")
 
 # C) Graph bauen
 print("\n🏗️  Baue GraphDocument...")
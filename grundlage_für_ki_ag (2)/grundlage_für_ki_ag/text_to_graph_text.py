@@ -1,3 +1,4 @@
+import argparse
 import os
 import time
 from dotenv import load_dotenv
@@ -7,10 +8,19 @@ from langchain_community.graphs import Neo4jGraph
 from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from checkpoint import ExtractionCheckpoint, checkpoint_path, fingerprint, graph_documents_from_data, graph_documents_to_data
+
 load_dotenv()
 
+cli = argparse.ArgumentParser(description="Baut den Graphen aus data/demo.txt mit Gemini.")
+cli.add_argument("--resume", action="store_true",
+                 help="Abgebrochenen Lauf fortsetzen: fertige Chunks aus dem Checkpoint übernehmen")
+args = cli.parse_args()
+
 # --- CONFIG ---
 TXT_FILE = "data/demo.txt"
+MODEL_NAME = "gemini-2.5-flash-lite"
+CHECKPOINT_PATH = checkpoint_path("demo_gemini_chunks")  # Extraktion pro Chunk, für --resume
 
 # 1. Verbindung zur Datenbank
 print("🔌 Verbinde zur DB...")
@@ -23,7 +33,7 @@ graph = Neo4jGraph(
 # 2. KI-Modelle (Gemini)
 print("✨ Lade Gemini Flash & Google Embeddings...")
 llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-lite", 
+    model=MODEL_NAME, 
     google_api_key=os.getenv("GOOGLE_API_KEY"),
     temperature=0 
 )
@@ -62,6 +72,10 @@ documents = text_splitter.split_documents(raw_documents)
 documents_to_process = documents[:6] # Die ersten 6 reichen für den Vergleich
 print(f"✂️  Text zerteilt. Verarbeite {len(documents_to_process)} Chunks mit Gemini...")
 
+checkpoint = ExtractionCheckpoint(CHECKPOINT_PATH, resume=args.resume)
+if args.resume:
+    print(f"♻️  Resume: {len(checkpoint)} Chunks im Checkpoint.")
+
 # C) Extraktion mit DEBUG-AUSGABE
 count_nodes = 0
 
@@ -71,12 +85,20 @@ for i, doc in enumerate(documents_to_process):
     print(f"🔄 Chunk {i+1}: '{preview}...'")
     
     try:
-        # Extraktion
-        result = llm_transformer.convert_to_graph_documents([doc])
+        # Extraktion (oder aus dem Checkpoint eines abgebrochenen Laufs)
+        chunk_fp = fingerprint(MODEL_NAME, allowed_nodes, allowed_rels, doc.page_content)
+        cached = checkpoint.get(f"chunk-{i}", chunk_fp)
+        if cached is not None:
+            print("   ♻️  Aus Checkpoint übernommen")
+            result = graph_documents_from_data(cached, [doc])
+        else:
+            result = llm_transformer.convert_to_graph_documents([doc])
+            checkpoint.append(f"chunk-{i}", chunk_fp, graph_documents_to_data(result))
         
         if not result:
             print("   ⚠️ (Leer)")
-            time.sleep(2)
+            if cached is None:
+                time.sleep(2)
             continue
             
         nodes = result[0].nodes
@@ -107,9 +129,10 @@ for i, doc in enumerate(documents_to_process):
         
         count_nodes += len(nodes)
 
-        # WICHTIG: Bremse für Google Free Tier
-        print("   ⏳ Cool-down (5s)...")
-        time.sleep(5)
+        # WICHTIG: Bremse für Google Free Tier (nur nach echten API-Calls)
+        if cached is None:
+            print("   ⏳ Cool-down (5s)...")
+            time.sleep(5)
         
     except Exception as e:
         print(f"   ❌ Fehler: {e}")
@@ -119,4 +142,5 @@ for i, doc in enumerate(documents_to_process):
 # D) Index
 print("\n🏷️  Verteile Label ':Entity'...")
 graph.query("MATCH (n) WHERE n.embedding IS NOT NULL SET n:Entity")
+print(f"♻️  {checkpoint.summary()}")
 print(f"🎉 Fertig! {count_nodes} Knoten mit Gemini importiert.")
\ No newline at end of file
@@ -4,6 +4,7 @@
 #4. Speichern.
 #5. Label :Entity vergeben (damit der Index greift).
 
+import argparse
 import os
 from dotenv import load_dotenv
 from langchain_experimental.graph_transformers import LLMGraphTransformer
@@ -11,8 +12,18 @@ from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmb
 from langchain_core.documents import Document
 from langchain_community.graphs import Neo4jGraph
 
+from checkpoint import ExtractionCheckpoint, checkpoint_path, fingerprint, graph_documents_from_data, graph_documents_to_data
+
 load_dotenv()
 
+cli = argparse.ArgumentParser(description="Text -> Graph mit Embeddings und :Entity Label (Gemini).")
+cli.add_argument("--resume", action="store_true",
+                 help="Extraktion aus dem Checkpoint des letzten Laufs übernehmen")
+args = cli.parse_args()
+
+MODEL_NAME = "gemini-2.5-flash-lite"
+CHECKPOINT_PATH = checkpoint_path("update_test")
+
 # --- SETUP ---
 graph = Neo4jGraph(
     url=os.getenv("NEO4J_URI"),
@@ -21,7 +32,7 @@ graph = Neo4jGraph(
 )
 
 llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-lite", 
+    model=MODEL_NAME, 
     google_api_key=os.getenv("GOOGLE_API_KEY"),
     temperature=0 
 )
@@ -50,8 +61,17 @@ Apple is a technology company located in Cupertino.
 documents = [Document(page_content=raw_text)]
 
 # --- PROZESS ---
-print("🤖 1. Extrahiere Graphen aus Text...")
-graph_documents = llm_transformer.convert_to_graph_documents(documents)
+checkpoint = ExtractionCheckpoint(CHECKPOINT_PATH, resume=args.resume)
+doc_fp = fingerprint(MODEL_NAME, allowed_nodes, allowed_rels, raw_text)
+cached = checkpoint.get("doc-0", doc_fp)
+
+if cached is not None:
+    print("♻️  1. Graph aus Checkpoint übernommen...")
+    graph_documents = graph_documents_from_data(cached, documents)
+else:
+    print("🤖 1. Extrahiere Graphen aus Text...")
+    graph_documents = llm_transformer.convert_to_graph_documents(documents)
+    checkpoint.append("doc-0", doc_fp, graph_documents_to_data(graph_documents))
 
 print(f"⚡ 2. Berechne Vektoren für {len(graph_documents[0].nodes)} Knoten...")
 
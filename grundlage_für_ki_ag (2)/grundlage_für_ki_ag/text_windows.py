@@ -0,0 +1,141 @@
+"""
+Token-basierte Sliding Windows
+==============================
+
+Ersetzt das harte `text[:4000]` / `text[:6000]` der Extraktoren: der Text wird
+in überlappende Fenster mit festem Token-Budget zerlegt, die ZUSAMMEN den
+ganzen Text abdecken. Jedes Fenster geht einzeln ans LLM, die Ergebnisse
+werden danach gemerged.
+
+Tokens werden ohne Tokenizer-Abhängigkeit geschätzt (Wörter + Satzzeichen).
+Für gemma/llama liegt das nah genug an der echten Zahl, um Fenster sicher
+unter dem Kontextlimit zu halten.
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, TypeVar
+
+# Ein "Token" = Wort oder einzelnes Satzzeichen
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+SENTENCE_END = {".", "!", "?", ":", ";"}
+
+DEFAULT_WINDOW_TOKENS = 1000
+DEFAULT_OVERLAP_TOKENS = 100
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class TextWindow:
+    index: int
+    start: int   # Zeichen-Offset im Originaltext
+    end: int
+    text: str
+
+
+def estimate_tokens(text: str) -> int:
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def make_windows(text: str, max_tokens: int = DEFAULT_WINDOW_TOKENS,
+                 overlap_tokens: int = DEFAULT_OVERLAP_TOKENS) -> List[TextWindow]:
+    """
+    Zerlegt `text` in Fenster mit höchstens `max_tokens` Tokens.
+
+    Ein Fenster endet bevorzugt an einem Satzende innerhalb des Overlap-
+    Bereichs; das nächste Fenster beginnt `overlap_tokens` davor, damit
+    Beziehungen an der Schnittkante nicht verloren gehen.
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens muss kleiner als max_tokens sein")
+
+    spans = [m.span() for m in TOKEN_PATTERN.finditer(text)]
+    if not spans:
+        return []
+    if len(spans) <= max_tokens:
+        return [TextWindow(0, 0, len(text), text)]
+
+    windows = []
+    first = 0
+    while first < len(spans):
+        last = min(first + max_tokens, len(spans)) - 1
+
+        # An einem Satzende abschneiden, wenn eins im Overlap-Bereich liegt
+        if last < len(spans) - 1:
+            for i in range(last, max(first, last - overlap_tokens), -1):
+                if text[spans[i][0]:spans[i][1]] in SENTENCE_END:
+                    last = i
+                    break
+
+        start, end = spans[first][0], spans[last][1]
+        windows.append(TextWindow(len(windows), start, end, text[start:end]))
+
+        if last == len(spans) - 1:
+            break
+        first = max(last + 1 - overlap_tokens, first + 1)
+
+    return windows
+
+
+def covered_chars(windows: List[TextWindow]) -> int:
+    """Anzahl der Zeichen, die von mindestens einem Fenster abgedeckt werden."""
+    total = 0
+    covered_until = 0
+    for w in sorted(windows, key=lambda w: w.start):
+        start = max(w.start, covered_until)
+        if w.end > start:
+            total += w.end - start
+            covered_until = w.end
+    return total
+
+
+class CoverageStats:
+    """Zählt abgedeckte Zeichen und LLM-Sekunden (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.chars = 0
+        self.windows = 0
+        self.llm_seconds = 0.0
+
+    def add(self, chars: int, windows: int, llm_seconds: float):
+        with self._lock:
+            self.chars += chars
+            self.windows += windows
+            self.llm_seconds += llm_seconds
+
+    def chars_per_llm_second(self) -> float:
+        return self.chars / self.llm_seconds if self.llm_seconds else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.chars} Zeichen in {self.windows} Fenstern abgedeckt, "
+                f"{self.llm_seconds:.1f} LLM-Sekunden -> "
+                f"{self.chars_per_llm_second():.0f} Zeichen/LLM-Sekunde")
+
+
+def map_windows(fn: Callable[[TextWindow], R], windows: List[TextWindow], max_workers: int = 4,
+                stats: CoverageStats = None) -> List[R]:
+    """
+    Führt `fn` für jedes Fenster aus (parallel) und gibt die Ergebnisse in
+    Fenster-Reihenfolge zurück. Die Laufzeit jedes Aufrufs zählt als LLM-Zeit.
+    """
+    def timed(window: TextWindow):
+        start = time.perf_counter()
+        try:
+            return fn(window)
+        finally:
+            if stats is not None:
+                stats.add(0, 1, time.perf_counter() - start)
+
+    if stats is not None:
+        stats.add(covered_chars(windows), 0, 0.0)
+
+    if max_workers <= 1 or len(windows) <= 1:
+        return [timed(w) for w in windows]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(windows))) as executor:
+        return list(executor.map(timed, windows))
@@ -5,6 +5,8 @@ from neo4j import GraphDatabase
 from neo4j_graphrag.retrievers import VectorCypherRetriever
 from neo4j_graphrag.generation import GraphRAG
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
+from query_cache import CypherResultCache, VersionStamp, cache_retriever, read_graph_version
+from hybrid_retriever import HybridRRFRetriever, ensure_fulltext_index
 
 load_dotenv()
 
@@ -41,6 +43,9 @@ llm_adapter = GoogleGenAIAdapter(llm)
 # Wir erstellen einen Index namens "entity_index" auf ALLEN Knoten, die eine 'id' haben.
 
 INDEX_NAME = "entity_index"
+FULLTEXT_INDEX_NAME = "entity_fulltext"
+# "hybrid": Fulltext + Vektor parallel, RRF-fusioniert; "vector": nur Embeddings
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
 
 def create_vector_index():
     print("⚙️ Prüfe/Erstelle Vektor-Index...")
@@ -85,6 +90,11 @@ def create_vector_index():
 
 # Einmal ausführen
 create_vector_index()
+# Fulltext-Index entity_fulltext liegt (wie in setup_db.py) auf :Entity(id) ->
+# vektorisierte Knoten bekommen das Label, wie in text_to_graph_text.py
+with driver.session() as session:
+    session.run("MATCH (n) WHERE n.embedding IS NOT NULL AND NOT n:Entity SET n:Entity")
+ensure_fulltext_index(driver)
 
 
 # --- 3. DIE "CONTEXT" QUERY ---
@@ -109,12 +119,23 @@ ORDER BY score DESC
 """
 
 # --- 4. Retriever & RAG Setup ---
-retriever = VectorCypherRetriever(
-    driver,
-    index_name=INDEX_NAME,
-    embedder=embedder,
-    retrieval_query=retrieval_query,
-)
+if RETRIEVAL_MODE == "hybrid":
+    retriever = HybridRRFRetriever(
+        driver,
+        embedder=embedder,
+        retrieval_query=retrieval_query,   # score = RRF-Score statt Cosine
+        vector_index_name=INDEX_NAME,
+        fulltext_index_name=FULLTEXT_INDEX_NAME,
+    )
+else:
+    retriever = VectorCypherRetriever(
+        driver,
+        index_name=INDEX_NAME,
+        embedder=embedder,
+        retrieval_query=retrieval_query,
+    )
+query_cache = CypherResultCache()
+cache_retriever(retriever, query_cache, VersionStamp(lambda: read_graph_version(driver)))
 
 rag = GraphRAG(retriever=retriever, llm=llm_adapter)
 
@@ -125,7 +146,7 @@ questions = [
     "Where is SpaceX located and who founded it?"
 ]
 
-print("\n🔎 Starte Context-Suche...\n")
+print(f"\n🔎 Starte Context-Suche ({RETRIEVAL_MODE})...\n")
 
 for q in questions:
     print(f"❓ FRAGE: {q}")
@@ -143,4 +164,5 @@ for q in questions:
     print(f"\n📝 ANTWORT: {response.answer}")
     print("-" * 60)
 
+query_cache.print_stats()
 driver.close()
\ No newline at end of file